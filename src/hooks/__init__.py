@@ -13,6 +13,7 @@ def get_version() -> str:
 
 version: str = get_version()
 
+from .compiler import *
 from .reducers import *
 from .scope import *
 from .use import *
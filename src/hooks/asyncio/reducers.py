@@ -10,7 +10,7 @@ from ..utils import alambda
 def __async_dispatch_factory(
     reducer: Callable[[dict[str, Any], dict[str, Any]], dict[str, Any]],
     state_fetcher: Callable[[], dict[str, Any]],
-    set_state: Callable[[dict[str, Any]], Any],
+    set_state: Callable[[dict[str, Any], dict[str, Any]], Any],
     middleware: Union[
         list[
             Callable[
@@ -63,7 +63,7 @@ def __async_dispatch_factory(
 
         state_change: dict[str, Any] = await runner(new_state, inner_middleware, action)
         new_state = {**new_state, **state_change}
-        await set_state(new_state)
+        await set_state(new_state, state_change)
         return new_state
 
     return dispatch
@@ -81,32 +81,35 @@ async def use_reducer(
         ],
         None,
     ] = None,
+    serializer: Optional[str] = None,
 ) -> tuple[dict[str, Any], Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]]:
     """
     Create a reducer hook. The reducer will be called when the dispatch function is called.
     :param reducer: The reducer to use
     :param initial_state: The initial state to use
     :param middleware: The middlewares to use in order, if any
+    :param serializer: The name of the serializer to use instead of the backend's default one
     :return: The state and the dispatch function
     """
     _backend = get_hooks_backend(using_async=True)
     identifier = reducer.__module__ + (reducer.__qualname__ or reducer.__name__)
+    options = {"serializer": serializer} if serializer else {}
 
-    async def state_wrapper(value) -> None:
-        state_wrapper.val = value
-        await _backend.save(identifier, value)
+    async def state_wrapper(value, changed) -> None:
+        previous, state_wrapper.val = state_wrapper.val, value
+        if not isinstance(previous, dict) or not isinstance(value, dict):
+            await _backend.save(identifier, value, **options)
+            return
+        # Every field the reducer returned is written, it may have been mutated in place
+        if changed:
+            await _backend.save_fields(identifier, changed, **options)
 
     def state_fetcher() -> dict[str, Any]:
         return state_wrapper.val
 
-    if (await _backend.exists(identifier)) is True:
-        loaded_value = await _backend.load(identifier)
-        state_wrapper.val = loaded_value
-        return state_wrapper.val, __async_dispatch_factory(
-            reducer, state_fetcher, state_wrapper, middleware or []
-        )
-
-    await state_wrapper(initial_state)
+    state_wrapper.val = await _backend.load_or_init_fields(
+        identifier, initial_state, **options
+    )
     return state_wrapper.val, __async_dispatch_factory(
         reducer, state_fetcher, state_wrapper, middleware or []
     )
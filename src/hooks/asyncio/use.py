@@ -5,30 +5,42 @@ import inspect
 from collections.abc import Coroutine
 
 from ..backends.backend_state import get_hooks_backend
+from ..backends.copy_policy import detach_value
 from ..frame_utils import __identify_hook_and_backend
+from ..use import SHALLOW_EQUALITY, _memo_entry, _memo_find, _memo_key
 
 T = TypeVar("T")
 
 
-async def use_state(default_value: T) -> tuple[T, Callable[[Any], Any]]:
+async def use_state(
+    default_value: T, serializer: Optional[str] = None
+) -> tuple[T, Callable[[Any], Any]]:
     """
     Create a stateful hook.
     :param default_value: The default value of the state
-    :return: The current value of the state and a function to update the state
+    :param serializer: The name of the serializer to use instead of the backend's default one
+    :return: The current value of the state and a function to update the state, which takes the new value. Its update
+    attribute takes a function of the previous value instead, and returns the new value
     """
     identifier, _backend = __identify_hook_and_backend(using_async=True)
+    options = {"serializer": serializer} if serializer else {}
 
     async def state_wrapper(value: T) -> None:
         state_wrapper.val = value
-        await _backend.save(identifier, value)
+        await _backend.save(identifier, value, **options)
 
-    exists = await _backend.exists(identifier)
-    if exists is True:
-        loaded_value = await _backend.load(identifier)
-        state_wrapper.val = loaded_value
-        return state_wrapper.val, state_wrapper
+    async def update(function: Callable[[T], T]) -> T:
+        # A functional update is applied atomically to the latest state of the backend
+        state_wrapper.val = await _backend.update(identifier, function, **options)
+        return state_wrapper.val
 
-    await state_wrapper(default_value)
+    # Callables are values like any other, functional updates go through set_state.update
+    state_wrapper.update = update
+    state_wrapper.backend = _backend
+
+    state_wrapper.val = await _backend.load_or_init(
+        identifier, default_value, **options
+    )
     return state_wrapper.val, state_wrapper
 
 
@@ -46,7 +58,8 @@ async def use_effect(
     saved_dependencies, set_dependencies = await use_state(dependencies or [])
     has_ran, set_initial_ran = await use_state(False)
     if saved_dependencies != dependencies or not has_ran:
-        await set_dependencies(dependencies)
+        # Backends may keep the state by reference, a copy notices dependencies that are later mutated in place
+        await set_dependencies(detach_value(dependencies, set_dependencies.backend))
         await set_initial_ran(True)
         if inspect.iscoroutinefunction(callback):
             await callback()
@@ -55,15 +68,42 @@ async def use_effect(
     return
 
 
-async def use_memo(callback: Callable[[], Any], dependencies: list[Any]) -> Any:
+async def use_memo(
+    callback: Callable[[], Any],
+    dependencies: list[Any],
+    equality: str = SHALLOW_EQUALITY,
+    max_size: Optional[int] = None,
+) -> Any:
     """
-    Create a memoized hook. The callback will be called when the dependencies change. Practically it is an alias for
-    use_effect.
-    :param callback: The callback to call when the dependencies change
-    :param dependencies: The dependencies to watch for changes
-    :return: The return value of the callback
+    Create a memoized hook. The callback computes the value, and is only called again when the dependencies change.
+    :param callback: The function or coroutine function that computes the value
+    :param dependencies: The dependencies of the value
+    :param equality: How the dependencies are compared: "shallow" (the default) compares every dependency with `==`,
+     "identity" with `is` (only with backends that keep state by reference) and "hash" compares a digest of the
+        canonically encoded dependencies, so large dependencies are not kept
+    :param max_size: The number of values to cache for different dependencies, the least recently used value is
+     dropped first. By default only the value of the latest dependencies is kept
+    :return: The value
     """
-    return use_effect(callback, dependencies)
+    identifier, _backend = __identify_hook_and_backend(using_async=True)
+    key = _memo_key(dependencies, equality, max_size)
+    entries = await _backend.load_or_init(identifier, [])
+    index = _memo_find(entries, key, equality)
+    if index >= 0:
+        value = entries[index][1]
+        if index != len(entries) - 1:
+            await _backend.save(
+                identifier, entries[:index] + entries[index + 1 :] + [entries[index]]
+            )
+        return value
+    value = callback()
+    if inspect.isawaitable(value):
+        value = await value
+    await _backend.save(
+        identifier,
+        (entries + [_memo_entry(key, value, equality, _backend)])[-(max_size or 1) :],
+    )
+    return value
 
 
 async def create_context(default_value: Any) -> str:
@@ -75,8 +115,7 @@ async def create_context(default_value: Any) -> str:
     identifier, _backend = __identify_hook_and_backend(
         always_global_backend=True, prefix="__hooks_context__", using_async=True
     )
-    if (await _backend.exists(identifier)) is False:
-        await _backend.save(identifier, default_value)
+    await _backend.load_or_init(identifier, default_value)
     return identifier
 
 
@@ -0,0 +1,234 @@
+from typing import Any, Callable, Optional
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from .async_interface import AsyncHooksBackend
+from .interface import HooksBackend
+
+# The number of threads that run the operations of every blocking backend
+DEFAULT_MAX_WORKERS = 4
+
+_adapters: dict[type, type] = {}
+
+
+class AsyncBackendAdapter(AsyncHooksBackend):
+    """
+    Wraps a synchronous backend so async hooks can use it. Backends that never block (e.g. the MemoryBackend) are
+    called directly on the event loop. The operations of blocking backends run on a small dedicated thread pool, and
+    the loads and existence checks of all the tasks that run in the same iteration of the event loop are sent to the
+    pool together as a single load_many or exists_many call, so a burst of requests does not flood the pool.
+    """
+
+    backend: type[HooksBackend] = HooksBackend
+    max_workers: int = DEFAULT_MAX_WORKERS
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    # The reads waiting for the next batch of every event loop, by operation and serializer
+    _batches: "WeakKeyDictionary[Any, dict[tuple[str, Optional[str]], Any]]" = (
+        WeakKeyDictionary()
+    )
+    # The running batches, referenced until they finish so they are not garbage collected
+    _tasks: "set[asyncio.Task[None]]" = set()
+
+    @classmethod
+    async def use(cls, *args: Any, **kwargs: Any) -> Any:
+        # Sync hooks keep using the wrapped backend, async hooks wrap it again when they look it up
+        await cls._run(cls.backend.use, *args, **kwargs)
+        return cls
+
+    @classmethod
+    async def _run(cls, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if not cls.backend.blocking:
+            return function(*args, **kwargs)
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=cls.max_workers,
+                thread_name_prefix=f"hooks-{cls.backend.__name__}",
+            )
+        # The context of the caller is carried to the worker thread, like asyncio.to_thread does, so the features based
+        # on context variables (e.g. the unit of work of the Redis backends) see it
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            cls._executor, partial(context.run, function, *args, **kwargs)
+        )
+
+    @classmethod
+    async def _read(
+        cls, operation: str, identifier: str, serializer: Optional[str] = None
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        batch = cls._batches.get(loop)
+        if batch is None:
+            batch = cls._batches[loop] = {}
+            loop.call_soon(cls._flush, loop)
+        future = loop.create_future()
+        batch.setdefault((operation, serializer), {}).setdefault(identifier, []).append(
+            future
+        )
+        return await future
+
+    @classmethod
+    def _flush(cls, loop: asyncio.AbstractEventLoop) -> None:
+        for (operation, serializer), waiting in cls._batches.pop(loop).items():
+            task = loop.create_task(cls._flush_read(operation, serializer, waiting))
+            cls._tasks.add(task)
+            task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def _flush_read(
+        cls,
+        operation: str,
+        serializer: Optional[str],
+        waiting: dict[str, list[asyncio.Future[Any]]],
+    ) -> None:
+        identifiers = list(waiting)
+        options = {"serializer": serializer} if serializer else {}
+        try:
+            if operation == "load":
+                results = await cls._run(cls.backend.load_many, identifiers, **options)
+            else:
+                results = await cls._run(cls.backend.exists_many, identifiers)
+        except Exception as error:
+            for futures in waiting.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+            return
+        for identifier, result in zip(identifiers, results):
+            for future in waiting[identifier]:
+                if not future.done():
+                    future.set_result(result)
+
+    @classmethod
+    async def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        if not cls.backend.blocking:
+            options = {"serializer": serializer} if serializer else {}
+            return cls.backend.load(identifier, **options)
+        return await cls._read("load", identifier, serializer)
+
+    @classmethod
+    async def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> Any:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.save, identifier, value, **options)
+
+    @classmethod
+    async def exists(cls, identifier: str) -> bool:
+        if not cls.backend.blocking:
+            return cls.backend.exists(identifier)
+        return await cls._read("exists", identifier)
+
+    @classmethod
+    async def reset_backend(cls) -> None:
+        return await cls._run(cls.backend.reset_backend)
+
+    @classmethod
+    async def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.load_or_init, identifier, default, **options)
+
+    @classmethod
+    async def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.update, identifier, function, **options)
+
+    @classmethod
+    async def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.load_many, identifiers, **options)
+
+    @classmethod
+    async def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.save_many, values, **options)
+
+    @classmethod
+    async def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        return await cls._run(cls.backend.exists_many, identifiers)
+
+    @classmethod
+    async def load_fields(
+        cls, identifier: str, serializer: Optional[str] = None
+    ) -> Any:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.load_fields, identifier, **options)
+
+    @classmethod
+    async def load_or_init_fields(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(
+            cls.backend.load_or_init_fields, identifier, default, **options
+        )
+
+    @classmethod
+    async def save_fields(
+        cls, identifier: str, fields: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        options = {"serializer": serializer} if serializer else {}
+        return await cls._run(cls.backend.save_fields, identifier, fields, **options)
+
+    @classmethod
+    async def delete(cls, identifier: str) -> bool:
+        return await cls._run(cls.backend.delete, identifier)
+
+    @classmethod
+    async def delete_many(cls, identifiers: list[str]) -> int:
+        return await cls._run(cls.backend.delete_many, identifiers)
+
+    @classmethod
+    async def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        return await cls._run(cls.backend.keys, namespace)
+
+    @classmethod
+    async def track(cls, namespace: str, identifier: str) -> None:
+        return await cls._run(cls.backend.track, namespace, identifier)
+
+    @classmethod
+    async def track_many(cls, namespace: str, identifiers: list[str]) -> None:
+        return await cls._run(cls.backend.track_many, namespace, identifiers)
+
+    @classmethod
+    async def clear_namespace(cls, namespace: str) -> None:
+        return await cls._run(cls.backend.clear_namespace, namespace)
+
+
+def async_backend(
+    backend: type[HooksBackend], max_workers: Optional[int] = None
+) -> type[AsyncHooksBackend]:
+    """
+    Get the async adapter of a synchronous backend, the same adapter is returned for every call with the same backend.
+    :param backend: The synchronous backend to wrap
+    :param max_workers: The number of threads that run the operations of a blocking backend, only used when the
+    adapter is created
+    :return: The adapter, an AsyncHooksBackend
+    """
+    adapter = _adapters.get(backend)
+    if adapter is None:
+        adapter = _adapters[backend] = type(
+            f"Async{backend.__name__}",
+            (AsyncBackendAdapter,),
+            {
+                "backend": backend,
+                "max_workers": max_workers or DEFAULT_MAX_WORKERS,
+                "_batches": WeakKeyDictionary(),
+            },
+        )
+    return adapter
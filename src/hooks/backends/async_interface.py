@@ -1,5 +1,7 @@
 from types import SimpleNamespace
-from typing import Any, TypeVar, Union
+from typing import Any, Callable, Optional, TypeVar, Union
+
+from .snapshot import Snapshot, SnapshotWriter, chunked
 
 T = TypeVar("T")
 
@@ -12,12 +14,16 @@ class AsyncHooksBackend(SimpleNamespace):
         set_hooks_backend(cls)
         return cls
 
+    # Backends that serialize state accept the name of a registered serializer (see backends.serializers) to
+    # override their default one, other backends ignore it.
     @classmethod
-    async def load(cls, identifier: str) -> Any:
+    async def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
         raise NotImplemented
 
     @classmethod
-    async def save(cls, identifier: str, value: Any) -> Union[bool, None, Any]:
+    async def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> Union[bool, None, Any]:
         raise NotImplemented
 
     @classmethod
@@ -27,3 +33,222 @@ class AsyncHooksBackend(SimpleNamespace):
     @classmethod
     async def reset_backend(cls) -> None:
         raise NotImplemented
+
+    @classmethod
+    async def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        """
+        Load the state of a hook, or save the default value if the hook has no state yet. Backends with a network round
+        trip per operation should override this to do it in a single round trip.
+        :param identifier: The identifier of the hook
+        :param default: The value to save if the hook has no state
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: The state of the hook, the default value if it was just saved
+        """
+        options = {"serializer": serializer} if serializer else {}
+        if (await cls.exists(identifier)) is True:
+            return await cls.load(identifier, **options)
+        await cls.save(identifier, default, **options)
+        return default
+
+    @classmethod
+    async def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        """
+        Replace the state of a hook with the result of a function of its current state. Backends shared between
+        threads or processes should override this to make sure that concurrent updates are not lost, by default the
+        state is loaded and saved without any locking.
+        :param identifier: The identifier of the hook
+        :param function: Called with the current state (None if the hook has no state) and returns the new state
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: The new state
+        """
+        options = {"serializer": serializer} if serializer else {}
+        current = (
+            await cls.load(identifier, **options)
+            if (await cls.exists(identifier)) is True
+            else None
+        )
+        value = function(current)
+        await cls.save(identifier, value, **options)
+        return value
+
+    @classmethod
+    async def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        """
+        Load the state of several hooks at once. Backends should override this to do it in a single round trip or
+        lock acquisition, by default the hooks are loaded one by one.
+        :param identifiers: The identifiers of the hooks
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: The states of the hooks, in the order of the identifiers
+        """
+        options = {"serializer": serializer} if serializer else {}
+        return [await cls.load(identifier, **options) for identifier in identifiers]
+
+    @classmethod
+    async def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        """
+        Save the state of several hooks at once. By default the hooks are saved one by one.
+        :param values: The states to save by the identifiers of the hooks
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: True if all the states were saved
+        """
+        options = {"serializer": serializer} if serializer else {}
+        saved = True
+        for identifier, value in values.items():
+            saved = bool(await cls.save(identifier, value, **options)) and saved
+        return saved
+
+    @classmethod
+    async def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        """
+        Check whether several hooks have state at once. By default the hooks are checked one by one.
+        :param identifiers: The identifiers of the hooks
+        :return: Whether every hook has state, in the order of the identifiers
+        """
+        return [(await cls.exists(identifier)) is True for identifier in identifiers]
+
+    @classmethod
+    async def load_fields(
+        cls, identifier: str, serializer: Optional[str] = None
+    ) -> Any:
+        """
+        Load a state saved field by field with save_fields. Backends that store the fields of a state separately
+        should override both methods, by default the state is saved as a whole.
+        :param identifier: The identifier of the hook
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: The state of the hook, None if the hook has no state
+        """
+        options = {"serializer": serializer} if serializer else {}
+        return (
+            await cls.load(identifier, **options)
+            if (await cls.exists(identifier)) is True
+            else None
+        )
+
+    @classmethod
+    async def load_or_init_fields(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        """
+        Load a state saved field by field with save_fields, or initialize it with the default if the hook has no state,
+        at once. By default the state is loaded or initialized as a whole with load_or_init.
+        :param identifier: The identifier of the hook
+        :param default: The initial state
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: The state of the hook
+        """
+        options = {"serializer": serializer} if serializer else {}
+        return await cls.load_or_init(identifier, default, **options)
+
+    @classmethod
+    async def save_fields(
+        cls, identifier: str, fields: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        """
+        Save some of the fields of a dict state, the other fields keep their value. By default the state is loaded,
+        merged with the fields and saved as a whole.
+        :param identifier: The identifier of the hook
+        :param fields: The values of the fields to save by name
+        :param serializer: The name of the serializer to use instead of the backend's default one
+        :return: True if the fields were saved
+        """
+        options = {"serializer": serializer} if serializer else {}
+        current = await cls.load_fields(identifier, **options)
+        return bool(
+            await cls.save(identifier, {**(current or {}), **fields}, **options)
+        )
+
+    @classmethod
+    async def delete(cls, identifier: str) -> bool:
+        """
+        Delete the state of a hook.
+        :param identifier: The identifier of the hook
+        :return: True if the hook had state
+        """
+        raise NotImplementedError
+
+    @classmethod
+    async def delete_many(cls, identifiers: list[str]) -> int:
+        """
+        Delete the state of many hooks at once. By default the hooks are deleted one by one.
+        :param identifiers: The identifiers of the hooks
+        :return: The number of hooks that had state
+        """
+        deleted = 0
+        for identifier in identifiers:
+            deleted += bool(await cls.delete(identifier))
+        return deleted
+
+    @classmethod
+    async def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        """
+        List the identifiers of all the hooks with state, or only those tracked in a namespace.
+        :param namespace: The namespace to list, None for all identifiers
+        :return: The identifiers
+        """
+        raise NotImplementedError
+
+    @classmethod
+    async def track(cls, namespace: str, identifier: str) -> None:
+        """
+        Add an identifier to a namespace (e.g. a hook scope), so all the state of the namespace can be listed or
+        cleared at once.
+        :param namespace: The namespace
+        :param identifier: The identifier of the hook
+        """
+        raise NotImplementedError
+
+    @classmethod
+    async def track_many(cls, namespace: str, identifiers: list[str]) -> None:
+        """
+        Add many identifiers to a namespace at once. By default the identifiers are added one by one.
+        :param namespace: The namespace
+        :param identifiers: The identifiers of the hooks
+        """
+        for identifier in identifiers:
+            await cls.track(namespace, identifier)
+
+    @classmethod
+    async def clear_namespace(cls, namespace: str) -> None:
+        """
+        Delete the state of all the hooks tracked in a namespace, and the namespace itself.
+        :param namespace: The namespace
+        """
+        raise NotImplementedError
+
+    @classmethod
+    async def snapshot(cls, path: str, serializer: Optional[str] = None) -> int:
+        """
+        Write the state of all the hooks to a snapshot file, which any backend can restore.
+        :param path: The path of the snapshot file
+        :param serializer: The name of the serializer to write the states with
+        :return: The number of hooks written
+        """
+        # The states are loaded in chunks, so a snapshot never holds the state of all the hooks in memory at once
+        with SnapshotWriter(path, serializer) as writer:
+            for identifiers in chunked(await cls.keys()):
+                writer.write(zip(identifiers, await cls.load_many(identifiers)))
+        return writer.count
+
+    @classmethod
+    async def restore(cls, path: str, lazy: bool = False) -> int:
+        """
+        Restore the state of hooks from a snapshot file, replacing the state the backend has for the same hooks.
+        :param path: The path of the snapshot file
+        :param lazy: Read the states from the file when the hooks are first used instead of right away, backends that
+        do not support it restore right away
+        :return: The number of hooks restored
+        """
+        with Snapshot(path) as snapshot:
+            await cls.save_many(dict(snapshot.items()))
+            return len(snapshot)
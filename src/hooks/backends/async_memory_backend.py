@@ -0,0 +1,237 @@
+from types import MappingProxyType
+from typing import Any, Callable, Optional
+
+from contextvars import ContextVar
+
+from .async_interface import AsyncHooksBackend
+from .copy_policy import COPY_POLICY, load_value, store_value, validate_copy_policy
+
+
+class AsyncMemoryBackend(AsyncHooksBackend):
+    """
+    The asynchronous version of the MemoryBackend, the state is shared by all the tasks of the process. Nothing is
+    serialized and no operation awaits anything, so the event loop is never blocked and every operation, including
+    update, is atomic with regard to other tasks.
+    """
+
+    copy_policy: str = COPY_POLICY
+
+    _store: dict[str, Any] = {}
+    _namespaces: dict[str, set[str]] = {}
+
+    @classmethod
+    async def use(
+        cls, *args: Any, copy_policy: Optional[str] = None, **kwargs: Any
+    ) -> Any:
+        if copy_policy is not None:
+            cls.copy_policy = validate_copy_policy(copy_policy)
+        return await super().use(*args, **kwargs)
+
+    @classmethod
+    async def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        return load_value(cls._store.get(identifier), cls.copy_policy, serializer)
+
+    @classmethod
+    async def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        cls._store[identifier] = store_value(value, cls.copy_policy, serializer)
+        return True
+
+    @classmethod
+    async def exists(cls, identifier: str) -> bool:
+        return identifier in cls._store
+
+    @classmethod
+    async def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        if identifier in cls._store:
+            return load_value(cls._store[identifier], cls.copy_policy, serializer)
+        cls._store[identifier] = store_value(default, cls.copy_policy, serializer)
+        return default
+
+    @classmethod
+    async def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        value = function(
+            load_value(cls._store.get(identifier), cls.copy_policy, serializer)
+        )
+        cls._store[identifier] = store_value(value, cls.copy_policy, serializer)
+        return value
+
+    @classmethod
+    async def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        return [
+            load_value(cls._store.get(identifier), cls.copy_policy, serializer)
+            for identifier in identifiers
+        ]
+
+    @classmethod
+    async def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        cls._store.update(
+            (identifier, store_value(value, cls.copy_policy, serializer))
+            for identifier, value in values.items()
+        )
+        return True
+
+    @classmethod
+    async def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        return [identifier in cls._store for identifier in identifiers]
+
+    @classmethod
+    async def delete(cls, identifier: str) -> bool:
+        if identifier not in cls._store:
+            return False
+        del cls._store[identifier]
+        return True
+
+    @classmethod
+    async def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        if namespace is None:
+            return list(cls._store)
+        return [
+            identifier
+            for identifier in cls._namespaces.get(namespace, ())
+            if identifier in cls._store
+        ]
+
+    @classmethod
+    async def track(cls, namespace: str, identifier: str) -> None:
+        cls._namespaces.setdefault(namespace, set()).add(identifier)
+
+    @classmethod
+    async def clear_namespace(cls, namespace: str) -> None:
+        for identifier in cls._namespaces.pop(namespace, ()):
+            cls._store.pop(identifier, None)
+
+    @classmethod
+    async def reset_backend(cls) -> None:
+        cls._store.clear()
+        cls._namespaces.clear()
+
+
+_context_state: ContextVar[MappingProxyType[str, Any]] = ContextVar(
+    "hooks_context_state", default=MappingProxyType({})
+)
+
+
+class ContextVarsBackend(AsyncHooksBackend):
+    """
+    An asynchronous in-memory backend that isolates the state of asyncio tasks. The state lives in a context variable,
+    so a task starts with a snapshot of the state of the task that spawned it: the changes it makes are not visible to
+    its parent or siblings, and changes the parent makes after spawning it are not visible to the task. Every write
+    copies the mapping of the current context, which is cheap for the handful of hooks a task usually has.
+    """
+
+    copy_policy: str = COPY_POLICY
+
+    @classmethod
+    async def use(
+        cls, *args: Any, copy_policy: Optional[str] = None, **kwargs: Any
+    ) -> Any:
+        if copy_policy is not None:
+            cls.copy_policy = validate_copy_policy(copy_policy)
+        return await super().use(*args, **kwargs)
+
+    @classmethod
+    def _write(cls, values: dict[str, Any]) -> None:
+        # Never mutate the mapping in place, other contexts may share it
+        _context_state.set(MappingProxyType({**_context_state.get(), **values}))
+
+    @classmethod
+    async def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        return load_value(
+            _context_state.get().get(identifier), cls.copy_policy, serializer
+        )
+
+    @classmethod
+    async def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        cls._write({identifier: store_value(value, cls.copy_policy, serializer)})
+        return True
+
+    @classmethod
+    async def exists(cls, identifier: str) -> bool:
+        return identifier in _context_state.get()
+
+    @classmethod
+    async def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        state = _context_state.get()
+        if identifier in state:
+            return load_value(state[identifier], cls.copy_policy, serializer)
+        cls._write({identifier: store_value(default, cls.copy_policy, serializer)})
+        return default
+
+    @classmethod
+    async def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        value = function(
+            load_value(
+                _context_state.get().get(identifier), cls.copy_policy, serializer
+            )
+        )
+        cls._write({identifier: store_value(value, cls.copy_policy, serializer)})
+        return value
+
+    @classmethod
+    async def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        state = _context_state.get()
+        return [
+            load_value(state.get(identifier), cls.copy_policy, serializer)
+            for identifier in identifiers
+        ]
+
+    @classmethod
+    async def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        cls._write(
+            {
+                identifier: store_value(value, cls.copy_policy, serializer)
+                for identifier, value in values.items()
+            }
+        )
+        return True
+
+    @classmethod
+    async def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        state = _context_state.get()
+        return [identifier in state for identifier in identifiers]
+
+    @classmethod
+    async def delete(cls, identifier: str) -> bool:
+        state = _context_state.get()
+        if identifier not in state:
+            return False
+        _context_state.set(
+            MappingProxyType({key: state[key] for key in state if key != identifier})
+        )
+        return True
+
+    @classmethod
+    async def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        if namespace is not None:
+            raise NotImplementedError
+        return list(_context_state.get())
+
+    @classmethod
+    async def reset_backend(cls) -> None:
+        _context_state.set(MappingProxyType({}))
@@ -1,5 +1,6 @@
 from typing import Any, Optional
 
+from .async_adapter import async_backend
 from .async_interface import AsyncHooksBackend
 from .memory_backend import MemoryBackend as DefaultHooksBackend
 
@@ -13,5 +14,6 @@ def set_hooks_backend(backend: type) -> None:
 def get_hooks_backend(using_async: Optional[bool] = False) -> Any:
     backend = globals().get(BACKEND_KEY, DefaultHooksBackend)
     if using_async and not issubclass(backend, AsyncHooksBackend):
-        raise Exception("You cannot use async hooks with a non-async backend")
+        # Async hooks use synchronous backends through an adapter
+        return async_backend(backend)
     return backend
@@ -0,0 +1,252 @@
+from typing import Any, Optional
+
+import threading
+import time
+from collections import OrderedDict
+
+from .copy_policy import PICKLE_POLICY, load_value, store_value
+from .memory_backend import MemoryBackend
+from .serializers import get_serializer
+
+# Marks the limits not passed to use, None removes a limit
+_MISSING: Any = object()
+
+
+class BoundedMemoryBackend(MemoryBackend):
+    """
+    An in-memory backend with a bounded capacity. When the number of entries or their total serialized size goes above
+    the limits, the least recently used entries are evicted. Entries can also expire after a time to live.
+    """
+
+    # The maximal number of entries, None for no limit
+    max_entries: Optional[int] = None
+    # The maximal total serialized size of the entries in bytes, None for no limit
+    max_bytes: Optional[int] = None
+    # The default time to live of the entries in seconds, None for entries that never expire
+    ttl: Optional[float] = None
+
+    # Ordered from the least to the most recently used
+    _store: "OrderedDict[str, Any]" = OrderedDict()
+    _namespaces: dict[str, set[str]] = {}
+    _identifier_namespaces: dict[str, set[str]] = {}
+    _sizes: dict[str, int] = {}
+    _expires_at: dict[str, float] = {}
+    _total_bytes: int = 0
+    _evictions: int = 0
+    _expirations: int = 0
+    _lock = threading.RLock()
+
+    @classmethod
+    def use(
+        cls,
+        *args: Any,
+        max_entries: Optional[int] = _MISSING,
+        max_bytes: Optional[int] = _MISSING,
+        ttl: Optional[float] = _MISSING,
+        **kwargs: Any,
+    ) -> Any:
+        with cls._lock:
+            if max_entries is not _MISSING:
+                cls.max_entries = max_entries
+            if ttl is not _MISSING:
+                cls.ttl = ttl
+            if max_bytes is not _MISSING:
+                measured = cls.max_bytes is not None
+                cls.max_bytes = max_bytes
+                if not measured:
+                    # Sizes are only measured under a byte limit, the entries saved without one are measured now
+                    cls._measure()
+            cls._evict()
+        return super().use(*args, **kwargs)
+
+    @classmethod
+    def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        with cls._lock:
+            if not cls._alive(identifier):
+                return None
+            cls._store.move_to_end(identifier)
+            stored = cls._store[identifier]
+        return load_value(stored, cls.copy_policy, serializer or cls.serializer)
+
+    @classmethod
+    def save(
+        cls,
+        identifier: str,
+        value: Any,
+        serializer: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> bool:
+        stored = store_value(value, cls.copy_policy, serializer or cls.serializer)
+        size = cls._size_of(value, stored, serializer)
+        with cls._lock:
+            cls._total_bytes += size - cls._sizes.get(identifier, 0)
+            cls._sizes[identifier] = size
+            cls._store[identifier] = stored
+            cls._store.move_to_end(identifier)
+            ttl = ttl if ttl is not None else cls.ttl
+            if ttl is not None:
+                cls._expires_at[identifier] = time.monotonic() + ttl
+            else:
+                cls._expires_at.pop(identifier, None)
+            cls._evict()
+        return True
+
+    @classmethod
+    def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        stored = []
+        with cls._lock:
+            for identifier in identifiers:
+                if cls._alive(identifier):
+                    cls._store.move_to_end(identifier)
+                    stored.append(cls._store[identifier])
+                else:
+                    stored.append(None)
+        serializer = serializer or cls.serializer
+        return [load_value(value, cls.copy_policy, serializer) for value in stored]
+
+    @classmethod
+    def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        with cls._lock:
+            for identifier, value in values.items():
+                cls.save(identifier, value, serializer)
+        return True
+
+    @classmethod
+    def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        with cls._lock:
+            return [cls._alive(identifier) for identifier in identifiers]
+
+    @classmethod
+    def exists(cls, identifier: str) -> bool:
+        with cls._lock:
+            return cls._alive(identifier)
+
+    @classmethod
+    def expire(cls, identifier: str, ttl: Optional[float]) -> bool:
+        """
+        Set the time to live of an entry.
+        :param identifier: The identifier of the hook
+        :param ttl: The time to live in seconds from now, None to never expire
+        :return: True if the entry exists
+        """
+        with cls._lock:
+            if not cls._alive(identifier):
+                return False
+            if ttl is None:
+                cls._expires_at.pop(identifier, None)
+            else:
+                cls._expires_at[identifier] = time.monotonic() + ttl
+            return True
+
+    @classmethod
+    def delete(cls, identifier: str) -> bool:
+        with cls._lock:
+            if not cls._alive(identifier):
+                return False
+            cls._remove(identifier)
+            return True
+
+    @classmethod
+    def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        with cls._lock:
+            identifiers = (
+                list(cls._store)
+                if namespace is None
+                else list(cls._namespaces.get(namespace, ()))
+            )
+            return [identifier for identifier in identifiers if cls._alive(identifier)]
+
+    @classmethod
+    def track(cls, namespace: str, identifier: str) -> None:
+        with cls._lock:
+            cls._namespaces.setdefault(namespace, set()).add(identifier)
+            cls._identifier_namespaces.setdefault(identifier, set()).add(namespace)
+
+    @classmethod
+    def clear_namespace(cls, namespace: str) -> None:
+        with cls._lock:
+            for identifier in list(cls._namespaces.get(namespace, ())):
+                cls._remove(identifier)
+            cls._namespaces.pop(namespace, None)
+
+    @classmethod
+    def reset_backend(cls) -> None:
+        with cls._lock:
+            cls._store.clear()
+            cls._namespaces.clear()
+            cls._identifier_namespaces.clear()
+            cls._sizes.clear()
+            cls._expires_at.clear()
+            cls._total_bytes = 0
+
+    @classmethod
+    def restore(cls, path: str, lazy: bool = False) -> int:
+        # Lazily restored state would bypass the size limits, so it is always restored right away
+        return super().restore(path)
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        """
+        Get the usage and eviction counters of the backend.
+        :return: The number of entries, their total size, and the number of entries evicted and expired so far
+        """
+        with cls._lock:
+            return {
+                "entries": len(cls._store),
+                "bytes": cls._total_bytes,
+                "evictions": cls._evictions,
+                "expirations": cls._expirations,
+            }
+
+    @classmethod
+    def _size_of(cls, value: Any, stored: Any, serializer: Optional[str]) -> int:
+        if cls.max_bytes is None:
+            return 0
+        if cls.copy_policy == PICKLE_POLICY:
+            return len(stored)
+        return len(get_serializer(serializer or cls.serializer).dumps(value))
+
+    @classmethod
+    def _measure(cls) -> None:
+        # The stored object is the value itself unless it is pickled, in which case only its length is used
+        cls._sizes.clear()
+        for identifier, stored in cls._store.items():
+            cls._sizes[identifier] = cls._size_of(stored, stored, None)
+        cls._total_bytes = sum(cls._sizes.values())
+
+    @classmethod
+    def _alive(cls, identifier: str) -> bool:
+        if identifier not in cls._store:
+            return False
+        expires_at = cls._expires_at.get(identifier)
+        if expires_at is not None and expires_at <= time.monotonic():
+            cls._remove(identifier)
+            cls._expirations += 1
+            return False
+        return True
+
+    @classmethod
+    def _remove(cls, identifier: str) -> None:
+        del cls._store[identifier]
+        cls._total_bytes -= cls._sizes.pop(identifier, 0)
+        cls._expires_at.pop(identifier, None)
+        for namespace in cls._identifier_namespaces.pop(identifier, ()):
+            identifiers = cls._namespaces.get(namespace)
+            if identifiers is not None:
+                identifiers.discard(identifier)
+                if not identifiers:
+                    del cls._namespaces[namespace]
+
+    @classmethod
+    def _evict(cls) -> None:
+        # The most recently saved entry is never evicted, even if it is bigger than max_bytes on its own
+        while len(cls._store) > 1 and (
+            (cls.max_entries is not None and len(cls._store) > cls.max_entries)
+            or (cls.max_bytes is not None and cls._total_bytes > cls.max_bytes)
+        ):
+            cls._remove(next(iter(cls._store)))
+            cls._evictions += 1
@@ -0,0 +1,244 @@
+from typing import Any, Callable, Optional
+
+import threading
+from weakref import WeakValueDictionary
+
+from .copy_policy import load_value, store_value
+from .memory_backend import MemoryBackend
+
+DEFAULT_SHARDS = 64
+
+
+class _Shard:
+    __slots__ = ("lock", "store", "update_locks")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.store: dict[str, Any] = {}
+        self.update_locks: "WeakValueDictionary[str, Any]" = WeakValueDictionary()
+
+
+class ConcurrentBackend(MemoryBackend):
+    """
+    An in-memory backend shared by all the threads of the process. The state is split between shards by the hash of
+    the identifiers, and every shard has its own lock, so threads using different hooks rarely contend. The locks make
+    the backend safe on free-threaded builds of CPython as well, where plain dicts are not protected by the GIL.
+    """
+
+    # The shards and the mask of their indexes, always replaced together so they never disagree
+    _layout: tuple[list[_Shard], int] = (
+        [_Shard() for _ in range(DEFAULT_SHARDS)],
+        DEFAULT_SHARDS - 1,
+    )
+    _layout_lock = threading.Lock()
+    _namespaces: dict[str, set[str]] = {}
+    _namespaces_lock = threading.Lock()
+
+    @classmethod
+    def use(cls, *args: Any, shards: Optional[int] = None, **kwargs: Any) -> Any:
+        # Changing the number of shards moves the state to new shards, it should be done before serving requests
+        if shards is not None and shards != len(cls._layout[0]):
+            cls._reshard(shards)
+        return super().use(*args, **kwargs)
+
+    @classmethod
+    def _shard(cls, identifier: str) -> _Shard:
+        shards, mask = cls._layout
+        return shards[hash(identifier) & mask]
+
+    @classmethod
+    def _reshard(cls, shards: int) -> None:
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError(
+                f"The number of shards must be a power of two, not {shards}"
+            )
+        with cls._layout_lock:
+            old_shards = cls._layout[0]
+            for shard in old_shards:
+                shard.lock.acquire()
+            try:
+                new_shards = [_Shard() for _ in range(shards)]
+                for shard in old_shards:
+                    for identifier, stored in shard.store.items():
+                        new_shards[hash(identifier) & (shards - 1)].store[
+                            identifier
+                        ] = stored
+                cls._layout = (new_shards, shards - 1)
+            finally:
+                for shard in old_shards:
+                    shard.lock.release()
+
+    @classmethod
+    def _group(cls, identifiers: Any) -> list[tuple[_Shard, list[str]]]:
+        shards, mask = cls._layout
+        groups: dict[int, list[str]] = {}
+        for identifier in identifiers:
+            groups.setdefault(hash(identifier) & mask, []).append(identifier)
+        return [(shards[index], group) for index, group in groups.items()]
+
+    @classmethod
+    def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        shard = cls._shard(identifier)
+        with shard.lock:
+            stored = shard.store.get(identifier)
+        return load_value(stored, cls.copy_policy, serializer or cls.serializer)
+
+    @classmethod
+    def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        stored = store_value(value, cls.copy_policy, serializer or cls.serializer)
+        shard = cls._shard(identifier)
+        with shard.lock:
+            shard.store[identifier] = stored
+        return True
+
+    @classmethod
+    def exists(cls, identifier: str) -> bool:
+        shard = cls._shard(identifier)
+        with shard.lock:
+            return identifier in shard.store
+
+    @classmethod
+    def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        serializer = serializer or cls.serializer
+        shard = cls._shard(identifier)
+        with shard.lock:
+            if identifier in shard.store:
+                stored = shard.store[identifier]
+            else:
+                shard.store[identifier] = store_value(
+                    default, cls.copy_policy, serializer
+                )
+                return default
+        return load_value(stored, cls.copy_policy, serializer)
+
+    @classmethod
+    def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        serializer = serializer or cls.serializer
+        shard = cls._shard(identifier)
+        with shard.lock:
+            lock = shard.update_locks.get(identifier)
+            if lock is None:
+                lock = shard.update_locks[identifier] = threading.Lock()
+        # The function runs without holding the shard lock, so it may use other hooks of the shard
+        with lock:
+            with shard.lock:
+                stored = shard.store.get(identifier)
+            value = function(load_value(stored, cls.copy_policy, serializer))
+            stored = store_value(value, cls.copy_policy, serializer)
+            with shard.lock:
+                shard.store[identifier] = stored
+        return value
+
+    @classmethod
+    def load_fields(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        return cls.load(identifier, serializer)
+
+    @classmethod
+    def save_fields(
+        cls, identifier: str, fields: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        # Merged under the update lock of the hook, so concurrent writes of different fields are not lost
+        cls.update(
+            identifier, lambda current: {**(current or {}), **fields}, serializer
+        )
+        return True
+
+    @classmethod
+    def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        stored: dict[str, Any] = {}
+        for shard, group in cls._group(identifiers):
+            with shard.lock:
+                for identifier in group:
+                    stored[identifier] = shard.store.get(identifier)
+        serializer = serializer or cls.serializer
+        return [
+            load_value(stored[identifier], cls.copy_policy, serializer)
+            for identifier in identifiers
+        ]
+
+    @classmethod
+    def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        serializer = serializer or cls.serializer
+        for shard, group in cls._group(values):
+            stored = {
+                identifier: store_value(values[identifier], cls.copy_policy, serializer)
+                for identifier in group
+            }
+            with shard.lock:
+                shard.store.update(stored)
+        return True
+
+    @classmethod
+    def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        found: set[str] = set()
+        for shard, group in cls._group(identifiers):
+            with shard.lock:
+                found.update(
+                    identifier for identifier in group if identifier in shard.store
+                )
+        return [identifier in found for identifier in identifiers]
+
+    @classmethod
+    def delete(cls, identifier: str) -> bool:
+        shard = cls._shard(identifier)
+        with shard.lock:
+            if identifier not in shard.store:
+                return False
+            del shard.store[identifier]
+            return True
+
+    @classmethod
+    def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        if namespace is not None:
+            with cls._namespaces_lock:
+                identifiers = list(cls._namespaces.get(namespace, ()))
+            return [
+                identifier
+                for identifier, exists in zip(identifiers, cls.exists_many(identifiers))
+                if exists
+            ]
+        identifiers = []
+        for shard in cls._layout[0]:
+            with shard.lock:
+                identifiers.extend(shard.store)
+        return identifiers
+
+    @classmethod
+    def track(cls, namespace: str, identifier: str) -> None:
+        with cls._namespaces_lock:
+            cls._namespaces.setdefault(namespace, set()).add(identifier)
+
+    @classmethod
+    def clear_namespace(cls, namespace: str) -> None:
+        with cls._namespaces_lock:
+            identifiers = cls._namespaces.pop(namespace, ())
+        for shard, group in cls._group(identifiers):
+            with shard.lock:
+                for identifier in group:
+                    shard.store.pop(identifier, None)
+
+    @classmethod
+    def reset_backend(cls) -> None:
+        for shard in cls._layout[0]:
+            with shard.lock:
+                shard.store.clear()
+        with cls._namespaces_lock:
+            cls._namespaces.clear()
+
+    @classmethod
+    def restore(cls, path: str, lazy: bool = False) -> int:
+        # The state is kept in the shards, so it is always restored right away
+        return super().restore(path)
@@ -0,0 +1,115 @@
+from typing import Any, Optional
+
+import copy
+
+from .serializers import get_serializer
+
+# The state is serialized on every save and deserialized on every load, so callers never share objects with the backend
+PICKLE_POLICY = "pickle"
+# The state is shallow copied when it is saved and returned by reference when it is loaded
+COPY_POLICY = "copy"
+# Only immutable state is accepted, it is stored and returned by reference
+FREEZE_POLICY = "freeze"
+# The state is stored and returned by reference, the caller is trusted not to mutate it
+TRUST_POLICY = "trust"
+
+COPY_POLICIES = (PICKLE_POLICY, COPY_POLICY, FREEZE_POLICY, TRUST_POLICY)
+
+IMMUTABLE_TYPES = (
+    type(None),
+    bool,
+    int,
+    float,
+    complex,
+    str,
+    bytes,
+    range,
+    type(Ellipsis),
+)
+
+
+def validate_copy_policy(policy: str) -> str:
+    """
+    Make sure a copy policy is known.
+    :param policy: The copy policy
+    :return: The copy policy
+    """
+    if policy not in COPY_POLICIES:
+        raise ValueError(
+            f"Unknown copy policy '{policy}', use one of {', '.join(COPY_POLICIES)}"
+        )
+    return policy
+
+
+def is_immutable(value: Any) -> bool:
+    """
+    Check whether a value is deeply immutable, tuples and frozensets are immutable only if all their items are.
+    :param value: The value to check
+    :return: True if the value is immutable
+    """
+    if isinstance(value, IMMUTABLE_TYPES):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(is_immutable(item) for item in value)
+    return False
+
+
+def backend_copy_policy(backend: Any) -> str:
+    """
+    Get the copy policy of a backend. Async adapters have the policy of the backend they wrap, and backends without a
+    policy serialize the state.
+    :param backend: The backend
+    :return: The copy policy
+    """
+    return getattr(getattr(backend, "backend", backend), "copy_policy", PICKLE_POLICY)
+
+
+def detach_value(value: Any, backend: Any) -> Any:
+    """
+    Deep copy a value before a hook saves it, if the backend keeps it by reference, so that later mutations of the
+    value by the caller are noticed (e.g. the dependencies of use_effect). Values that cannot be copied are saved as
+    they are.
+    :param value: The value to save
+    :param backend: The backend the value is saved to
+    :return: The value to save
+    """
+    if backend_copy_policy(backend) not in (COPY_POLICY, TRUST_POLICY):
+        return value
+    try:
+        return copy.deepcopy(value)
+    except (TypeError, copy.Error):
+        return value
+
+
+def store_value(value: Any, policy: str, serializer: Optional[str] = None) -> Any:
+    """
+    Prepare a value to be stored by an in-memory backend according to the copy policy.
+    :param value: The value to store
+    :param policy: The copy policy of the backend
+    :param serializer: The serializer to use with the pickle policy
+    :return: The object to keep in the backend
+    """
+    if policy == TRUST_POLICY:
+        return value
+    if policy == COPY_POLICY:
+        return value if isinstance(value, IMMUTABLE_TYPES) else copy.copy(value)
+    if policy == FREEZE_POLICY:
+        if not is_immutable(value):
+            raise TypeError(
+                f"Cannot store a mutable {type(value).__name__} with the '{FREEZE_POLICY}' copy policy"
+            )
+        return value
+    return get_serializer(serializer).dumps(value)
+
+
+def load_value(stored: Any, policy: str, serializer: Optional[str] = None) -> Any:
+    """
+    Get back a value stored by an in-memory backend according to the copy policy.
+    :param stored: The object kept in the backend
+    :param policy: The copy policy of the backend
+    :param serializer: The serializer to use with the pickle policy
+    :return: The value
+    """
+    if policy == PICKLE_POLICY:
+        return get_serializer(serializer).loads(stored)
+    return stored
@@ -1,33 +1,232 @@
-from typing import Any, TypeVar
+from typing import Any, Callable, Optional, TypeVar
 
-# Extend pickle to support lambdas
-import dill as pickle
+import threading
+from collections.abc import Iterable
+from weakref import WeakValueDictionary
 
+from .copy_policy import COPY_POLICY, load_value, store_value, validate_copy_policy
 from .interface import HooksBackend
+from .serializers import DEFAULT_SERIALIZER, get_serializer
+from .snapshot import Snapshot
 
 T = TypeVar("T")
-BACKEND_KEY = "__hooks_backend__"
+
+_MISSING = object()
 
 
 class MemoryBackend(HooksBackend):
+    blocking = False
+
+    # State never leaves the process, so by default it is stored by reference and only shallow copied on save
+    copy_policy: str = COPY_POLICY
+    # Only used with the pickle copy policy
+    serializer: str = DEFAULT_SERIALIZER
+
+    # The state of every hook by identifier
+    _store: dict[str, Any] = {}
+    # The identifiers that belong to every namespace, so they can be listed and cleared without scanning the store
+    _namespaces: dict[str, set[str]] = {}
+    # Makes the bulk operations see and write a consistent snapshot of the store
+    _lock = threading.RLock()
+    # The locks of the hooks being updated, dropped once no update holds them
+    _update_locks: "WeakValueDictionary[str, Any]" = WeakValueDictionary()
+    # A lazily restored snapshot, the state of a hook is moved to the store the first time the hook is used
+    _snapshot: Optional[Snapshot] = None
+
+    @classmethod
+    def use(
+        cls,
+        *args: Any,
+        copy_policy: Optional[str] = None,
+        serializer: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if copy_policy is not None:
+            cls.copy_policy = validate_copy_policy(copy_policy)
+        if serializer is not None:
+            get_serializer(serializer)
+            cls.serializer = serializer
+        return super().use(*args, **kwargs)
+
     @classmethod
-    def load(cls, identifier: str) -> Any:
-        return pickle.loads(globals().get(BACKEND_KEY + identifier))
+    def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        stored = cls._store.get(identifier)
+        if stored is None and cls._snapshot is not None and cls._restore(identifier):
+            stored = cls._store[identifier]
+        return load_value(stored, cls.copy_policy, serializer or cls.serializer)
 
     @classmethod
-    def save(cls, identifier: str, value: Any) -> bool:
-        globals()[BACKEND_KEY + identifier] = pickle.dumps(value)
+    def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        cls._store[identifier] = store_value(
+            value, cls.copy_policy, serializer or cls.serializer
+        )
+        if cls._snapshot is not None:
+            cls._discard([identifier])
         return True
 
     @classmethod
     def exists(cls, identifier: str) -> bool:
-        return BACKEND_KEY + identifier in globals()
+        return identifier in cls._store or (
+            cls._snapshot is not None and cls._restore(identifier)
+        )
+
+    @classmethod
+    def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        with cls._lock:
+            lock = cls._update_locks.get(identifier)
+            if lock is None:
+                lock = cls._update_locks[identifier] = threading.Lock()
+        with lock:
+            current = (
+                cls.load(identifier, serializer) if cls.exists(identifier) else None
+            )
+            value = function(current)
+            cls.save(identifier, value, serializer)
+        return value
+
+    @classmethod
+    def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        serializer = serializer or cls.serializer
+        with cls._lock:
+            if cls._snapshot is not None:
+                cls._restore_many(identifiers)
+            stored = [cls._store.get(identifier) for identifier in identifiers]
+        return [load_value(value, cls.copy_policy, serializer) for value in stored]
+
+    @classmethod
+    def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        serializer = serializer or cls.serializer
+        stored = {
+            identifier: store_value(value, cls.copy_policy, serializer)
+            for identifier, value in values.items()
+        }
+        with cls._lock:
+            cls._store.update(stored)
+            if cls._snapshot is not None:
+                cls._discard(stored)
+        return True
+
+    @classmethod
+    def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        with cls._lock:
+            if cls._snapshot is not None:
+                cls._restore_many(identifiers)
+            return [identifier in cls._store for identifier in identifiers]
+
+    @classmethod
+    def load_fields(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        return cls.load(identifier, serializer)
+
+    @classmethod
+    def save_fields(
+        cls, identifier: str, fields: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        # Merged under the lock, so concurrent writes of different fields are not lost
+        with cls._lock:
+            current = cls.load(identifier, serializer)
+            return cls.save(identifier, {**(current or {}), **fields}, serializer)
+
+    @classmethod
+    def delete(cls, identifier: str) -> bool:
+        with cls._lock:
+            deleted = cls._store.pop(identifier, _MISSING) is not _MISSING
+            if cls._snapshot is not None and identifier in cls._snapshot:
+                cls._discard([identifier])
+                deleted = True
+            return deleted
+
+    @classmethod
+    def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        if namespace is None:
+            if cls._snapshot is not None:
+                return list(cls._store) + [
+                    identifier
+                    for identifier in cls._snapshot.keys()
+                    if identifier not in cls._store
+                ]
+            return list(cls._store)
+        return [
+            identifier
+            for identifier in cls._namespaces.get(namespace, ())
+            if cls.exists(identifier)
+        ]
+
+    @classmethod
+    def track(cls, namespace: str, identifier: str) -> None:
+        cls._namespaces.setdefault(namespace, set()).add(identifier)
+
+    @classmethod
+    def clear_namespace(cls, namespace: str) -> None:
+        for identifier in cls._namespaces.pop(namespace, ()):
+            cls._store.pop(identifier, None)
+            if cls._snapshot is not None:
+                cls._snapshot.discard(identifier)
 
     @classmethod
     def reset_backend(cls) -> None:
-        keys = []
-        for key, value in globals().items():
-            if key.startswith(BACKEND_KEY):
-                keys.append(key)
-        for key in keys:
-            del globals()[key]
+        cls._store.clear()
+        cls._namespaces.clear()
+        cls._close_snapshot()
+
+    @classmethod
+    def restore(cls, path: str, lazy: bool = False) -> int:
+        if not lazy:
+            return super().restore(path)
+        snapshot = Snapshot(path)
+        with cls._lock:
+            cls._close_snapshot()
+            # The state in the snapshot replaces the state of the same hooks in the store
+            for identifier in snapshot.keys():
+                cls._store.pop(identifier, None)
+            cls._snapshot = snapshot
+        return len(snapshot)
+
+    @classmethod
+    def _restore(cls, identifier: str) -> bool:
+        with cls._lock:
+            snapshot = cls._snapshot
+            if snapshot is None:
+                return identifier in cls._store
+            restored, value = snapshot.pop(identifier)
+            if restored:
+                cls._store[identifier] = store_value(
+                    value, cls.copy_policy, cls.serializer
+                )
+            if not len(snapshot):
+                cls._close_snapshot()
+            return restored
+
+    @classmethod
+    def _restore_many(cls, identifiers: list[str]) -> None:
+        for identifier in identifiers:
+            if identifier not in cls._store:
+                cls._restore(identifier)
+
+    @classmethod
+    def _discard(cls, identifiers: Iterable[str]) -> None:
+        # The state written to the store replaces the state in the snapshot, it must never be restored over it
+        with cls._lock:
+            snapshot = cls._snapshot
+            if snapshot is None:
+                return
+            for identifier in identifiers:
+                snapshot.discard(identifier)
+            if not len(snapshot):
+                cls._close_snapshot()
+
+    @classmethod
+    def _close_snapshot(cls) -> None:
+        if cls._snapshot is not None:
+            cls._snapshot.close()
+            cls._snapshot = None
@@ -1,48 +1,307 @@
-from typing import Any, TypeVar
+from typing import Any, Callable, Optional, TypeVar
 
-from functools import lru_cache
+import weakref
 
-from .async_interface import AsyncHooksBackend
-from .interface import HooksBackend
+from .copy_policy import TRUST_POLICY
+from .snapshot import Snapshot, write_snapshot
 
 T = TypeVar("T")
 
+# Marks the identifiers without state, None is a valid state
+_MISSING = object()
 
-@lru_cache(maxsize=None)
-def python_object_backend_factory(wrapped_cls: type[T]) -> type[HooksBackend]:
-    class PythonObjectHooksBackend(HooksBackend):
-        @classmethod
-        def load(cls, identifier: str) -> Any:
-            return getattr(wrapped_cls, identifier)
+# Objects that cannot be weakly referenced keep their state in this attribute instead
+STATE_ATTRIBUTE = "__hooks_state__"
 
-        @classmethod
-        def save(cls, identifier: str, value: Any) -> bool:
-            setattr(wrapped_cls, identifier, value)
-            return True
+# The backends of the objects with instance scoped state by object id, an entry is dropped when its object is
+# garbage collected, before the id can be reused
+_backends: dict[int, "PythonObjectHooksBackend"] = {}
+_async_backends: dict[int, "AsyncPythonObjectHooksBackend"] = {}
 
-        @classmethod
-        def exists(cls, identifier: str) -> bool:
-            return hasattr(wrapped_cls, identifier)
+# Objects that can neither be weakly referenced nor given an attribute (__slots__ without __weakref__) are kept alive
+# by this table with their state, so their id is never reused, until release_object_state is called
+_pinned: dict[int, tuple[Any, dict[str, Any]]] = {}
 
-    return PythonObjectHooksBackend
 
+class _ObjectStateBackend:
+    """
+    Keeps the state of the hooks called from the methods of an object. The state of every object is a single dict kept
+    in a side table, so the object is not modified and may use __slots__, and the state is released together with the
+    object (see release_object_state for objects that cannot be weakly referenced). The synchronous and asynchronous
+    backends of an object share its dict, and both implement the whole backend interface on top of the operations of
+    this class. Serializers are ignored, the state never leaves the process.
+    """
 
-@lru_cache(maxsize=None)
-def async_python_object_backend_factory(
-    wrapped_cls: type[T],
-) -> type[AsyncHooksBackend]:
-    class AsyncPythonObjectHooksBackend(AsyncHooksBackend):
-        @classmethod
-        async def load(cls, identifier: str) -> Any:
-            return getattr(wrapped_cls, identifier)
+    __slots__ = ("state",)
+    blocking = False
+    # The state is kept by reference
+    copy_policy = TRUST_POLICY
 
-        @classmethod
-        async def save(cls, identifier: str, value: Any) -> bool:
-            setattr(wrapped_cls, identifier, value)
-            return True
+    def __init__(self, state: dict[str, Any]) -> None:
+        self.state = state
 
-        @classmethod
-        async def exists(cls, identifier: str) -> bool:
-            return hasattr(wrapped_cls, identifier)
+    def _update(self, identifier: str, function: Callable[[Any], Any]) -> Any:
+        value = self.state[identifier] = function(self.state.get(identifier))
+        return value
 
-    return AsyncPythonObjectHooksBackend
+    def _save_fields(self, identifier: str, fields: dict[str, Any]) -> bool:
+        # The current dict may be shared with the caller (e.g. the default state), so it is replaced, not mutated
+        self.state[identifier] = {**(self.state.get(identifier) or {}), **fields}
+        return True
+
+    def _delete(self, identifier: str) -> bool:
+        return self.state.pop(identifier, _MISSING) is not _MISSING
+
+    def _keys(self, namespace: Optional[str]) -> list[str]:
+        if namespace is not None:
+            raise NotImplementedError
+        return list(self.state)
+
+    def _snapshot(self, path: str, serializer: Optional[str]) -> int:
+        return write_snapshot(path, list(self.state.items()), serializer)
+
+    def _restore(self, path: str) -> int:
+        with Snapshot(path) as snapshot:
+            self.state.update(snapshot.items())
+            return len(snapshot)
+
+
+class PythonObjectHooksBackend(_ObjectStateBackend):
+    """
+    The backend of the state of the hooks called from the methods of an object.
+    """
+
+    __slots__ = ()
+
+    def load(self, identifier: str, serializer: Optional[str] = None) -> Any:
+        return self.state.get(identifier)
+
+    def save(
+        self, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        self.state[identifier] = value
+        return True
+
+    def exists(self, identifier: str) -> bool:
+        return identifier in self.state
+
+    def load_or_init(
+        self, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        return self.state.setdefault(identifier, default)
+
+    def update(
+        self,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        return self._update(identifier, function)
+
+    def load_many(
+        self, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        return [self.state.get(identifier) for identifier in identifiers]
+
+    def save_many(
+        self, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        self.state.update(values)
+        return True
+
+    def exists_many(self, identifiers: list[str]) -> list[bool]:
+        return [identifier in self.state for identifier in identifiers]
+
+    def load_fields(self, identifier: str, serializer: Optional[str] = None) -> Any:
+        return self.state.get(identifier)
+
+    def load_or_init_fields(
+        self, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        return self.state.setdefault(identifier, default)
+
+    def save_fields(
+        self, identifier: str, fields: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        return self._save_fields(identifier, fields)
+
+    def delete(self, identifier: str) -> bool:
+        return self._delete(identifier)
+
+    def delete_many(self, identifiers: list[str]) -> int:
+        return sum(self._delete(identifier) for identifier in identifiers)
+
+    def keys(self, namespace: Optional[str] = None) -> list[str]:
+        return self._keys(namespace)
+
+    def track(self, namespace: str, identifier: str) -> None:
+        raise NotImplementedError
+
+    def track_many(self, namespace: str, identifiers: list[str]) -> None:
+        raise NotImplementedError
+
+    def clear_namespace(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    def snapshot(self, path: str, serializer: Optional[str] = None) -> int:
+        return self._snapshot(path, serializer)
+
+    def restore(self, path: str, lazy: bool = False) -> int:
+        return self._restore(path)
+
+    def reset_backend(self) -> None:
+        self.state.clear()
+
+
+class AsyncPythonObjectHooksBackend(_ObjectStateBackend):
+    """
+    The asynchronous backend of the state of the hooks called from the methods of an object.
+    """
+
+    __slots__ = ()
+
+    async def load(self, identifier: str, serializer: Optional[str] = None) -> Any:
+        return self.state.get(identifier)
+
+    async def save(
+        self, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        self.state[identifier] = value
+        return True
+
+    async def exists(self, identifier: str) -> bool:
+        return identifier in self.state
+
+    async def load_or_init(
+        self, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        return self.state.setdefault(identifier, default)
+
+    async def update(
+        self,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        return self._update(identifier, function)
+
+    async def load_many(
+        self, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        return [self.state.get(identifier) for identifier in identifiers]
+
+    async def save_many(
+        self, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        self.state.update(values)
+        return True
+
+    async def exists_many(self, identifiers: list[str]) -> list[bool]:
+        return [identifier in self.state for identifier in identifiers]
+
+    async def load_fields(
+        self, identifier: str, serializer: Optional[str] = None
+    ) -> Any:
+        return self.state.get(identifier)
+
+    async def load_or_init_fields(
+        self, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        return self.state.setdefault(identifier, default)
+
+    async def save_fields(
+        self, identifier: str, fields: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        return self._save_fields(identifier, fields)
+
+    async def delete(self, identifier: str) -> bool:
+        return self._delete(identifier)
+
+    async def delete_many(self, identifiers: list[str]) -> int:
+        return sum(self._delete(identifier) for identifier in identifiers)
+
+    async def keys(self, namespace: Optional[str] = None) -> list[str]:
+        return self._keys(namespace)
+
+    async def track(self, namespace: str, identifier: str) -> None:
+        raise NotImplementedError
+
+    async def track_many(self, namespace: str, identifiers: list[str]) -> None:
+        raise NotImplementedError
+
+    async def clear_namespace(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    async def snapshot(self, path: str, serializer: Optional[str] = None) -> int:
+        return self._snapshot(path, serializer)
+
+    async def restore(self, path: str, lazy: bool = False) -> int:
+        return self._restore(path)
+
+    async def reset_backend(self) -> None:
+        self.state.clear()
+
+
+def _object_state(owner: Any) -> dict[str, Any]:
+    sync_backend = _backends.get(id(owner))
+    if sync_backend is not None:
+        return sync_backend.state
+    async_backend = _async_backends.get(id(owner))
+    if async_backend is not None:
+        return async_backend.state
+    try:
+        finalizer = weakref.finalize(owner, _forget, id(owner))
+    except TypeError:
+        try:
+            return vars(owner).setdefault(STATE_ATTRIBUTE, {})
+        except TypeError:
+            # Nothing tells when the object is collected, so it lives as long as its state
+            return _pinned.setdefault(id(owner), (owner, {}))[1]
+    # Nothing to clean up when the process exits
+    finalizer.atexit = False
+    return {}
+
+
+def _forget(owner_id: int) -> None:
+    _backends.pop(owner_id, None)
+    _async_backends.pop(owner_id, None)
+
+
+def release_object_state(owner: Any) -> None:
+    """
+    Release the state the hooks keep for an object. The state of most objects is released together with the object,
+    but objects with __slots__ and without __weakref__ are kept alive with their state until they are released.
+    :param owner: The object
+    """
+    _forget(id(owner))
+    _pinned.pop(id(owner), None)
+    if hasattr(owner, "__dict__"):
+        vars(owner).pop(STATE_ATTRIBUTE, None)
+
+
+def python_object_backend_factory(owner: T) -> PythonObjectHooksBackend:
+    """
+    Get the backend of the state of the hooks called from the methods of an object.
+    :param owner: The object
+    :return: The backend
+    """
+    backend = _backends.get(id(owner))
+    if backend is None:
+        backend = PythonObjectHooksBackend(_object_state(owner))
+        if STATE_ATTRIBUTE not in getattr(owner, "__dict__", ()):
+            _backends[id(owner)] = backend
+    return backend
+
+
+def async_python_object_backend_factory(owner: T) -> AsyncPythonObjectHooksBackend:
+    """
+    Get the asynchronous backend of the state of the hooks called from the methods of an object.
+    :param owner: The object
+    :return: The backend
+    """
+    backend = _async_backends.get(id(owner))
+    if backend is None:
+        backend = AsyncPythonObjectHooksBackend(_object_state(owner))
+        if STATE_ATTRIBUTE not in getattr(owner, "__dict__", ()):
+            _async_backends[id(owner)] = backend
+    return backend
@@ -0,0 +1,198 @@
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import json
+import marshal
+import pickle
+
+# Extend pickle to support lambdas
+import dill
+
+# Every pickle stream of protocol 2 and above starts with the PROTO opcode, marshal streams never do
+PICKLE_PROTO = 0x80
+MARSHAL_VERSION = 4
+PICKLE_PROTOCOL = 5
+
+
+# The types marshal writes back exactly, subclasses and other buffers (bytearray, memoryview, array...) would come back
+# as one of these types
+PRIMITIVE_TYPES = frozenset(
+    (type(None), bool, int, float, complex, str, bytes, type(Ellipsis))
+)
+CONTAINER_TYPES = frozenset((list, tuple, set, frozenset))
+
+
+def is_primitive(value: Any) -> bool:
+    """
+    Check whether a value round-trips through marshal unchanged: a primitive of an exact primitive type, or a list,
+    tuple, set or dict of such values.
+    :param value: The value to check
+    :return: True if the value can be serialized with the primitive fast path
+    """
+    value_type = type(value)
+    if value_type in PRIMITIVE_TYPES:
+        return True
+    try:
+        if value_type in CONTAINER_TYPES:
+            return all(map(is_primitive, value))
+        if value_type is dict:
+            return all(map(is_primitive, value)) and all(
+                map(is_primitive, value.values())
+            )
+    except RecursionError:
+        pass
+    return False
+
+
+class Serializer(SimpleNamespace):
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        raise NotImplementedError
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class DillSerializer(Serializer):
+    """
+    Serializes anything dill supports, including lambdas and closures. This is the slowest serializer.
+    """
+
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        return dill.dumps(value)
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        return dill.loads(data)
+
+
+class PickleSerializer(Serializer):
+    """
+    Serializes with the standard library pickle, using protocol 5.
+    """
+
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=PICKLE_PROTOCOL)
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class PrimitiveSerializer(Serializer):
+    """
+    A fast path for primitives (None, bool, int, float, str, bytes...) and lists, tuples, sets and dicts of
+    primitives. Values of any other type are rejected with a ValueError.
+    """
+
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        if not is_primitive(value):
+            raise ValueError(
+                f"{type(value).__name__} values are not supported by the primitive serializer"
+            )
+        return marshal.dumps(value, MARSHAL_VERSION)
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        return marshal.loads(data)
+
+
+class JsonSerializer(Serializer):
+    """
+    Serializes to JSON, for state that is shared with other languages.
+    """
+
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """
+    Serializes to MessagePack, for state that is shared with other languages. Requires msgpack to be installed.
+    """
+
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        return cls._msgpack().packb(value)
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        return cls._msgpack().unpackb(data, strict_map_key=False)
+
+    @classmethod
+    def _msgpack(cls) -> Any:
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("Msgpack serializer requires msgpack to be installed")
+        return msgpack
+
+
+class AutoSerializer(Serializer):
+    """
+    Picks the fastest serializer that supports the value: the primitive fast path, then pickle, and finally dill for
+    lambdas and other objects pickle cannot handle. Anything written by pickle or dill can be read back, so state
+    saved by previous versions remains readable.
+    """
+
+    @classmethod
+    def dumps(cls, value: Any) -> bytes:
+        try:
+            return PrimitiveSerializer.dumps(value)
+        except ValueError:
+            pass
+        try:
+            return PickleSerializer.dumps(value)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return DillSerializer.dumps(value)
+
+    @classmethod
+    def loads(cls, data: bytes) -> Any:
+        if data[0] == PICKLE_PROTO:
+            # dill streams are pickle streams that reference dill's own reconstructors
+            return pickle.loads(data)
+        return PrimitiveSerializer.loads(data)
+
+
+DEFAULT_SERIALIZER = "auto"
+
+_serializers: dict[str, type[Serializer]] = {
+    "auto": AutoSerializer,
+    "dill": DillSerializer,
+    "pickle": PickleSerializer,
+    "primitive": PrimitiveSerializer,
+    "json": JsonSerializer,
+    "msgpack": MsgpackSerializer,
+}
+
+
+def register_serializer(name: str, serializer: type[Serializer]) -> None:
+    """
+    Register a serializer so backends and hooks can select it by name.
+    :param name: The name of the serializer
+    :param serializer: The serializer class
+    """
+    _serializers[name] = serializer
+
+
+def get_serializer(name: Optional[str] = None) -> type[Serializer]:
+    """
+    Get a registered serializer by name.
+    :param name: The name of the serializer, the default serializer if None
+    :return: The serializer class
+    """
+    try:
+        return _serializers[name or DEFAULT_SERIALIZER]
+    except KeyError:
+        raise ValueError(
+            f"Unknown serializer '{name}', use one of {', '.join(_serializers)}"
+        )
@@ -0,0 +1,440 @@
+from typing import Any, Callable, Iterator, Optional, cast
+
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+from pyhashxx import hashxx
+
+from .interface import HooksBackend
+from .serializers import DEFAULT_SERIALIZER, get_serializer
+
+try:
+    import fcntl
+except ImportError:
+    # File locks are only available on POSIX, the backend raises when it is used elsewhere
+    fcntl = None  # type: ignore[assignment]
+
+DEFAULT_NAME = "python_hooks"
+DEFAULT_SLOTS = 4096
+DEFAULT_SLOT_SIZE = 4096
+
+MAGIC = b"pyhooks1"
+# Magic, number of slots, size of a slot
+HEADER = struct.Struct("<8sII")
+# State, key length, value length
+SLOT_HEADER = struct.Struct("<BxHI")
+
+EMPTY, USED, DELETED = 0, 1, 2
+
+# The identifiers tracked in a namespace are packed in pages, slots keyed by the prefix, the namespace, a separator and
+# the number of the page. The slot keyed by the prefix and the namespace holds the number of pages
+NAMESPACE_PREFIX = "__hooks_namespace__"
+NAMESPACE_SEPARATOR = "\x00"
+PAGES = struct.Struct("<I")
+
+
+class SharedMemoryBackend(HooksBackend):
+    """
+    State kept in a shared memory segment, so all the workers of a pre-fork server see the same state without a
+    network hop. The segment is a hash table of fixed size slots, every slot holds the identifier and the serialized
+    state of one hook. Access is serialized between processes with a file lock, and between the threads of a process
+    with a regular lock. The segment can be created before forking the workers, or by the first worker that uses it.
+    The file lock relies on fcntl, so the backend is only available on POSIX systems.
+    """
+
+    name: str = DEFAULT_NAME
+    slots: int = DEFAULT_SLOTS
+    slot_size: int = DEFAULT_SLOT_SIZE
+    serializer: str = DEFAULT_SERIALIZER
+
+    _memory: Optional[SharedMemory] = None
+    _lock_file: Optional[int] = None
+    _thread_lock = threading.RLock()
+    _depth: int = 0
+
+    @classmethod
+    def use(
+        cls,
+        name: Optional[str] = None,
+        *args: Any,
+        slots: Optional[int] = None,
+        slot_size: Optional[int] = None,
+        serializer: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if serializer is not None:
+            get_serializer(serializer)
+            cls.serializer = serializer
+        cls.close()
+        cls.name = name or cls.name
+        cls.slots = slots or cls.slots
+        cls.slot_size = slot_size or cls.slot_size
+        cls._open()
+        return super().use(*args, **kwargs)
+
+    @classmethod
+    def _open(cls) -> SharedMemory:
+        size = HEADER.size + cls.slots * cls.slot_size
+        with cls._locked():
+            try:
+                memory = SharedMemory(cls.name, create=True, size=size)
+                HEADER.pack_into(
+                    cast(memoryview, memory.buf), 0, MAGIC, cls.slots, cls.slot_size
+                )
+            except FileExistsError:
+                memory = SharedMemory(cls.name)
+        # The segment outlives the process that created it, until unlink is called. The tracker knows segments by
+        # their private name, which has a leading slash on POSIX
+        resource_tracker.unregister(memory._name, "shared_memory")  # type: ignore[attr-defined]
+        magic, slots, slot_size = HEADER.unpack_from(cast(memoryview, memory.buf), 0)
+        if (magic, slots, slot_size) != (MAGIC, cls.slots, cls.slot_size):
+            memory.close()
+            raise ValueError(
+                f"Shared memory segment {cls.name} exists with {slots} slots of {slot_size} bytes, "
+                f"not {cls.slots} slots of {cls.slot_size} bytes"
+            )
+        cls._memory = memory
+        _open_backends.add(cls)
+        return memory
+
+    @classmethod
+    def _open_lock_file(cls) -> None:
+        cls._lock_file = os.open(
+            os.path.join(tempfile.gettempdir(), f"{cls.name}.lock"),
+            os.O_RDWR | os.O_CREAT,
+            0o600,
+        )
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # A forked child shares the lock file description of its parent, so it would not exclude the parent
+        cls._thread_lock = threading.RLock()
+        cls._depth = 0
+        if cls._lock_file is not None:
+            os.close(cls._lock_file)
+            cls._open_lock_file()
+
+    @classmethod
+    def close(cls) -> None:
+        """
+        Detach this process from the shared memory segment.
+        """
+        if cls._memory is not None:
+            cls._memory.close()
+            cls._memory = None
+        if cls._lock_file is not None:
+            os.close(cls._lock_file)
+            cls._lock_file = None
+        _open_backends.discard(cls)
+
+    @classmethod
+    def unlink(cls) -> None:
+        """
+        Detach this process from the shared memory segment and remove it, e.g. when the server shuts down.
+        """
+        memory = cls._memory or SharedMemory(cls.name)
+        cls._memory = memory
+        cls.close()
+        # SharedMemory.unlink expects the segment to be tracked
+        resource_tracker.register(memory._name, "shared_memory")  # type: ignore[attr-defined]
+        memory.unlink()
+        try:
+            os.unlink(os.path.join(tempfile.gettempdir(), f"{cls.name}.lock"))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    @contextmanager
+    def _locked(cls) -> Iterator[None]:
+        if fcntl is None:
+            raise NotImplementedError(
+                "SharedMemoryBackend requires fcntl file locks, which are only available on POSIX"
+            )
+        with cls._thread_lock:
+            if cls._lock_file is None:
+                cls._open_lock_file()
+            if cls._depth == 0:
+                fcntl.flock(cast(int, cls._lock_file), fcntl.LOCK_EX)
+            cls._depth += 1
+            try:
+                yield
+            finally:
+                cls._depth -= 1
+                if cls._depth == 0:
+                    fcntl.flock(cast(int, cls._lock_file), fcntl.LOCK_UN)
+
+    @classmethod
+    def _buffer(cls) -> memoryview:
+        memory = cls._memory if cls._memory is not None else cls._open()
+        return cast(memoryview, memory.buf)
+
+    @classmethod
+    def _offset(cls, slot: int) -> int:
+        return HEADER.size + slot * cls.slot_size
+
+    @classmethod
+    def _find(cls, key: bytes) -> tuple[Optional[int], Optional[int]]:
+        """
+        Find the slot of a key by linear probing.
+        :param key: The encoded identifier
+        :return: The slot of the key if it is stored, and the first slot where it can be stored otherwise
+        """
+        buffer = cls._buffer()
+        start = hashxx(key) % cls.slots
+        free = None
+        for probe in range(cls.slots):
+            slot = (start + probe) % cls.slots
+            offset = cls._offset(slot)
+            state, key_length, _ = SLOT_HEADER.unpack_from(buffer, offset)
+            if state == EMPTY:
+                return None, slot if free is None else free
+            if state == DELETED:
+                if free is None:
+                    free = slot
+                continue
+            data_offset = offset + SLOT_HEADER.size
+            if buffer[data_offset : data_offset + key_length] == key:
+                return slot, None
+        return None, free
+
+    @classmethod
+    def _read(cls, key: bytes) -> Optional[bytes]:
+        slot, _ = cls._find(key)
+        if slot is None:
+            return None
+        buffer = cls._buffer()
+        offset = cls._offset(slot)
+        _, key_length, value_length = SLOT_HEADER.unpack_from(buffer, offset)
+        start = offset + SLOT_HEADER.size + key_length
+        return bytes(buffer[start : start + value_length])
+
+    @classmethod
+    def _write(cls, key: bytes, data: bytes) -> None:
+        if SLOT_HEADER.size + len(key) + len(data) > cls.slot_size:
+            raise ValueError(
+                f"The state of {key.decode()} takes {len(data)} bytes, more than a slot of {cls.slot_size} bytes"
+            )
+        slot, free = cls._find(key)
+        if slot is None:
+            if free is None:
+                raise MemoryError(
+                    f"All the {cls.slots} slots of shared memory segment {cls.name} are used"
+                )
+            slot = free
+        buffer = cls._buffer()
+        offset = cls._offset(slot)
+        start = offset + SLOT_HEADER.size
+        buffer[start : start + len(key)] = key
+        buffer[start + len(key) : start + len(key) + len(data)] = data
+        SLOT_HEADER.pack_into(buffer, offset, USED, len(key), len(data))
+
+    @classmethod
+    def _remove(cls, key: bytes) -> bool:
+        slot, _ = cls._find(key)
+        if slot is None:
+            return False
+        SLOT_HEADER.pack_into(cls._buffer(), cls._offset(slot), DELETED, 0, 0)
+        return True
+
+    @classmethod
+    def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        with cls._locked():
+            data = cls._read(identifier.encode())
+        if data is None:
+            return None
+        return get_serializer(serializer or cls.serializer).loads(data)
+
+    @classmethod
+    def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        data = get_serializer(serializer or cls.serializer).dumps(value)
+        with cls._locked():
+            cls._write(identifier.encode(), data)
+        return True
+
+    @classmethod
+    def exists(cls, identifier: str) -> bool:
+        with cls._locked():
+            return cls._find(identifier.encode())[0] is not None
+
+    @classmethod
+    def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        _serializer = get_serializer(serializer or cls.serializer)
+        key = identifier.encode()
+        with cls._locked():
+            data = cls._read(key)
+            if data is None:
+                cls._write(key, _serializer.dumps(default))
+                return default
+        return _serializer.loads(data)
+
+    @classmethod
+    def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        _serializer = get_serializer(serializer or cls.serializer)
+        key = identifier.encode()
+        with cls._locked():
+            data = cls._read(key)
+            value = function(None if data is None else _serializer.loads(data))
+            cls._write(key, _serializer.dumps(value))
+        return value
+
+    @classmethod
+    def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        _serializer = get_serializer(serializer or cls.serializer)
+        with cls._locked():
+            stored = [cls._read(identifier.encode()) for identifier in identifiers]
+        return [None if data is None else _serializer.loads(data) for data in stored]
+
+    @classmethod
+    def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        _serializer = get_serializer(serializer or cls.serializer)
+        stored = [
+            (identifier.encode(), _serializer.dumps(value))
+            for identifier, value in values.items()
+        ]
+        with cls._locked():
+            for key, data in stored:
+                cls._write(key, data)
+        return True
+
+    @classmethod
+    def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        with cls._locked():
+            return [
+                cls._find(identifier.encode())[0] is not None
+                for identifier in identifiers
+            ]
+
+    @classmethod
+    def delete(cls, identifier: str) -> bool:
+        with cls._locked():
+            return cls._remove(identifier.encode())
+
+    @classmethod
+    def _identifiers(cls) -> list[str]:
+        buffer = cls._buffer()
+        identifiers = []
+        for slot in range(cls.slots):
+            offset = cls._offset(slot)
+            state, key_length, _ = SLOT_HEADER.unpack_from(buffer, offset)
+            if state == USED:
+                start = offset + SLOT_HEADER.size
+                identifiers.append(bytes(buffer[start : start + key_length]).decode())
+        return identifiers
+
+    @classmethod
+    def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        with cls._locked():
+            if namespace is None:
+                return [
+                    identifier
+                    for identifier in cls._identifiers()
+                    if not identifier.startswith(NAMESPACE_PREFIX)
+                ]
+            return [
+                identifier
+                for identifier in cls._namespace(namespace)
+                if cls._find(identifier.encode())[0] is not None
+            ]
+
+    @classmethod
+    def _page_key(cls, namespace: str, page: int) -> bytes:
+        return f"{NAMESPACE_PREFIX}{namespace}{NAMESPACE_SEPARATOR}{page}".encode()
+
+    @classmethod
+    def _page_capacity(cls, namespace: str, page: int) -> int:
+        return cls.slot_size - SLOT_HEADER.size - len(cls._page_key(namespace, page))
+
+    @classmethod
+    def _pages(cls, namespace: str) -> list[list[bytes]]:
+        data = cls._read(f"{NAMESPACE_PREFIX}{namespace}".encode())
+        if data is None:
+            return []
+        (count,) = PAGES.unpack(data)
+        pages = []
+        for page in range(count):
+            data = cls._read(cls._page_key(namespace, page))
+            pages.append(data.split(NAMESPACE_SEPARATOR.encode()) if data else [])
+        return pages
+
+    @classmethod
+    def _namespace(cls, namespace: str) -> list[str]:
+        return [key.decode() for page in cls._pages(namespace) for key in page]
+
+    @classmethod
+    def track(cls, namespace: str, identifier: str) -> None:
+        cls.track_many(namespace, [identifier])
+
+    @classmethod
+    def track_many(cls, namespace: str, identifiers: list[str]) -> None:
+        separator = NAMESPACE_SEPARATOR.encode()
+        with cls._locked():
+            pages = cls._pages(namespace) or [[]]
+            tracked = {key for page in pages for key in page}
+            capacity = cls._page_capacity(namespace, len(pages) - 1)
+            size = len(separator.join(pages[-1]))
+            changed = set()
+            for identifier in identifiers:
+                key = identifier.encode()
+                if key in tracked:
+                    continue
+                tracked.add(key)
+                if pages[-1] and size + len(separator) + len(key) > capacity:
+                    pages.append([])
+                    capacity = cls._page_capacity(namespace, len(pages) - 1)
+                    size = 0
+                size += len(key) + (len(separator) if pages[-1] else 0)
+                pages[-1].append(key)
+                changed.add(len(pages) - 1)
+            for page in sorted(changed):
+                cls._write(cls._page_key(namespace, page), separator.join(pages[page]))
+            if changed:
+                cls._write(
+                    f"{NAMESPACE_PREFIX}{namespace}".encode(), PAGES.pack(len(pages))
+                )
+
+    @classmethod
+    def clear_namespace(cls, namespace: str) -> None:
+        with cls._locked():
+            pages = cls._pages(namespace)
+            for key in (key for page in pages for key in page):
+                cls._remove(key)
+            for page in range(len(pages)):
+                cls._remove(cls._page_key(namespace, page))
+            cls._remove(f"{NAMESPACE_PREFIX}{namespace}".encode())
+
+    @classmethod
+    def reset_backend(cls) -> None:
+        with cls._locked():
+            buffer = cls._buffer()
+            for slot in range(cls.slots):
+                SLOT_HEADER.pack_into(buffer, cls._offset(slot), EMPTY, 0, 0)
+
+
+_open_backends: set[type[SharedMemoryBackend]] = set()
+
+
+def _after_fork_in_child() -> None:
+    for backend in _open_backends:
+        backend._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,151 @@
+from typing import Any, Iterable, Iterator, Optional
+
+import mmap
+import os
+import struct
+
+from .serializers import DEFAULT_SERIALIZER, get_serializer
+
+MAGIC = b"HOOKSNP1"
+# Magic, number of entries, length of the name of the serializer
+HEADER = struct.Struct("<8sIH")
+# Every entry is the length of the identifier, the identifier, the length of the value and the serialized value
+LENGTH = struct.Struct("<I")
+
+
+# The number of hooks backends load at once while writing a snapshot
+SNAPSHOT_CHUNK_SIZE = 1000
+
+
+def chunked(identifiers: list[str], size: Optional[int] = None) -> Iterator[list[str]]:
+    size = size or SNAPSHOT_CHUNK_SIZE
+    for start in range(0, len(identifiers), size):
+        yield identifiers[start : start + size]
+
+
+class SnapshotWriter:
+    """
+    Writes the state of hooks to a snapshot file as it is given. The file is written next to the path and moved into
+    place once complete, so readers never see a partial snapshot.
+    """
+
+    def __init__(self, path: str, serializer: Optional[str] = None) -> None:
+        self.path = path
+        self.count = 0
+        serializer = serializer or DEFAULT_SERIALIZER
+        self._serializer = get_serializer(serializer)
+        self._name = serializer.encode()
+        self._temporary_path = f"{path}.{os.getpid()}.tmp"
+        self._file = open(self._temporary_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, 0, len(self._name)) + self._name)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exception_type: Any, *args: Any) -> None:
+        if exception_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._temporary_path)
+
+    def write(self, items: Iterable[tuple[str, Any]]) -> None:
+        for identifier, value in items:
+            key, data = identifier.encode(), self._serializer.dumps(value)
+            self._file.write(
+                b"".join((LENGTH.pack(len(key)), key, LENGTH.pack(len(data)), data))
+            )
+            self.count += 1
+
+    def close(self) -> None:
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, self.count, len(self._name)))
+        self._file.close()
+        os.replace(self._temporary_path, self.path)
+
+
+def write_snapshot(
+    path: str, items: Iterable[tuple[str, Any]], serializer: Optional[str] = None
+) -> int:
+    """
+    Write the state of hooks to a snapshot file. The items are consumed one by one, so they can be generated lazily.
+    :param path: The path of the snapshot file
+    :param items: The identifiers of the hooks and their states
+    :param serializer: The name of the serializer to write the states with
+    :return: The number of entries written
+    """
+    with SnapshotWriter(path, serializer) as writer:
+        writer.write(items)
+    return writer.count
+
+
+class Snapshot:
+    """
+    A snapshot file mapped in memory. Opening it only indexes the identifiers, the states are deserialized when they
+    are read, so even a large snapshot opens almost instantly.
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, name_length = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a hooks snapshot")
+        offset = HEADER.size + name_length
+        self.serializer = self._buffer[HEADER.size : offset].decode()
+        # The offset and length of the state of every hook
+        self._index: dict[str, tuple[int, int]] = {}
+        for _ in range(count):
+            (key_length,) = LENGTH.unpack_from(self._buffer, offset)
+            offset += LENGTH.size
+            identifier = self._buffer[offset : offset + key_length].decode()
+            offset += key_length
+            (length,) = LENGTH.unpack_from(self._buffer, offset)
+            offset += LENGTH.size
+            self._index[identifier] = (offset, length)
+            offset += length
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self._index
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def keys(self) -> list[str]:
+        return list(self._index)
+
+    def load(self, identifier: str) -> Any:
+        offset, length = self._index[identifier]
+        return get_serializer(self.serializer).loads(
+            self._buffer[offset : offset + length]
+        )
+
+    def pop(self, identifier: str) -> tuple[bool, Any]:
+        """
+        Read the state of a hook and remove it from the index, once a state is restored the snapshot is not needed.
+        :param identifier: The identifier of the hook
+        :return: Whether the hook is in the snapshot, and its state
+        """
+        if identifier not in self._index:
+            return False, None
+        value = self.load(identifier)
+        del self._index[identifier]
+        return True, value
+
+    def discard(self, identifier: str) -> None:
+        self._index.pop(identifier, None)
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        for identifier in list(self._index):
+            yield identifier, self.load(identifier)
+
+    def close(self) -> None:
+        self._index.clear()
+        self._buffer.close()
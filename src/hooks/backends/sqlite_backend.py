@@ -0,0 +1,455 @@
+from typing import Any, Callable, Iterator, Optional
+
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from .async_interface import AsyncHooksBackend
+from .interface import HooksBackend
+from .serializers import DEFAULT_SERIALIZER, get_serializer
+
+DEFAULT_PATH = "hooks.sqlite3"
+# Reads of the database file are served from a memory mapping of up to this size
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+# The number of identifiers bound to a single IN (...) query, below the limit of older SQLite versions (999)
+MAX_VARIABLES = 900
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS hooks_state "
+    "(identifier TEXT PRIMARY KEY, value BLOB NOT NULL) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS hooks_namespaces "
+    "(namespace TEXT, identifier TEXT, PRIMARY KEY (namespace, identifier)) WITHOUT ROWID",
+)
+
+
+class SQLiteBackend(HooksBackend):
+    """
+    State persisted in a SQLite database in WAL mode, so it survives restarts and is shared by all the processes of
+    the host that use the same file (e.g. the workers of a gunicorn server). Readers never block the writer, and reads
+    are served from a memory mapping of the database file. Writes are committed one by one, or together in a single
+    transaction with save_many and batch.
+    """
+
+    path: str = DEFAULT_PATH
+    serializer: str = DEFAULT_SERIALIZER
+    mmap_size: int = DEFAULT_MMAP_SIZE
+    # Seconds to wait for the write lock held by another process
+    timeout: float = 5.0
+
+    _local = threading.local()
+    # The connections opened by every thread and the process that opened them, so they can be closed when reconfigured
+    _connections: list[tuple[int, sqlite3.Connection]] = []
+    _connections_lock = threading.Lock()
+
+    @classmethod
+    def use(
+        cls,
+        path: Optional[str] = None,
+        *args: Any,
+        serializer: Optional[str] = None,
+        mmap_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        cls._configure(path, serializer, mmap_size, timeout)
+        return super().use(*args, **kwargs)
+
+    @classmethod
+    def _configure(
+        cls,
+        path: Optional[str] = None,
+        serializer: Optional[str] = None,
+        mmap_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        if serializer is not None:
+            get_serializer(serializer)
+            cls.serializer = serializer
+        if path is not None:
+            cls.path = path
+        if mmap_size is not None:
+            cls.mmap_size = mmap_size
+        if timeout is not None:
+            cls.timeout = timeout
+        # Connections to the previous database are closed, the threads open new ones lazily
+        cls._local = threading.local()
+        with cls._connections_lock:
+            connections, cls._connections = cls._connections, []
+        for pid, connection in connections:
+            # Connections inherited from the parent process belong to it
+            if pid == os.getpid():
+                connection.close()
+
+    @classmethod
+    def _connection(cls) -> sqlite3.Connection:
+        # Connections are per thread, and are not inherited by forked processes
+        local = cls._local
+        if getattr(local, "pid", None) != os.getpid():
+            # Only used by this thread, but closed by the thread that reconfigures the backend
+            connection = sqlite3.connect(
+                cls.path,
+                timeout=cls.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA mmap_size={int(cls.mmap_size)}")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection, local.pid, local.batch = connection, os.getpid(), None
+            with cls._connections_lock:
+                cls._connections.append((local.pid, connection))
+        return local.connection
+
+    @classmethod
+    def _batch(cls) -> Optional[dict[str, bytes]]:
+        cls._connection()
+        return cls._local.batch
+
+    @classmethod
+    @contextmanager
+    def _transaction(cls, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        connection = cls._connection()
+        # BEGIN IMMEDIATE takes the write lock right away, so the transaction reads what it is going to overwrite
+        connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            # A failed COMMIT (e.g. the database is busy) may leave the transaction open
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    @classmethod
+    @contextmanager
+    def batch(cls) -> Iterator[None]:
+        """
+        Buffer the writes of a block and commit them in a single transaction when it ends, writes to the same hook are
+        coalesced. If the block raises, the writes are discarded. Nested batches join the outer one.
+        """
+        if cls._batch() is not None:
+            yield
+            return
+        cls._local.batch = {}
+        try:
+            yield
+            pending = cls._local.batch
+        finally:
+            cls._local.batch = None
+        if pending:
+            with cls._transaction() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO hooks_state VALUES (?, ?)",
+                    pending.items(),
+                )
+
+    @classmethod
+    def _select_in(cls, query: str, identifiers: list[str]) -> Iterator[Any]:
+        # The query ends with IN, it is run in chunks so the number of bound variables stays within the limit of SQLite
+        connection = cls._connection()
+        for start in range(0, len(identifiers), MAX_VARIABLES):
+            chunk = identifiers[start : start + MAX_VARIABLES]
+            yield from connection.execute(
+                f"{query} ({', '.join('?' * len(chunk))})", chunk
+            )
+
+    @classmethod
+    def _read(cls, identifier: str) -> Optional[bytes]:
+        batch = cls._batch()
+        if batch is not None and identifier in batch:
+            return batch[identifier]
+        row = (
+            cls._connection()
+            .execute(
+                "SELECT value FROM hooks_state WHERE identifier = ?", (identifier,)
+            )
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    @classmethod
+    def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        data = cls._read(identifier)
+        if data is None:
+            return None
+        return get_serializer(serializer or cls.serializer).loads(data)
+
+    @classmethod
+    def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        data = get_serializer(serializer or cls.serializer).dumps(value)
+        batch = cls._batch()
+        if batch is not None:
+            batch[identifier] = data
+            return True
+        cls._connection().execute(
+            "INSERT OR REPLACE INTO hooks_state VALUES (?, ?)", (identifier, data)
+        )
+        return True
+
+    @classmethod
+    def exists(cls, identifier: str) -> bool:
+        return cls._read(identifier) is not None
+
+    @classmethod
+    def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        _serializer = get_serializer(serializer or cls.serializer)
+        data = cls._read(identifier)
+        if data is not None:
+            return _serializer.loads(data)
+        with cls._transaction(immediate=True) as connection:
+            row = connection.execute(
+                "SELECT value FROM hooks_state WHERE identifier = ?", (identifier,)
+            ).fetchone()
+            if row is None:
+                connection.execute(
+                    "INSERT INTO hooks_state VALUES (?, ?)",
+                    (identifier, _serializer.dumps(default)),
+                )
+        return default if row is None else _serializer.loads(row[0])
+
+    @classmethod
+    def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        _serializer = get_serializer(serializer or cls.serializer)
+        batch = cls._batch()
+        # The write lock is held while the function runs, so other processes cannot update the state meanwhile
+        with cls._transaction(immediate=True) as connection:
+            data: Optional[bytes]
+            if batch is not None and identifier in batch:
+                data = batch.pop(identifier)
+            else:
+                row = connection.execute(
+                    "SELECT value FROM hooks_state WHERE identifier = ?", (identifier,)
+                ).fetchone()
+                data = None if row is None else row[0]
+            value = function(None if data is None else _serializer.loads(data))
+            connection.execute(
+                "INSERT OR REPLACE INTO hooks_state VALUES (?, ?)",
+                (identifier, _serializer.dumps(value)),
+            )
+        return value
+
+    @classmethod
+    def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        _serializer = get_serializer(serializer or cls.serializer)
+        batch = cls._batch() or {}
+        missing = [identifier for identifier in identifiers if identifier not in batch]
+        found = dict(batch)
+        if missing:
+            found.update(
+                cls._select_in(
+                    "SELECT identifier, value FROM hooks_state WHERE identifier IN",
+                    missing,
+                )
+            )
+        return [
+            None
+            if found.get(identifier) is None
+            else _serializer.loads(found[identifier])
+            for identifier in identifiers
+        ]
+
+    @classmethod
+    def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        _serializer = get_serializer(serializer or cls.serializer)
+        data = {
+            identifier: _serializer.dumps(value) for identifier, value in values.items()
+        }
+        batch = cls._batch()
+        if batch is not None:
+            batch.update(data)
+            return True
+        with cls._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO hooks_state VALUES (?, ?)", data.items()
+            )
+        return True
+
+    @classmethod
+    def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        batch = cls._batch() or {}
+        missing = [identifier for identifier in identifiers if identifier not in batch]
+        found = set(batch)
+        if missing:
+            found.update(
+                identifier
+                for identifier, in cls._select_in(
+                    "SELECT identifier FROM hooks_state WHERE identifier IN", missing
+                )
+            )
+        return [identifier in found for identifier in identifiers]
+
+    @classmethod
+    def delete(cls, identifier: str) -> bool:
+        batch = cls._batch()
+        if batch is not None:
+            batch.pop(identifier, None)
+        cursor = cls._connection().execute(
+            "DELETE FROM hooks_state WHERE identifier = ?", (identifier,)
+        )
+        return cursor.rowcount > 0
+
+    @classmethod
+    def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        if namespace is None:
+            rows = cls._connection().execute("SELECT identifier FROM hooks_state")
+        else:
+            rows = cls._connection().execute(
+                "SELECT hooks_state.identifier FROM hooks_namespaces JOIN hooks_state "
+                "ON hooks_state.identifier = hooks_namespaces.identifier "
+                "WHERE namespace = ?",
+                (namespace,),
+            )
+        return [identifier for identifier, in rows]
+
+    @classmethod
+    def track(cls, namespace: str, identifier: str) -> None:
+        cls._connection().execute(
+            "INSERT OR IGNORE INTO hooks_namespaces VALUES (?, ?)",
+            (namespace, identifier),
+        )
+
+    @classmethod
+    def clear_namespace(cls, namespace: str) -> None:
+        with cls._transaction() as connection:
+            connection.execute(
+                "DELETE FROM hooks_state WHERE identifier IN "
+                "(SELECT identifier FROM hooks_namespaces WHERE namespace = ?)",
+                (namespace,),
+            )
+            connection.execute(
+                "DELETE FROM hooks_namespaces WHERE namespace = ?", (namespace,)
+            )
+
+    @classmethod
+    def reset_backend(cls) -> None:
+        with cls._transaction() as connection:
+            connection.execute("DELETE FROM hooks_state")
+            connection.execute("DELETE FROM hooks_namespaces")
+
+
+class _AsyncSQLiteStore(SQLiteBackend):
+    """
+    The SQLite store used by the AsyncSQLiteBackend, configured separately from the SQLiteBackend.
+    """
+
+    _local = threading.local()
+    _connections: list[tuple[int, sqlite3.Connection]] = []
+    _connections_lock = threading.Lock()
+
+
+class AsyncSQLiteBackend(AsyncHooksBackend):
+    """
+    The asynchronous version of the SQLiteBackend. The database is accessed from a single worker thread, so the event
+    loop is never blocked by disk access or by waiting for the write lock of another process.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hooks-sqlite")
+
+    @classmethod
+    async def use(
+        cls,
+        path: Optional[str] = None,
+        *args: Any,
+        serializer: Optional[str] = None,
+        mmap_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        await cls._run(
+            _AsyncSQLiteStore._configure, path, serializer, mmap_size, timeout
+        )
+        return await super().use(*args, **kwargs)
+
+    @classmethod
+    async def _run(cls, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(
+            cls._executor, partial(function, *args, **kwargs)
+        )
+
+    @classmethod
+    async def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        return await cls._run(_AsyncSQLiteStore.load, identifier, serializer)
+
+    @classmethod
+    async def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        return await cls._run(_AsyncSQLiteStore.save, identifier, value, serializer)
+
+    @classmethod
+    async def exists(cls, identifier: str) -> bool:
+        return await cls._run(_AsyncSQLiteStore.exists, identifier)
+
+    @classmethod
+    async def load_or_init(
+        cls, identifier: str, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        return await cls._run(
+            _AsyncSQLiteStore.load_or_init, identifier, default, serializer
+        )
+
+    @classmethod
+    async def update(
+        cls,
+        identifier: str,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        return await cls._run(
+            _AsyncSQLiteStore.update, identifier, function, serializer
+        )
+
+    @classmethod
+    async def load_many(
+        cls, identifiers: list[str], serializer: Optional[str] = None
+    ) -> list[Any]:
+        return await cls._run(_AsyncSQLiteStore.load_many, identifiers, serializer)
+
+    @classmethod
+    async def save_many(
+        cls, values: dict[str, Any], serializer: Optional[str] = None
+    ) -> bool:
+        return await cls._run(_AsyncSQLiteStore.save_many, values, serializer)
+
+    @classmethod
+    async def exists_many(cls, identifiers: list[str]) -> list[bool]:
+        return await cls._run(_AsyncSQLiteStore.exists_many, identifiers)
+
+    @classmethod
+    async def delete(cls, identifier: str) -> bool:
+        return await cls._run(_AsyncSQLiteStore.delete, identifier)
+
+    @classmethod
+    async def keys(cls, namespace: Optional[str] = None) -> list[str]:
+        return await cls._run(_AsyncSQLiteStore.keys, namespace)
+
+    @classmethod
+    async def track(cls, namespace: str, identifier: str) -> None:
+        return await cls._run(_AsyncSQLiteStore.track, namespace, identifier)
+
+    @classmethod
+    async def clear_namespace(cls, namespace: str) -> None:
+        return await cls._run(_AsyncSQLiteStore.clear_namespace, namespace)
+
+    @classmethod
+    async def reset_backend(cls) -> None:
+        return await cls._run(_AsyncSQLiteStore.reset_backend)
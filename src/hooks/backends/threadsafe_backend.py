@@ -1,11 +1,9 @@
-from typing import Any, TypeVar
+from typing import Any, Optional, TypeVar, cast
 
 import threading
 
-# Extend pickle to support lambdas
-import dill as pickle
-
 from .interface import HooksBackend
+from .serializers import DEFAULT_SERIALIZER, get_serializer
 
 T = TypeVar("T")
 threading_local = threading.local()
@@ -13,13 +11,32 @@ BACKEND_KEY = "__hooks_backend__"
 
 
 class ThreadsafeBackend(HooksBackend):
+    # The state is thread local, so async hooks must use it from the thread of the event loop
+    blocking = False
+    serializer: str = DEFAULT_SERIALIZER
+
+    @classmethod
+    def use(cls, *args: Any, serializer: Optional[str] = None, **kwargs: Any) -> Any:
+        if serializer is not None:
+            get_serializer(serializer)
+            cls.serializer = serializer
+        return super().use(*args, **kwargs)
+
     @classmethod
-    def load(cls, identifier: str) -> Any:
-        return pickle.loads(getattr(threading_local, BACKEND_KEY + identifier, None))
+    def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+        return get_serializer(serializer or cls.serializer).loads(
+            cast(bytes, getattr(threading_local, BACKEND_KEY + identifier, None))
+        )
 
     @classmethod
-    def save(cls, identifier: str, value: Any) -> bool:
-        setattr(threading_local, BACKEND_KEY + identifier, pickle.dumps(value))
+    def save(
+        cls, identifier: str, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        setattr(
+            threading_local,
+            BACKEND_KEY + identifier,
+            get_serializer(serializer or cls.serializer).dumps(value),
+        )
         return True
 
     @classmethod
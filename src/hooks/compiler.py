@@ -0,0 +1,83 @@
+# mypy: ignore-errors
+from types import CodeType
+from typing import Any, Callable, TypeVar
+
+import dis
+import inspect
+
+from .frame_utils import SPECIAL_HOOKS, _compiled_code, _CompiledCode
+
+T = TypeVar("T")
+
+HOOK_LOOKUP_INSTRUCTIONS = {
+    "LOAD_GLOBAL",
+    "LOAD_NAME",
+    "LOAD_DEREF",
+    "LOAD_CLASSDEREF",
+    "LOAD_FAST",
+    "LOAD_ATTR",
+    "LOAD_METHOD",
+}
+
+
+def _is_hook_name(name: Any) -> bool:
+    """
+    Check whether a name looked up in the bytecode refers to a hook.
+    :param name: The name that was looked up
+    :return: True if the name is a hook name
+    """
+    return isinstance(name, str) and (name.startswith("use_") or name in SPECIAL_HOOKS)
+
+
+def _compile_code(code: CodeType, identity: str) -> None:
+    """
+    Find all hook call-sites in a code object and give each of them a slot identity. Code objects of nested functions
+    are compiled as well since hooks may be called from closures.
+    :param code: The code object to compile
+    :param identity: The stable identity of the code object
+    """
+    hook_calls = []
+    occurrences: dict[str, int] = {}
+    for instruction in dis.get_instructions(code):
+        if instruction.opname in HOOK_LOOKUP_INSTRUCTIONS and _is_hook_name(
+            instruction.argval
+        ):
+            index = occurrences.get(instruction.argval, 0)
+            occurrences[instruction.argval] = index + 1
+            hook_calls.append(
+                (
+                    instruction.offset,
+                    instruction.argval,
+                    f"{identity}#{instruction.argval}:{index}",
+                )
+            )
+    _compiled_code[code] = _CompiledCode(hook_calls)
+
+    nested: dict[str, int] = {}
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            index = nested.get(const.co_name, 0)
+            nested[const.co_name] = index + 1
+            _compile_code(
+                const,
+                f"{identity}.<locals>.{const.co_name}" + (f":{index}" if index else ""),
+            )
+
+
+def compiled(function: T) -> T:
+    """
+    Assign a stable slot to every hook call-site of a function when it is defined. Hooks called from a compiled
+    function are identified by their slot instead of by walking the frames and hashing filenames and line numbers,
+    which also keeps their state stable when the code around them moves. Scoping is not affected: the decorator can be
+    combined with hook_scope, instance / class scoping and custom hooks.
+
+    The decorator returns the function as is, so it can be placed anywhere in a decorators stack.
+    :param function: The function (or staticmethod / classmethod) to compile
+    :return: The same function
+    """
+    target = inspect.unwrap(getattr(function, "__func__", function))
+    if not hasattr(target, "__code__"):
+        raise TypeError(f"Cannot compile hooks of {function!r}, it is not a function")
+
+    _compile_code(target.__code__, f"{target.__module__}.{target.__qualname__}")
+    return function
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from types import FrameType, FunctionType, MethodType
+from types import CodeType, FrameType
 from typing import Any, Callable
 
 import sys
@@ -15,49 +15,79 @@ from .backends.python_objects_backend import (
     async_python_object_backend_factory,
     python_object_backend_factory,
 )
-from .scope import HOOKED_FUNCTION_ATTRIBUTE, _hook_scope_manager
+from .scope import _current_scope, _implements_code
 
 SPECIAL_HOOKS = ["create_context"]
 
 
+OWNER_CACHE_SIZE = 4096
+
+_owner_cache: dict[CodeType, tuple[Any, str | None]] = {}
+
+
+def __is_defined_in_class(code: CodeType) -> bool:
+    """
+    Check whether the code object may belong to a function defined in a class body. Before Python 3.11 code objects
+    have no qualified name, in which case we cannot rule it out and the first argument has to be inspected.
+    :param code: The code object of the function
+    :return: False if the function is surely not a method
+    """
+    qualname = getattr(code, "co_qualname", None)
+    if qualname is None:
+        return True
+    parts = qualname.rsplit(".", 2)
+    return len(parts) > 1 and parts[-2] != "<locals>"
+
+
 def __identify_function_and_owner(
     frame: FrameType | None | Any,
-) -> tuple[Callable[[Any], Any] | None, Any]:
+) -> tuple[Callable[[Any], Any] | None, str | None]:
     """
-    Find the owner of the function that called the current function frame. If the function is a method, the owner is
-    the class of the instance. If the function is a static method, the owner is the class of the static method.
+    Find the function that called the current function frame as defined in its class, and the name of the argument
+    holding its owner. A method is always looked up through its first positional argument (self / cls), and the result
+    is cached per code object so the cost does not depend on the size of the module namespace.
     :param frame: The frame of the function that called the current function
-    :return: The function instance and the owner of the function that called the current function frame
-    """
-    at: dict[str, Any] = {**frame.f_globals, **frame.f_locals}
-    value: Any = None
-    if hasattr(frame.f_code, "co_qualname"):
-        for part in frame.f_code.co_qualname.split(".")[:-1]:
-            for name, value in at.items():
-                if name == part:
-                    at = value.__dict__
-                    break
-    else:
-        caller_name = frame.f_code.co_name
-        # In the case we cannot find the owner using the qualname which is safest, we try to find the owner using the
-        # function args. This is not safe because the function args can be anything, but it is better than nothing.
-        for arg, arg_value in frame.f_locals.items():
-            if hasattr(arg_value, caller_name) and isinstance(
-                getattr(arg_value, caller_name), (FunctionType, MethodType)
-            ):
-                return getattr(arg_value, caller_name), arg_value
-
-        # Finally, we will try to find a hooked function in the frame stack which is provided by the hook decorator to
-        # help us limit the scope of hooks for global functions without owners.
-        frame = frame.f_back
-        if frame:
-            for arg, arg_value in frame.f_locals.items():
-                if arg == HOOKED_FUNCTION_ATTRIBUTE:
-                    return arg_value, None
+    :return: The function as found in the class __dict__ (possibly a classmethod or staticmethod) and the name of the
+     argument holding the owner, or (None, None) if the function is not defined in a class
+    """
+    code = frame.f_code
+    resolved = _owner_cache.get(code)
+    if resolved is not None:
+        return resolved
 
-    if frame:
-        return at.get(frame.f_code.co_name, None), value
-    return None, value
+    resolved = (None, None)
+    if code.co_argcount and __is_defined_in_class(code):
+        owner_name = code.co_varnames[0]
+        owner = frame.f_locals.get(owner_name)
+        owner_class = owner if isinstance(owner, type) else type(owner)
+        names = [code.co_name]
+        if code.co_name.startswith("__") and not code.co_name.endswith("__"):
+            # Private methods are stored under their mangled name
+            names.append(f"_{owner_class.__name__.lstrip('_')}{code.co_name}")
+        # The first attribute with the name of the function, which may not run its code when the function is a base
+        # method called through super() or is wrapped by a decorator that does not use functools.wraps
+        first = None
+        for base in owner_class.__mro__:
+            attribute = next(
+                (base.__dict__[name] for name in names if name in base.__dict__), None
+            )
+            if attribute is None:
+                continue
+            if _implements_code(attribute, code):
+                resolved = (attribute, owner_name)
+                break
+            if first is None:
+                first = attribute
+        else:
+            # The function could not be matched, it is still a method of the first argument when the class of the
+            # argument defines a method with its name
+            if first is not None and not isinstance(first, staticmethod):
+                resolved = (None, owner_name)
+
+    if len(_owner_cache) >= OWNER_CACHE_SIZE:
+        _owner_cache.clear()
+    _owner_cache[code] = resolved
+    return resolved
 
 
 def __frame_parts_to_identifier(*args: Any) -> str:
@@ -68,85 +98,286 @@ def __frame_parts_to_identifier(*args: Any) -> str:
     return "".join(map(str, args))
 
 
-# type: ignore
-def __identify_hook_and_backend(
-    always_global_backend: bool = False,
-    prefix: str = "",
-    using_async: bool = False,
-) -> tuple[str, type[HooksBackend] | HooksBackend]:
+class _CallSite:
     """
-    Identify the hook that called the current function frame and the backend that should be used to backend the hook's
-    state. If the hook is called from a method, the backend is a PythonObjectBackend. If the hook is called from a static
-    method, the backend is a PickleBackend. If the hook is called from a function, the backend is a PickleBackend.
-    :param always_global_backend: If True, the backend will always be a PickleBackend regardless of the hook's caller
-    :param prefix: A prefix to add to the hook identifier
-    :param using_async: Whether the hook is used in an async context
-    :return: The hook identifier and the backend that should be used to backend the hook's state
+    The static part of a hook identity. Everything in here only depends on the chain of code objects and bytecode
+    offsets that lead to the hook, so it is computed once per call-site and reused on every following call.
     """
-    # The use of _getframe is not ideal, but it is more performant than using inspect.currentframe
-    frame: FrameType | None | Any = sys._getframe()
-    if not frame:
-        raise RuntimeError(
-            "Could not identify the hook that called the current function"
-        )
 
-    frame: FrameType | None | Any = frame.f_back.f_back
+    __slots__ = (
+        "identifier_prefix",
+        "identifier_suffix",
+        "is_instance_scoped",
+        "owner_name",
+        "identifier",
+    )
 
-    if not frame:
-        raise RuntimeError(
-            "Could not identify the hook that called the current function"
+    def __init__(
+        self,
+        identifier_prefix: bytes,
+        identifier_suffix: bytes,
+        is_instance_scoped: bool,
+        owner_name: str | None,
+    ) -> None:
+        self.identifier_prefix = identifier_prefix
+        self.identifier_suffix = identifier_suffix
+        self.is_instance_scoped = is_instance_scoped
+        self.owner_name = owner_name
+        # The hashed identifier when no hook scope is active, filled lazily
+        self.identifier: str | None = None
+
+
+CALL_SITE_CACHE_SIZE = 4096
+
+_call_site_cache: dict[tuple[Any, ...], _CallSite] = {}
+_hook_code_cache: dict[CodeType, bool] = {}
+
+
+class _CompiledCode:
+    """
+    The hook call-sites of a function decorated with @compiled. Every call-site is given a stable slot identity when
+    the function is defined, which replaces the filename and line number based identity at runtime.
+    """
+
+    __slots__ = ("hook_calls", "slots", "call_sites")
+
+    def __init__(self, hook_calls: list[tuple[int, str, str]]) -> None:
+        # (bytecode offset of the hook lookup, hook name, slot identity) sorted by offset
+        self.hook_calls = hook_calls
+        # The slot identity of every (bytecode offset of the call, hook name) seen at runtime
+        self.slots: dict[tuple[int, str], str | None] = {}
+        # The call-sites of hooks called directly from the compiled function
+        self.call_sites: dict[tuple[int, str, bool], _CallSite] = {}
+
+
+_compiled_code: dict[CodeType, _CompiledCode] = {}
+
+
+def __names_callee(frame: FrameType, name: str, callee_name: str) -> bool:
+    """
+    Check whether a hook name looked up by a frame refers to the function it is calling, which may be imported under
+    another name (e.g. from hooks.asyncio.use import use_state as use_async_state).
+    :param frame: The frame of a compiled function
+    :param name: The name looked up in the bytecode
+    :param callee_name: The name of the function the frame is calling
+    :return: True if the name refers to the callee
+    """
+    if name == callee_name:
+        return True
+    value = frame.f_locals.get(name, frame.f_globals.get(name))
+    return getattr(value, "__name__", None) == callee_name
+
+
+def __compiled_slot(frame: FrameType, callee_name: str) -> str | None:
+    """
+    Find the slot identity of the hook call the frame is currently executing. The hook lookup that belongs to the
+    call is the last lookup of a name that refers to the called hook before the call instruction.
+    :param frame: The frame of a compiled function
+    :param callee_name: The name of the hook function the frame is calling
+    :return: The slot identity, or None if the frame is not compiled or the call could not be matched
+    """
+    compiled = _compiled_code.get(frame.f_code)
+    if compiled is None:
+        return None
+    key = (frame.f_lasti, callee_name)
+    if key not in compiled.slots:
+        compiled.slots[key] = next(
+            (
+                slot
+                for offset, name, slot in reversed(compiled.hook_calls)
+                if offset < frame.f_lasti and __names_callee(frame, name, callee_name)
+            ),
+            None,
         )
+    return compiled.slots[key]
+
 
+def __is_hook_frame(frame: FrameType) -> bool:
+    """
+    Check whether a frame belongs to a hook (a use_* function or any function of the hooks package) that should be
+    skipped when looking for the function that called the hook. The answer only depends on the code object, so it is
+    cached per code object.
+    :param frame: The frame to check
+    :return: True if the frame belongs to a hook
+    """
+    code = frame.f_code
+    is_hook = _hook_code_cache.get(code)
+    if is_hook is None:
+        is_hook = (
+            code.co_name.startswith("use_")
+            or frame.f_globals["__name__"].startswith("hooks.")
+        ) and code.co_name not in SPECIAL_HOOKS
+        _hook_code_cache[code] = is_hook
+    return is_hook
+
+
+def __hook_name(frame: FrameType, callee_name: str) -> str:
+    """
+    Get the name of the hook called by the first function above the hooks, e.g. use_effect when the state is created by
+    a use_state call inside use_effect.
+    :param frame: The first frame above the hook implementation
+    :param callee_name: The name of the hook implementation called from the frame
+    :return: The name of the hook
+    """
+    while __is_hook_frame(frame):
+        callee_name = frame.f_code.co_name
+        frame = frame.f_back
+    return callee_name
+
+
+def __frame_identity(frame: FrameType, callee_name: str) -> str:
+    """
+    Get the identity of a single frame in the chain of frames that lead to a hook. Compiled functions use the slot
+    identity of the call, other functions use their filename, line number and name.
+    :param frame: The frame to identify
+    :param callee_name: The name of the function the frame is calling
+    :return: The identity of the frame
+    """
+    slot = __compiled_slot(frame, callee_name)
+    if slot is not None:
+        return slot
+    return __frame_parts_to_identifier(
+        frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name
+    )
+
+
+def __build_call_site(
+    frame: FrameType, prefix: str, always_global_backend: bool, callee_name: str
+) -> _CallSite:
+    """
+    Build the static identity of the hook called from the given frame. This is the slow path that is only taken the
+    first time a call-site is seen.
+    :param frame: The first frame above the hook implementation
+    :param prefix: A prefix to add to the hook identifier
+    :param always_global_backend: If True, the hook is never scoped to an instance
+    :param callee_name: The name of the hook implementation called from the frame
+    :return: The call-site identity
+    """
     identifier_prefix = ""
 
     # Skip all hook functions in order to identify the function that called the hook
-    while (
-        frame.f_code.co_name.startswith("use_")
-        or frame.f_globals["__name__"].startswith("hooks.")
-    ) and frame.f_code.co_name not in SPECIAL_HOOKS:
+    while __is_hook_frame(frame):
         # We add a prefix to the identifier to ensure that the identifier is unique and that we can use hooks inside
         # hooks
-        identifier_prefix += __frame_parts_to_identifier(
-            frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name
-        )
+        identifier_prefix += __frame_identity(frame, callee_name)
+        callee_name = frame.f_code.co_name
         frame = frame.f_back
 
-    frame_identifier = identifier_prefix + __frame_parts_to_identifier(
-        frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name
-    )
+    frame_identifier = identifier_prefix + __frame_identity(frame, callee_name)
 
-    # We identify the function that called the hook and its owner
-    caller_function, owner = __identify_function_and_owner(frame)
+    # We identify the function that called the hook and the argument holding its owner
+    caller_function, owner_name = __identify_function_and_owner(frame)
 
     # We identify the type of the function that called the hook
     is_static_method = isinstance(caller_function, staticmethod)
-    is_class_method = isinstance(caller_function, classmethod)
-    is_method = owner is not None and not is_static_method and not is_class_method
-    is_scoped_globally = hasattr(caller_function, "use_global_scope") and getattr(
-        caller_function, "use_global_scope", False
+    is_method = owner_name is not None and not is_static_method
+    is_scoped_globally = getattr(
+        getattr(caller_function, "__func__", caller_function), "use_global_scope", False
     )
-    always_global_backend = always_global_backend or is_scoped_globally
 
-    # In case the owner we found is a class, we try to find the instance of the class in the frame locals (self)
-    if (is_method or is_class_method) and getattr(owner, "__class__", None) == type:
-        for _, value in frame.f_locals.items():
-            if isinstance(value, owner):
-                owner = value
-                break
+    # If the hook is not called from a method, the state is kept in the global backend
+    if not is_method or always_global_backend or is_scoped_globally:
+        return _CallSite(f"{prefix}{frame_identifier}".encode(), b"", False, None)
+
+    # The owner changes between calls, so we only remember which argument holds it
+    return _CallSite(
+        f"{prefix}{frame_identifier}".encode(),
+        frame.f_code.co_name.encode(),
+        True,
+        owner_name,
+    )
 
-    # Always add the current hook scope identifier to the frame identifier
-    frame_identifier += ";".join(_hook_scope_manager.current_identifier)
 
-    # If the hook is called from a method, we use a PythonObjectBackend to backend the hook's state.
-    if (not is_method and not is_class_method) or always_global_backend:
-        _backend = get_hooks_backend(using_async=using_async)
+# type: ignore
+def __identify_hook_and_backend(
+    always_global_backend: bool = False,
+    prefix: str = "",
+    using_async: bool = False,
+) -> tuple[str, type[HooksBackend] | HooksBackend]:
+    """
+    Identify the hook that called the current function frame and the backend that should be used to backend the hook's
+    state. If the hook is called from a method, the backend is a PythonObjectBackend. If the hook is called from a
+    static method, the backend is a PickleBackend. If the hook is called from a function, the backend is a
+    PickleBackend.
+    The static part of the identity is cached per call-site (the code objects and bytecode offsets leading to the
+    hook), so only the owner instance and the current hook scope are resolved on every call.
+    :param always_global_backend: If True, the backend will always be a PickleBackend regardless of the hook's caller
+    :param prefix: A prefix to add to the hook identifier
+    :param using_async: Whether the hook is used in an async context
+    :return: The hook identifier and the backend that should be used to backend the hook's state
+    """
+    scope = _current_scope.get()
+    # Inside a scope using the order identity, hooks are simply numbered by the order in which they are called
+    slots = scope[1] if scope is not None else None
+    if slots is not None and not always_global_backend:
+        if slots.order is None:
+            return slots.claim(), slots.for_hook(using_async)
         return (
-            str(hashxx(f"{prefix}{frame_identifier}".encode())),
-            _backend,
+            slots.claim(__hook_name(sys._getframe(2), sys._getframe(1).f_code.co_name)),
+            slots.for_hook(using_async),
         )
 
+    # The use of _getframe is not ideal, but it is more performant than using inspect.currentframe
+    try:
+        frame: FrameType | None | Any = sys._getframe(2)
+    except ValueError:
+        raise RuntimeError(
+            "Could not identify the hook that called the current function"
+        )
+
+    compiled = _compiled_code.get(frame.f_code)
+    if compiled is not None and not __is_hook_frame(frame):
+        # Hooks called directly from a compiled function are identified by their slot, no frame walking is needed
+        caller = frame
+        compiled_key = (frame.f_lasti, prefix, always_global_backend)
+        call_site = compiled.call_sites.get(compiled_key)
+        if call_site is None:
+            call_site = compiled.call_sites[compiled_key] = __build_call_site(
+                frame, prefix, always_global_backend, sys._getframe(1).f_code.co_name
+            )
+    else:
+        # The call-site is identified by the code objects and bytecode offsets of all the frames from the caller of
+        # the hook implementation up to the first frame that is not a hook
+        call_site_key: list[Any] = [prefix, always_global_backend]
+        caller = frame
+        while __is_hook_frame(caller):
+            call_site_key.append(caller.f_code)
+            call_site_key.append(caller.f_lasti)
+            caller = caller.f_back
+        call_site_key.append(caller.f_code)
+        call_site_key.append(caller.f_lasti)
+        key = tuple(call_site_key)
+
+        call_site = _call_site_cache.get(key)
+        if call_site is None:
+            if len(_call_site_cache) >= CALL_SITE_CACHE_SIZE:
+                _call_site_cache.clear()
+            call_site = _call_site_cache[key] = __build_call_site(
+                frame, prefix, always_global_backend, sys._getframe(1).f_code.co_name
+            )
+
+    # Always add the current hook scope identifier to the frame identifier
+    if scope is not None:
+        identifier = str(
+            hashxx(call_site.identifier_prefix, scope[0], call_site.identifier_suffix)
+        )
+    else:
+        identifier = call_site.identifier
+        if identifier is None:
+            identifier = call_site.identifier = str(
+                hashxx(call_site.identifier_prefix, call_site.identifier_suffix)
+            )
+
+    # If the hook is not called from a method, we use the global backend to backend the hook's state.
+    if not call_site.is_instance_scoped:
+        if scope is not None and scope[2] is not None and not always_global_backend:
+            # The scope tracks the state it creates, so it can be disposed
+            scope[2].add(identifier)
+        return identifier, get_hooks_backend(using_async=using_async)
+
+    owner = caller.f_locals[call_site.owner_name]
     return (
-        str(hashxx(f"{prefix}{frame_identifier}{frame.f_code.co_name}".encode())),
+        identifier,
         python_object_backend_factory(owner)
         if not using_async
         else async_python_object_backend_factory(owner),
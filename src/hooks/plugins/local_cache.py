@@ -0,0 +1,96 @@
+from typing import Any
+
+import threading
+import time
+from collections import OrderedDict
+
+# The channels of the keyspace notifications of a Redis database, one per key
+KEYSPACE_PATTERN = "__keyspace@{db}__:*"
+
+
+class LocalCache:
+    """
+    An in-process LRU cache of deserialized values, layered in front of a remote backend. Entries are invalidated when
+    the backend reports that their key changed, and in any case are not served once they are older than the staleness
+    bound, so readers see remote changes eventually even if an invalidation was missed. The cached values are shared
+    between readers, like the state of the MemoryBackend.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_staleness: float = 1.0) -> None:
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[str, tuple[str, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, identifier: str, serializer: str) -> tuple[bool, Any]:
+        """
+        Get a value from the cache.
+        :param identifier: The identifier of the hook
+        :param serializer: The name of the serializer the value is read with, values read with another serializer miss
+        :return: Whether the value was cached, and the value
+        """
+        with self._lock:
+            entry = self._entries.get(identifier)
+            if (
+                entry is None
+                or entry[0] != serializer
+                or time.monotonic() - entry[2] > self.max_staleness
+            ):
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(identifier)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, identifier: str, serializer: str, value: Any) -> None:
+        with self._lock:
+            self._entries[identifier] = (serializer, value, time.monotonic())
+            self._entries.move_to_end(identifier)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, identifier: str) -> None:
+        with self._lock:
+            if self._entries.pop(identifier, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_notification(self, message: dict[str, Any]) -> None:
+        """
+        Invalidate the key of a Redis keyspace notification.
+        :param message: The pub/sub message of the notification
+        """
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        self.invalidate(channel.split(":", 1)[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get the counters of the cache.
+        :return: The number of entries, hits, misses and invalidations so far
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+def keyspace_pattern(client: Any) -> str:
+    """
+    Get the pattern of the keyspace notifications channels of the database a Redis client uses.
+    :param client: The Redis client
+    :return: The channels pattern
+    """
+    return KEYSPACE_PATTERN.format(
+        db=client.connection_pool.connection_kwargs.get("db", 0)
+    )
@@ -1,45 +1,639 @@
-from typing import Any, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Mapping,
+    Optional,
+    Union,
+    cast,
+)
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 
 from hooks.backends.async_interface import AsyncHooksBackend
 from hooks.backends.interface import HooksBackend
+from hooks.backends.serializers import DEFAULT_SERIALIZER, get_serializer
+from hooks.plugins.local_cache import LocalCache, keyspace_pattern
+from hooks.plugins.unit_of_work import FLUSH_ON_EXIT, UnitOfWork
+
+# The identifiers of every namespace are kept in a Redis set under this prefix
+NAMESPACE_PREFIX = "__hooks_namespace__"
+# The number of keys unlinked by every command when a namespace is cleared
+UNLINK_BATCH_SIZE = 512
+
+
+def _encode_fields(fields: dict[Any, Any], serializer: Any) -> dict[Any, bytes]:
+    """
+    Serialize the fields of a dict state to save it as a Redis hash. The names of the fields are serialized as well,
+    so they keep their type (e.g. int keys).
+    :param fields: The values of the fields by name
+    :param serializer: The serializer
+    :return: The serialized values by serialized name
+    """
+    return {
+        serializer.dumps(field): serializer.dumps(value)
+        for field, value in fields.items()
+    }
+
+
+def _decode_fields(
+    fields: Mapping[Any, Any], serializer: Any
+) -> Optional[dict[Any, Any]]:
+    """
+    Deserialize a dict state saved as a Redis hash with _encode_fields.
+    :param fields: The hash, as returned by HGETALL
+    :param serializer: The serializer
+    :return: The state, None if the hash is empty (Redis does not keep empty hashes)
+    """
+    if not fields:
+        return None
+    return {
+        serializer.loads(field): serializer.loads(value)
+        for field, value in fields.items()
+    }
+
 
 try:
-    # Extend pickle to support lambdas
-    import dill as pickle
     import redis
+    from redis.exceptions import ResponseError, WatchError
 
     class RedisBackend(HooksBackend):
         redis_client = None
+        serializer: str = DEFAULT_SERIALIZER
+
+        # The unit of work of the current request, if any (see unit_of_work)
+        _unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+            "redis_unit_of_work", default=None
+        )
+        # The optional in-process cache of the values read (see enable_cache)
+        cache: Optional[LocalCache] = None
+        _cache_listener: Any = None
+        # Atomic updates give up after this many conflicting writes
+        max_update_retries: int = 100
+        updates: int = 0
+        update_retries: int = 0
 
         @classmethod
-        def use(cls, host: str, port: int, *args: Any, **kwargs: Any) -> Any:
+        def use(
+            cls,
+            host: str,
+            port: int,
+            *args: Any,
+            serializer: Optional[str] = None,
+            **kwargs: Any,
+        ) -> Any:
+            if serializer is not None:
+                get_serializer(serializer)
+                cls.serializer = serializer
             cls.redis_client = redis.Redis(host=host, port=port, **kwargs)
             super().use(**kwargs)
             return cls
 
         @classmethod
-        def load(cls, identifier: str) -> Any:
+        @contextmanager
+        def unit_of_work(
+            cls, flush_policy: str = FLUSH_ON_EXIT
+        ) -> Iterator[UnitOfWork]:
+            """
+            Buffer the reads and writes of a request. Values are read from Redis once and then served from an identity
+            map, and writes are coalesced per key and flushed in a single MULTI / EXEC when the unit of work ends. If
+            the block raises, the pending writes are discarded. Nested units of work join the outer one.
+            :param flush_policy: "exit" to flush only when the unit of work ends, or "read" to also flush before a key
+            with a pending write is read
+            :return: The unit of work
+            """
+            unit = cls._unit_of_work.get()
+            if unit is not None:
+                yield unit
+                return
+
+            unit = UnitOfWork(flush_policy)
+            token = cls._unit_of_work.set(unit)
+            try:
+                yield unit
+                cls.flush()
+            finally:
+                cls._unit_of_work.reset(token)
+
+        @classmethod
+        def flush(cls) -> None:
+            """
+            Write the pending writes of the current unit of work to Redis in a single MULTI / EXEC.
+            """
+            unit = cls._unit_of_work.get()
+            if unit is None:
+                return
+            pending = unit.take_pending()
+            if not pending:
+                return
+            if cls.redis_client:
+                pipeline = cls.redis_client.pipeline(transaction=True)
+                for identifier, data in pending.items():
+                    pipeline.set(identifier, data)
+                    if cls.cache is not None:
+                        cls.cache.invalidate(identifier)
+                pipeline.execute()
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def enable_cache(
+            cls,
+            max_entries: int = 1024,
+            max_staleness: float = 1.0,
+            invalidate: bool = True,
+        ) -> LocalCache:
+            """
+            Cache the values read from Redis in-process. Entries are invalidated by the keyspace notifications of
+            Redis (which requires notify-keyspace-events to be enabled on the server), and are never served once they
+            are older than max_staleness.
+            :param max_entries: The maximal number of cached values, the least recently used are evicted first
+            :param max_staleness: The maximal age of a cached value in seconds
+            :param invalidate: Whether to listen to keyspace notifications in a background thread
+            :return: The cache
+            """
+            if cls.redis_client:
+                cls.disable_cache()
+                cls.cache = LocalCache(max_entries, max_staleness)
+                if invalidate:
+                    pubsub = cls.redis_client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.psubscribe(
+                        **{
+                            keyspace_pattern(
+                                cls.redis_client
+                            ): cls.cache.invalidate_notification
+                        }
+                    )
+                    cls._cache_listener = pubsub.run_in_thread(
+                        sleep_time=0.1, daemon=True
+                    )
+                return cls.cache
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def disable_cache(cls) -> None:
+            if cls._cache_listener is not None:
+                cls._cache_listener.stop()
+                cls._cache_listener = None
+            cls.cache = None
+
+        @classmethod
+        def cache_stats(cls) -> dict[str, int]:
+            """
+            Get the counters of the in-process cache.
+            :return: The number of entries, hits, misses and invalidations, empty if the cache is disabled
+            """
+            return cls.cache.stats() if cls.cache is not None else {}
+
+        @classmethod
+        def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
             if cls.redis_client:
-                return pickle.loads(cls.redis_client.get(identifier))
+                serializer = serializer or cls.serializer
+                unit = cls._unit_of_work.get()
+                if unit is not None:
+                    if unit.needs_flush(identifier):
+                        cls.flush()
+                    if identifier in unit.values:
+                        return get_serializer(serializer).loads(unit.values[identifier])
+                if cls.cache is not None:
+                    cached, value = cls.cache.get(identifier, serializer)
+                    if cached:
+                        return value
+                try:
+                    data = cls.redis_client.get(identifier)
+                except ResponseError:
+                    # The state is a hash of fields (see save_fields)
+                    value = _decode_fields(
+                        cls.redis_client.hgetall(identifier),
+                        get_serializer(serializer),
+                    )
+                else:
+                    if unit is not None:
+                        unit.values[identifier] = data
+                    value = get_serializer(serializer).loads(cast(bytes, data))
+                if cls.cache is not None:
+                    cls.cache.put(identifier, serializer, value)
+                return value
             else:
                 raise Exception("Redis client not initialized")
 
         @classmethod
-        def save(cls, identifier: str, value: Any) -> Union[bool, None, Any]:
+        def save(
+            cls, identifier: str, value: Any, serializer: Optional[str] = None
+        ) -> Union[bool, None, Any]:
             if cls.redis_client:
-                return cls.redis_client.set(identifier, pickle.dumps(value))
+                data = get_serializer(serializer or cls.serializer).dumps(value)
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                unit = cls._unit_of_work.get()
+                if unit is None:
+                    return cls.redis_client.set(identifier, data)
+                unit.write(identifier, data)
+                return True
             else:
                 raise Exception("Redis client not initialized")
 
         @classmethod
         def exists(cls, identifier: str) -> bool:
             if cls.redis_client:
+                unit = cls._unit_of_work.get()
+                if unit is not None and identifier in unit.values:
+                    return unit.values[identifier] is not None
                 return cls.redis_client.exists(identifier) == 1
             else:
                 raise Exception("Redis client not initialized")
 
+        @classmethod
+        def load_or_init(
+            cls, identifier: str, default: Any, serializer: Optional[str] = None
+        ) -> Any:
+            if cls.redis_client:
+                serializer = serializer or cls.serializer
+                unit = cls._unit_of_work.get()
+                if unit is not None and unit.values.get(identifier) is not None:
+                    return cls.load(identifier, serializer)
+                if cls.cache is not None:
+                    cached, value = cls.cache.get(identifier, serializer)
+                    if cached:
+                        return value
+                # A single round trip instead of EXISTS, GET and SET
+                data = get_serializer(serializer).dumps(default)
+                pipeline = cls.redis_client.pipeline()
+                pipeline.set(identifier, data, nx=True)
+                pipeline.get(identifier)
+                created, value = pipeline.execute(raise_on_error=False)
+                if isinstance(value, ResponseError):
+                    # The state is a hash of fields (see save_fields)
+                    return cls.load(identifier, serializer)
+                if unit is not None:
+                    unit.values[identifier] = data if created else value
+                value = default if created else get_serializer(serializer).loads(value)
+                if cls.cache is not None:
+                    cls.cache.put(identifier, serializer, value)
+                return value
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def update(
+            cls,
+            identifier: str,
+            function: Callable[[Any], Any],
+            serializer: Optional[str] = None,
+        ) -> Any:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None:
+                    # The update is applied to Redis right away, so it must see the pending writes
+                    cls.flush()
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                with cls.redis_client.pipeline() as pipeline:
+                    for retry in range(cls.max_update_retries + 1):
+                        try:
+                            # Optimistic locking: EXEC fails if the key changed since WATCH
+                            pipeline.watch(identifier)
+                            try:
+                                data = pipeline.get(identifier)
+                                fields = None
+                            except ResponseError:
+                                # The state is a hash of fields (see save_fields)
+                                data = None
+                                fields = pipeline.hgetall(identifier)
+                            if fields is not None:
+                                value = function(_decode_fields(fields, _serializer))
+                            else:
+                                value = function(
+                                    None
+                                    if data is None
+                                    else _serializer.loads(cast(bytes, data))
+                                )
+                            pipeline.multi()
+                            if fields is not None and isinstance(value, dict) and value:
+                                # Kept as a hash, so fields can still be saved separately
+                                data = None
+                                pipeline.delete(identifier)
+                                pipeline.hset(
+                                    identifier,
+                                    mapping=_encode_fields(value, _serializer),
+                                )
+                            else:
+                                data = _serializer.dumps(value)
+                                pipeline.set(identifier, data)
+                            pipeline.execute()
+                            break
+                        except WatchError:
+                            cls.update_retries += 1
+                            if retry == cls.max_update_retries:
+                                raise
+                cls.updates += 1
+                if unit is not None:
+                    if data is None:
+                        unit.values.pop(identifier, None)
+                    else:
+                        unit.values[identifier] = data
+                return value
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def update_stats(cls) -> dict[str, int]:
+            """
+            Get the counters of the atomic updates.
+            :return: The number of updates, and the number of times an update was retried because of a concurrent write
+            """
+            return {"updates": cls.updates, "retries": cls.update_retries}
+
+        @classmethod
+        def load_many(
+            cls, identifiers: list[str], serializer: Optional[str] = None
+        ) -> list[Any]:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None and any(map(unit.needs_flush, identifiers)):
+                    cls.flush()
+                values = {}
+                missing = []
+                for identifier in identifiers:
+                    if unit is not None and identifier in unit.values:
+                        data = unit.values[identifier]
+                        values[identifier] = (
+                            None if data is None else _serializer.loads(data)
+                        )
+                        continue
+                    if cls.cache is not None:
+                        cached, value = cls.cache.get(
+                            identifier, serializer or cls.serializer
+                        )
+                        if cached:
+                            values[identifier] = value
+                            continue
+                    missing.append(identifier)
+                if missing:
+                    # A single MGET for everything that is not known locally
+                    found = dict(zip(missing, cls.redis_client.mget(missing)))
+                    # MGET does not return the states saved as hashes of fields (see save_fields)
+                    absent = [
+                        identifier for identifier, data in found.items() if data is None
+                    ]
+                    hashes = {}
+                    if absent:
+                        pipeline = cls.redis_client.pipeline(transaction=False)
+                        for identifier in absent:
+                            pipeline.hgetall(identifier)
+                        for identifier, fields in zip(
+                            absent, pipeline.execute(raise_on_error=False)
+                        ):
+                            if fields and not isinstance(fields, ResponseError):
+                                hashes[identifier] = _decode_fields(fields, _serializer)
+                    for identifier, data in found.items():
+                        if identifier in hashes:
+                            values[identifier] = hashes[identifier]
+                        else:
+                            if unit is not None:
+                                unit.values[identifier] = data
+                            if data is None:
+                                values[identifier] = None
+                                continue
+                            values[identifier] = _serializer.loads(cast(bytes, data))
+                        if cls.cache is not None:
+                            cls.cache.put(
+                                identifier,
+                                serializer or cls.serializer,
+                                values[identifier],
+                            )
+                return [values[identifier] for identifier in identifiers]
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def save_many(
+            cls, values: dict[str, Any], serializer: Optional[str] = None
+        ) -> bool:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                data = {
+                    identifier: _serializer.dumps(value)
+                    for identifier, value in values.items()
+                }
+                if cls.cache is not None:
+                    for identifier in data:
+                        cls.cache.invalidate(identifier)
+                unit = cls._unit_of_work.get()
+                if unit is None:
+                    return bool(cls.redis_client.mset(data))
+                for identifier, value in data.items():
+                    unit.write(identifier, value)
+                return True
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def exists_many(cls, identifiers: list[str]) -> list[bool]:
+            if cls.redis_client:
+                unit = cls._unit_of_work.get()
+                known = unit.values if unit is not None else {}
+                pipeline = cls.redis_client.pipeline(transaction=False)
+                for identifier in identifiers:
+                    if identifier not in known:
+                        pipeline.exists(identifier)
+                results = iter(pipeline.execute())
+                return [
+                    known[identifier] is not None
+                    if identifier in known
+                    else next(results) == 1
+                    for identifier in identifiers
+                ]
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def load_fields(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None and identifier in unit.pending:
+                    cls.flush()
+                # A single round trip whether the state is a hash of fields or was saved as a whole
+                pipeline = cls.redis_client.pipeline(transaction=False)
+                pipeline.hgetall(identifier)
+                pipeline.get(identifier)
+                fields, data = pipeline.execute(raise_on_error=False)
+                if not isinstance(fields, ResponseError) and fields:
+                    return _decode_fields(fields, _serializer)
+                if isinstance(data, ResponseError) or data is None:
+                    return None
+                return _serializer.loads(data)
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def load_or_init_fields(
+            cls, identifier: str, default: Any, serializer: Optional[str] = None
+        ) -> Any:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None and identifier in unit.pending:
+                    cls.flush()
+                # A single atomic round trip, whether the state is a hash of fields or was saved as a whole
+                pipeline = cls.redis_client.pipeline(transaction=True)
+                if isinstance(default, dict) and default:
+                    # The fields the state does not have yet are initialized
+                    for field, value in _encode_fields(default, _serializer).items():
+                        pipeline.hsetnx(identifier, field, value)
+                else:
+                    # Redis does not keep empty hashes, other states are saved as a whole
+                    pipeline.set(identifier, _serializer.dumps(default), nx=True)
+                pipeline.get(identifier)
+                pipeline.hgetall(identifier)
+                *_, data, fields = pipeline.execute(raise_on_error=False)
+                if unit is not None:
+                    unit.values.pop(identifier, None)
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                if not isinstance(fields, ResponseError):
+                    return _decode_fields(fields, _serializer)
+                return _serializer.loads(data)
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def save_fields(
+            cls,
+            identifier: str,
+            fields: dict[str, Any],
+            serializer: Optional[str] = None,
+        ) -> bool:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                data = _encode_fields(fields, _serializer)
+                if not data:
+                    return True
+                unit = cls._unit_of_work.get()
+                if unit is not None:
+                    # The fields are written to Redis right away, after the pending writes
+                    cls.flush()
+                    unit.values.pop(identifier, None)
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                try:
+                    cls.redis_client.hset(identifier, mapping=data)
+                except ResponseError:
+                    # The state was saved as a whole, e.g. by a previous version, convert it to a hash of fields
+                    current = cls.redis_client.get(identifier)
+                    merged = _encode_fields(
+                        _serializer.loads(cast(bytes, current)) or {}, _serializer
+                    )
+                    merged.update(data)
+                    pipeline = cls.redis_client.pipeline(transaction=True)
+                    pipeline.delete(identifier)
+                    pipeline.hset(identifier, mapping=merged)
+                    pipeline.execute()
+                return True
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def _forget(cls, identifiers: list[str]) -> None:
+            # Pending writes are flushed first, so they do not bring the deleted keys back later
+            unit = cls._unit_of_work.get()
+            if unit is not None:
+                cls.flush()
+                for identifier in identifiers:
+                    unit.values[identifier] = None
+            if cls.cache is not None:
+                for identifier in identifiers:
+                    cls.cache.invalidate(identifier)
+
+        @classmethod
+        def delete(cls, identifier: str) -> bool:
+            if cls.redis_client:
+                cls._forget([identifier])
+                return cls.redis_client.unlink(identifier) == 1
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def delete_many(cls, identifiers: list[str]) -> int:
+            if cls.redis_client:
+                identifiers = list(identifiers)
+                if not identifiers:
+                    return 0
+                cls._forget(identifiers)
+                pipeline = cls.redis_client.pipeline(transaction=False)
+                for start in range(0, len(identifiers), UNLINK_BATCH_SIZE):
+                    pipeline.unlink(*identifiers[start : start + UNLINK_BATCH_SIZE])
+                return sum(pipeline.execute())
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def keys(cls, namespace: Optional[str] = None) -> list[str]:
+            if cls.redis_client:
+                if namespace is None:
+                    keys = (
+                        key.decode() if isinstance(key, bytes) else key
+                        for key in cls.redis_client.scan_iter("*")
+                    )
+                    return [key for key in keys if not key.startswith(NAMESPACE_PREFIX)]
+                identifiers = [
+                    cast(bytes, identifier).decode()
+                    for identifier in cls.redis_client.smembers(
+                        f"{NAMESPACE_PREFIX}{namespace}"
+                    )
+                ]
+                return [
+                    identifier
+                    for identifier, exists in zip(
+                        identifiers, cls.exists_many(identifiers)
+                    )
+                    if exists
+                ]
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def track(cls, namespace: str, identifier: str) -> None:
+            if cls.redis_client:
+                cls.redis_client.sadd(f"{NAMESPACE_PREFIX}{namespace}", identifier)
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def track_many(cls, namespace: str, identifiers: list[str]) -> None:
+            if cls.redis_client:
+                if identifiers:
+                    cls.redis_client.sadd(
+                        f"{NAMESPACE_PREFIX}{namespace}", *identifiers
+                    )
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def clear_namespace(cls, namespace: str) -> None:
+            if cls.redis_client:
+                key = f"{NAMESPACE_PREFIX}{namespace}"
+                cls.delete_many(
+                    [
+                        cast(bytes, identifier).decode()
+                        for identifier in cls.redis_client.smembers(key)
+                    ]
+                )
+                cls.redis_client.unlink(key)
+            else:
+                raise Exception("Redis client not initialized")
+
         @classmethod
         def reset_backend(cls):
+            if cls.cache is not None:
+                cls.cache.clear()
             if cls.redis_client:
                 for key in cls.redis_client.scan_iter("*"):
                     cls.redis_client.delete(key)
@@ -48,36 +642,581 @@ try:
 
     class AsyncRedisBackend(AsyncHooksBackend):
         redis_client = None
+        serializer: str = DEFAULT_SERIALIZER
+
+        # The unit of work of the current request, if any (see unit_of_work)
+        _unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+            "async_redis_unit_of_work", default=None
+        )
+        # The optional in-process cache of the values read (see enable_cache)
+        cache: Optional[LocalCache] = None
+        _cache_listener: Any = None
+        # Atomic updates give up after this many conflicting writes
+        max_update_retries: int = 100
+        updates: int = 0
+        update_retries: int = 0
 
         @classmethod
-        async def use(cls, host: str, port: int, *args: Any, **kwargs: Any) -> Any:
+        async def use(
+            cls,
+            host: str,
+            port: int,
+            *args: Any,
+            serializer: Optional[str] = None,
+            **kwargs: Any,
+        ) -> Any:
+            if serializer is not None:
+                get_serializer(serializer)
+                cls.serializer = serializer
             cls.redis_client = async_redis.Redis(host=host, port=port, **kwargs)
             await super().use(**kwargs)
             return cls
 
         @classmethod
-        async def load(cls, identifier: str) -> Any:
+        @asynccontextmanager
+        async def unit_of_work(
+            cls, flush_policy: str = FLUSH_ON_EXIT
+        ) -> AsyncIterator[UnitOfWork]:
+            """
+            Buffer the reads and writes of a request. Values are read from Redis once and then served from an identity
+            map, and writes are coalesced per key and flushed in a single MULTI / EXEC when the unit of work ends. If
+            the block raises, the pending writes are discarded. Nested units of work join the outer one.
+            :param flush_policy: "exit" to flush only when the unit of work ends, or "read" to also flush before a key
+            with a pending write is read
+            :return: The unit of work
+            """
+            unit = cls._unit_of_work.get()
+            if unit is not None:
+                yield unit
+                return
+
+            unit = UnitOfWork(flush_policy)
+            token = cls._unit_of_work.set(unit)
+            try:
+                yield unit
+                await cls.flush()
+            finally:
+                cls._unit_of_work.reset(token)
+
+        @classmethod
+        async def flush(cls) -> None:
+            """
+            Write the pending writes of the current unit of work to Redis in a single MULTI / EXEC.
+            """
+            unit = cls._unit_of_work.get()
+            if unit is None:
+                return
+            pending = unit.take_pending()
+            if not pending:
+                return
+            if cls.redis_client:
+                pipeline = cls.redis_client.pipeline(transaction=True)
+                for identifier, data in pending.items():
+                    pipeline.set(identifier, data)
+                    if cls.cache is not None:
+                        cls.cache.invalidate(identifier)
+                await pipeline.execute()
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def enable_cache(
+            cls,
+            max_entries: int = 1024,
+            max_staleness: float = 1.0,
+            invalidate: bool = True,
+        ) -> LocalCache:
+            """
+            Cache the values read from Redis in-process. Entries are invalidated by the keyspace notifications of
+            Redis (which requires notify-keyspace-events to be enabled on the server), and are never served once they
+            are older than max_staleness.
+            :param max_entries: The maximal number of cached values, the least recently used are evicted first
+            :param max_staleness: The maximal age of a cached value in seconds
+            :param invalidate: Whether to listen to keyspace notifications in a background task
+            :return: The cache
+            """
             if cls.redis_client:
-                return pickle.loads(await cls.redis_client.get(identifier))
+                await cls.disable_cache()
+                cls.cache = LocalCache(max_entries, max_staleness)
+                if invalidate:
+                    pubsub = cls.redis_client.pubsub(ignore_subscribe_messages=True)
+                    await pubsub.psubscribe(
+                        **{
+                            keyspace_pattern(
+                                cls.redis_client
+                            ): cls.cache.invalidate_notification
+                        }
+                    )
+                    cls._cache_listener = asyncio.create_task(pubsub.run())
+                return cls.cache
             else:
                 raise Exception("Redis client not initialized")
 
         @classmethod
-        async def save(cls, identifier: str, value: Any) -> Union[bool, None, Any]:
+        async def disable_cache(cls) -> None:
+            if cls._cache_listener is not None:
+                cls._cache_listener.cancel()
+                cls._cache_listener = None
+            cls.cache = None
+
+        @classmethod
+        def cache_stats(cls) -> dict[str, int]:
+            """
+            Get the counters of the in-process cache.
+            :return: The number of entries, hits, misses and invalidations, empty if the cache is disabled
+            """
+            return cls.cache.stats() if cls.cache is not None else {}
+
+        @classmethod
+        async def load(cls, identifier: str, serializer: Optional[str] = None) -> Any:
+            if cls.redis_client:
+                serializer = serializer or cls.serializer
+                unit = cls._unit_of_work.get()
+                if unit is not None:
+                    if unit.needs_flush(identifier):
+                        await cls.flush()
+                    if identifier in unit.values:
+                        return get_serializer(serializer).loads(unit.values[identifier])
+                if cls.cache is not None:
+                    cached, value = cls.cache.get(identifier, serializer)
+                    if cached:
+                        return value
+                try:
+                    data = await cls.redis_client.get(identifier)
+                except ResponseError:
+                    # The state is a hash of fields (see save_fields)
+                    value = _decode_fields(
+                        await cls.redis_client.hgetall(identifier),
+                        get_serializer(serializer),
+                    )
+                else:
+                    if unit is not None:
+                        unit.values[identifier] = data
+                    value = get_serializer(serializer).loads(cast(bytes, data))
+                if cls.cache is not None:
+                    cls.cache.put(identifier, serializer, value)
+                return value
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def save(
+            cls, identifier: str, value: Any, serializer: Optional[str] = None
+        ) -> Union[bool, None, Any]:
             if cls.redis_client:
-                return await cls.redis_client.set(identifier, pickle.dumps(value))
+                data = get_serializer(serializer or cls.serializer).dumps(value)
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                unit = cls._unit_of_work.get()
+                if unit is None:
+                    return await cls.redis_client.set(identifier, data)
+                unit.write(identifier, data)
+                return True
             else:
                 raise Exception("Redis client not initialized")
 
         @classmethod
         async def exists(cls, identifier: str) -> bool:
             if cls.redis_client:
+                unit = cls._unit_of_work.get()
+                if unit is not None and identifier in unit.values:
+                    return unit.values[identifier] is not None
                 return await cls.redis_client.exists(identifier) == 1
             else:
                 raise Exception("Redis client not initialized")
 
+        @classmethod
+        async def load_or_init(
+            cls, identifier: str, default: Any, serializer: Optional[str] = None
+        ) -> Any:
+            if cls.redis_client:
+                serializer = serializer or cls.serializer
+                unit = cls._unit_of_work.get()
+                if unit is not None and unit.values.get(identifier) is not None:
+                    return await cls.load(identifier, serializer)
+                if cls.cache is not None:
+                    cached, value = cls.cache.get(identifier, serializer)
+                    if cached:
+                        return value
+                # A single round trip instead of EXISTS, GET and SET
+                data = get_serializer(serializer).dumps(default)
+                pipeline = cls.redis_client.pipeline()
+                pipeline.set(identifier, data, nx=True)
+                pipeline.get(identifier)
+                created, value = await pipeline.execute(raise_on_error=False)
+                if isinstance(value, ResponseError):
+                    # The state is a hash of fields (see save_fields)
+                    return await cls.load(identifier, serializer)
+                if unit is not None:
+                    unit.values[identifier] = data if created else value
+                value = default if created else get_serializer(serializer).loads(value)
+                if cls.cache is not None:
+                    cls.cache.put(identifier, serializer, value)
+                return value
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def update(
+            cls,
+            identifier: str,
+            function: Callable[[Any], Any],
+            serializer: Optional[str] = None,
+        ) -> Any:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None:
+                    # The update is applied to Redis right away, so it must see the pending writes
+                    await cls.flush()
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                async with cls.redis_client.pipeline() as pipeline:
+                    for retry in range(cls.max_update_retries + 1):
+                        try:
+                            # Optimistic locking: EXEC fails if the key changed since WATCH
+                            await pipeline.watch(identifier)
+                            try:
+                                data = await pipeline.get(identifier)
+                                fields = None
+                            except ResponseError:
+                                # The state is a hash of fields (see save_fields)
+                                data = None
+                                fields = await pipeline.hgetall(identifier)
+                            if fields is not None:
+                                value = function(_decode_fields(fields, _serializer))
+                            else:
+                                value = function(
+                                    None
+                                    if data is None
+                                    else _serializer.loads(cast(bytes, data))
+                                )
+                            pipeline.multi()
+                            if fields is not None and isinstance(value, dict) and value:
+                                # Kept as a hash, so fields can still be saved separately
+                                data = None
+                                pipeline.delete(identifier)
+                                pipeline.hset(
+                                    identifier,
+                                    mapping=_encode_fields(value, _serializer),
+                                )
+                            else:
+                                data = _serializer.dumps(value)
+                                pipeline.set(identifier, data)
+                            await pipeline.execute()
+                            break
+                        except WatchError:
+                            cls.update_retries += 1
+                            if retry == cls.max_update_retries:
+                                raise
+                cls.updates += 1
+                if unit is not None:
+                    if data is None:
+                        unit.values.pop(identifier, None)
+                    else:
+                        unit.values[identifier] = data
+                return value
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        def update_stats(cls) -> dict[str, int]:
+            """
+            Get the counters of the atomic updates.
+            :return: The number of updates, and the number of times an update was retried because of a concurrent write
+            """
+            return {"updates": cls.updates, "retries": cls.update_retries}
+
+        @classmethod
+        async def load_many(
+            cls, identifiers: list[str], serializer: Optional[str] = None
+        ) -> list[Any]:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None and any(map(unit.needs_flush, identifiers)):
+                    await cls.flush()
+                values = {}
+                missing = []
+                for identifier in identifiers:
+                    if unit is not None and identifier in unit.values:
+                        data = unit.values[identifier]
+                        values[identifier] = (
+                            None if data is None else _serializer.loads(data)
+                        )
+                        continue
+                    if cls.cache is not None:
+                        cached, value = cls.cache.get(
+                            identifier, serializer or cls.serializer
+                        )
+                        if cached:
+                            values[identifier] = value
+                            continue
+                    missing.append(identifier)
+                if missing:
+                    # A single MGET for everything that is not known locally
+                    found = dict(zip(missing, await cls.redis_client.mget(missing)))
+                    # MGET does not return the states saved as hashes of fields (see save_fields)
+                    absent = [
+                        identifier for identifier, data in found.items() if data is None
+                    ]
+                    hashes = {}
+                    if absent:
+                        pipeline = cls.redis_client.pipeline(transaction=False)
+                        for identifier in absent:
+                            pipeline.hgetall(identifier)
+                        for identifier, fields in zip(
+                            absent, await pipeline.execute(raise_on_error=False)
+                        ):
+                            if fields and not isinstance(fields, ResponseError):
+                                hashes[identifier] = _decode_fields(fields, _serializer)
+                    for identifier, data in found.items():
+                        if identifier in hashes:
+                            values[identifier] = hashes[identifier]
+                        else:
+                            if unit is not None:
+                                unit.values[identifier] = data
+                            if data is None:
+                                values[identifier] = None
+                                continue
+                            values[identifier] = _serializer.loads(cast(bytes, data))
+                        if cls.cache is not None:
+                            cls.cache.put(
+                                identifier,
+                                serializer or cls.serializer,
+                                values[identifier],
+                            )
+                return [values[identifier] for identifier in identifiers]
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def save_many(
+            cls, values: dict[str, Any], serializer: Optional[str] = None
+        ) -> bool:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                data = {
+                    identifier: _serializer.dumps(value)
+                    for identifier, value in values.items()
+                }
+                if cls.cache is not None:
+                    for identifier in data:
+                        cls.cache.invalidate(identifier)
+                unit = cls._unit_of_work.get()
+                if unit is None:
+                    return bool(await cls.redis_client.mset(data))
+                for identifier, value in data.items():
+                    unit.write(identifier, value)
+                return True
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def exists_many(cls, identifiers: list[str]) -> list[bool]:
+            if cls.redis_client:
+                unit = cls._unit_of_work.get()
+                known = unit.values if unit is not None else {}
+                pipeline = cls.redis_client.pipeline(transaction=False)
+                for identifier in identifiers:
+                    if identifier not in known:
+                        pipeline.exists(identifier)
+                results = iter(await pipeline.execute())
+                return [
+                    known[identifier] is not None
+                    if identifier in known
+                    else next(results) == 1
+                    for identifier in identifiers
+                ]
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def load_fields(
+            cls, identifier: str, serializer: Optional[str] = None
+        ) -> Any:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None and identifier in unit.pending:
+                    await cls.flush()
+                # A single round trip whether the state is a hash of fields or was saved as a whole
+                pipeline = cls.redis_client.pipeline(transaction=False)
+                pipeline.hgetall(identifier)
+                pipeline.get(identifier)
+                fields, data = await pipeline.execute(raise_on_error=False)
+                if not isinstance(fields, ResponseError) and fields:
+                    return _decode_fields(fields, _serializer)
+                if isinstance(data, ResponseError) or data is None:
+                    return None
+                return _serializer.loads(data)
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def load_or_init_fields(
+            cls, identifier: str, default: Any, serializer: Optional[str] = None
+        ) -> Any:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                unit = cls._unit_of_work.get()
+                if unit is not None and identifier in unit.pending:
+                    await cls.flush()
+                # A single atomic round trip, whether the state is a hash of fields or was saved as a whole
+                pipeline = cls.redis_client.pipeline(transaction=True)
+                if isinstance(default, dict) and default:
+                    # The fields the state does not have yet are initialized
+                    for field, value in _encode_fields(default, _serializer).items():
+                        pipeline.hsetnx(identifier, field, value)
+                else:
+                    # Redis does not keep empty hashes, other states are saved as a whole
+                    pipeline.set(identifier, _serializer.dumps(default), nx=True)
+                pipeline.get(identifier)
+                pipeline.hgetall(identifier)
+                *_, data, fields = await pipeline.execute(raise_on_error=False)
+                if unit is not None:
+                    unit.values.pop(identifier, None)
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                if not isinstance(fields, ResponseError):
+                    return _decode_fields(fields, _serializer)
+                return _serializer.loads(data)
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def save_fields(
+            cls,
+            identifier: str,
+            fields: dict[str, Any],
+            serializer: Optional[str] = None,
+        ) -> bool:
+            if cls.redis_client:
+                _serializer = get_serializer(serializer or cls.serializer)
+                data = _encode_fields(fields, _serializer)
+                if not data:
+                    return True
+                unit = cls._unit_of_work.get()
+                if unit is not None:
+                    # The fields are written to Redis right away, after the pending writes
+                    await cls.flush()
+                    unit.values.pop(identifier, None)
+                if cls.cache is not None:
+                    cls.cache.invalidate(identifier)
+                try:
+                    await cls.redis_client.hset(identifier, mapping=data)
+                except ResponseError:
+                    # The state was saved as a whole, e.g. by a previous version, convert it to a hash of fields
+                    current = await cls.redis_client.get(identifier)
+                    merged = _encode_fields(
+                        _serializer.loads(cast(bytes, current)) or {}, _serializer
+                    )
+                    merged.update(data)
+                    pipeline = cls.redis_client.pipeline(transaction=True)
+                    pipeline.delete(identifier)
+                    pipeline.hset(identifier, mapping=merged)
+                    await pipeline.execute()
+                return True
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def _forget(cls, identifiers: list[str]) -> None:
+            # Pending writes are flushed first, so they do not bring the deleted keys back later
+            unit = cls._unit_of_work.get()
+            if unit is not None:
+                await cls.flush()
+                for identifier in identifiers:
+                    unit.values[identifier] = None
+            if cls.cache is not None:
+                for identifier in identifiers:
+                    cls.cache.invalidate(identifier)
+
+        @classmethod
+        async def delete(cls, identifier: str) -> bool:
+            if cls.redis_client:
+                await cls._forget([identifier])
+                return await cls.redis_client.unlink(identifier) == 1
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def delete_many(cls, identifiers: list[str]) -> int:
+            if cls.redis_client:
+                identifiers = list(identifiers)
+                if not identifiers:
+                    return 0
+                await cls._forget(identifiers)
+                pipeline = cls.redis_client.pipeline(transaction=False)
+                for start in range(0, len(identifiers), UNLINK_BATCH_SIZE):
+                    pipeline.unlink(*identifiers[start : start + UNLINK_BATCH_SIZE])
+                return sum(await pipeline.execute())
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def keys(cls, namespace: Optional[str] = None) -> list[str]:
+            if cls.redis_client:
+                if namespace is None:
+                    keys = []
+                    async for key in cls.redis_client.scan_iter("*"):
+                        key = key.decode() if isinstance(key, bytes) else key
+                        if not key.startswith(NAMESPACE_PREFIX):
+                            keys.append(key)
+                    return keys
+                identifiers = [
+                    cast(bytes, identifier).decode()
+                    for identifier in await cls.redis_client.smembers(
+                        f"{NAMESPACE_PREFIX}{namespace}"
+                    )
+                ]
+                return [
+                    identifier
+                    for identifier, exists in zip(
+                        identifiers, await cls.exists_many(identifiers)
+                    )
+                    if exists
+                ]
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def track(cls, namespace: str, identifier: str) -> None:
+            if cls.redis_client:
+                await cls.redis_client.sadd(
+                    f"{NAMESPACE_PREFIX}{namespace}", identifier
+                )
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def track_many(cls, namespace: str, identifiers: list[str]) -> None:
+            if cls.redis_client:
+                if identifiers:
+                    await cls.redis_client.sadd(
+                        f"{NAMESPACE_PREFIX}{namespace}", *identifiers
+                    )
+            else:
+                raise Exception("Redis client not initialized")
+
+        @classmethod
+        async def clear_namespace(cls, namespace: str) -> None:
+            if cls.redis_client:
+                key = f"{NAMESPACE_PREFIX}{namespace}"
+                await cls.delete_many(
+                    [
+                        cast(bytes, identifier).decode()
+                        for identifier in await cls.redis_client.smembers(key)
+                    ]
+                )
+                await cls.redis_client.unlink(key)
+            else:
+                raise Exception("Redis client not initialized")
+
         @classmethod
         async def reset_backend(cls):
+            if cls.cache is not None:
+                cls.cache.clear()
             if cls.redis_client:
                 for key in await cls.redis_client.scan_iter("*"):
                     await cls.redis_client.delete(key)
@@ -0,0 +1,143 @@
+from typing import Any, Callable, Optional, Protocol
+
+from contextlib import AbstractContextManager
+from contextvars import ContextVar
+
+from ..backends.async_interface import AsyncHooksBackend
+
+# Pending writes are flushed when the unit of work ends
+FLUSH_ON_EXIT = "exit"
+# Pending writes are also flushed before a key with a pending write is read again
+FLUSH_ON_READ = "read"
+
+FLUSH_POLICIES = (FLUSH_ON_EXIT, FLUSH_ON_READ)
+
+
+def validate_flush_policy(policy: str) -> str:
+    """
+    Make sure a flush policy is known.
+    :param policy: The flush policy
+    :return: The flush policy
+    """
+    if policy not in FLUSH_POLICIES:
+        raise ValueError(
+            f"Unknown flush policy '{policy}', use one of {', '.join(FLUSH_POLICIES)}"
+        )
+    return policy
+
+
+class UnitOfWorkBackend(Protocol):
+    """
+    A backend class that runs units of work, e.g. RedisBackend or AsyncRedisBackend. The methods of asynchronous
+    backends are coroutine functions and their units of work are asynchronous context managers.
+    """
+
+    def unit_of_work(self, flush_policy: str = FLUSH_ON_EXIT) -> Any:
+        ...
+
+    def flush(self) -> Any:
+        ...
+
+
+class UnitOfWork:
+    """
+    The state of a unit of work: an identity map of the serialized values read or written so far, and the writes that
+    were not flushed yet. Writes to the same key are coalesced, only the last one is flushed.
+    """
+
+    def __init__(self, flush_policy: str = FLUSH_ON_EXIT) -> None:
+        self.flush_policy = validate_flush_policy(flush_policy)
+        self.values: dict[str, Any] = {}
+        self.pending: dict[str, Any] = {}
+
+    def write(self, identifier: str, data: Any) -> None:
+        self.values[identifier] = data
+        self.pending[identifier] = data
+
+    def needs_flush(self, identifier: str) -> bool:
+        """
+        Check whether the pending writes must be flushed before reading a key.
+        :param identifier: The key that is about to be read
+        :return: True if the writes must be flushed first
+        """
+        return self.flush_policy == FLUSH_ON_READ and identifier in self.pending
+
+    def take_pending(self) -> dict[str, Any]:
+        pending, self.pending = self.pending, {}
+        return pending
+
+
+_flask_unit_of_work: ContextVar[
+    Optional[AbstractContextManager[UnitOfWork]]
+] = ContextVar("flask_unit_of_work", default=None)
+
+
+def init_app(
+    app: Any, backend: UnitOfWorkBackend, flush_policy: str = FLUSH_ON_EXIT
+) -> None:
+    """
+    Run every request of a Flask app in a unit of work of the backend. The writes of a request are flushed when it is
+    torn down, or discarded if it failed.
+    :param app: The Flask app
+    :param backend: The backend class, e.g. RedisBackend
+    :param flush_policy: The flush policy of the units of work
+    """
+    validate_flush_policy(flush_policy)
+
+    @app.before_request
+    def begin_unit_of_work() -> None:
+        manager: AbstractContextManager[UnitOfWork] = backend.unit_of_work(flush_policy)
+        manager.__enter__()
+        _flask_unit_of_work.set(manager)
+
+    @app.teardown_request
+    def end_unit_of_work(exception: Optional[BaseException] = None) -> None:
+        manager = _flask_unit_of_work.get()
+        if manager is None:
+            return
+        _flask_unit_of_work.set(None)
+        if exception is None:
+            manager.__exit__(None, None, None)
+        else:
+            manager.__exit__(type(exception), exception, exception.__traceback__)
+
+
+class UnitOfWorkMiddleware:
+    """
+    An ASGI middleware that runs every HTTP request in a unit of work of the backend. The pending writes are flushed
+    before the response starts, so a client never sees a response before its writes are stored, and again when the
+    request ends. Writes of failed requests are discarded.
+    """
+
+    def __init__(
+        self,
+        app: Callable[..., Any],
+        backend: UnitOfWorkBackend,
+        flush_policy: str = FLUSH_ON_EXIT,
+    ) -> None:
+        self.app = app
+        self.backend = backend
+        self.flush_policy = validate_flush_policy(flush_policy)
+        self.is_async = isinstance(backend, type) and issubclass(
+            backend, AsyncHooksBackend
+        )
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def flushing_send(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                if self.is_async:
+                    await self.backend.flush()
+                else:
+                    self.backend.flush()
+            await send(message)
+
+        if self.is_async:
+            async with self.backend.unit_of_work(self.flush_policy):
+                await self.app(scope, receive, flushing_send)
+        else:
+            with self.backend.unit_of_work(self.flush_policy):
+                await self.app(scope, receive, flushing_send)
@@ -5,6 +5,7 @@ from typing import Any, Callable
 from box import Box
 
 from hooks import create_context, set_context_value, use_context
+from hooks.backends.backend_state import get_hooks_backend
 
 StateSelector = Callable[[Any], Any]
 SetTyping = Callable[[StateSelector], None]
@@ -27,9 +28,10 @@ class ZustandStore:
             )
 
         def getter() -> Box:
-            return Box(
-                {**use_context(self.state_context), **use_context(self.config_context)}
+            state, config = get_hooks_backend().load_many(
+                [self.state_context, self.config_context]
             )
+            return Box({**state, **config})
 
         self.setter = setter
         self.getter = getter
@@ -1,90 +1,652 @@
 # mypy: ignore-errors
-from typing import Any, Callable, Optional
+from types import CodeType
+from typing import Any, Callable, Optional, Union
 
+import hashlib
 import inspect
-from contextlib import contextmanager
+import logging
+import threading
+from contextvars import ContextVar
 from functools import wraps
 
+from pyhashxx import hashxx
+
+from .backends.backend_state import get_hooks_backend
+from .backends.copy_policy import backend_copy_policy
+from .backends.python_objects_backend import (
+    async_python_object_backend_factory,
+    python_object_backend_factory,
+)
+
+logger = logging.getLogger(__name__)
+
 HOOKED_FUNCTION_ATTRIBUTE = "__hooked_function__"
+SLOTS_KEY = "__hooks_slots__"
+# The values of the async hooks of a scope are kept apart, as they may live in another backend than the sync hooks
+ASYNC_SLOTS_KEY = "__hooks_async_slots__"
 
+# Hooks are identified by the frames that lead to them (filename, line number and function name)
+FRAME_IDENTITY = "frame"
+# Hooks are identified by the order in which they are called inside the scope, like React does
+ORDER_IDENTITY = "order"
 
-@contextmanager
-def _hook_scope_manager(
-    wrapped: Callable[[Any], Any],
-    parametrize: Optional[list[str]] = None,
-    *args: Any,
-    **kwargs: dict[str, Any],
-) -> None:
+# The number of bytes of the digest of the scope keys computed with key functions
+SCOPE_DIGEST_SIZE = 16
+
+# The backend namespaces that track the state of every scope key are named with this prefix
+SCOPE_NAMESPACE_PREFIX = "__hooks_scope__"
+# Set on disposable scope functions, computes the namespace of a scope key (see dispose_scope)
+SCOPE_NAMESPACE_ATTRIBUTE = "__hooks_scope_namespace__"
+
+# The backends that do not support namespaces, their scopes are not tracked
+_untracked_backends: set[Any] = set()
+
+
+def _implements_code(attribute: Any, code: CodeType) -> bool:
+    """
+    Check whether a class attribute is the function that runs the given code object, looking through classmethod /
+    staticmethod descriptors and decorators that set __wrapped__ (such as hook_scope).
+    :param attribute: The attribute found in the class __dict__
+    :param code: The code object of the function
+    :return: True if the attribute runs the given code object
+    """
+    function = getattr(attribute, "__func__", attribute)
+    while function is not None:
+        if getattr(function, "__code__", None) is code:
+            return True
+        function = getattr(function, "__wrapped__", None)
+    return False
+
+
+def _is_method_of(function: Callable[[Any], Any], args: tuple[Any, ...]) -> bool:
+    """
+    Check whether a function was called as a method (or classmethod) of its first argument.
+    :param function: The function that was called
+    :param args: The positional arguments it was called with
+    :return: True if the first argument owns the function
+    """
+    if not args:
+        return False
+    owner_class = args[0] if isinstance(args[0], type) else type(args[0])
+    for base in owner_class.__mro__:
+        attribute = base.__dict__.get(function.__name__)
+        if attribute is not None:
+            return not isinstance(attribute, staticmethod) and _implements_code(
+                attribute, function.__code__
+            )
+    return False
+
+
+class _HookOrder:
+    """
+    The order of hooks recorded on the first call of a scope, used to detect conditional hook calls in debug mode.
+    The order is only published once a call completes, so a call that raised halfway does not leave a partial order.
+    """
+
+    def __init__(self) -> None:
+        self.hooks: list[Optional[str]] = []
+        self.complete = False
+        self.lock = threading.Lock()
+
+    def publish(self, hooks: list[Optional[str]]) -> bool:
+        """
+        Publish the order of hooks of a completed call, unless a concurrent call published it first.
+        :param hooks: The names of the hooks in the order in which the call used them
+        :return: True if the order was published
+        """
+        with self.lock:
+            if self.complete:
+                return False
+            self.hooks = hooks
+            self.complete = True
+            return True
+
+
+class _HookSlots:
+    """
+    The state of all the hooks called inside a hook_scope that uses the order identity engine. Hooks are numbered by
+    the order in which they are called and their values are kept in a single list persisted under one backend key per
+    scope. The object is used as the backend of these hooks, with the hook index as their identifier. Sync and async
+    hooks share the numbering, but async hooks keep their values in the backend returned by for_hook.
+    """
+
+    key_prefix = SLOTS_KEY
+
+    def __init__(self, owner: Any, order: Optional[_HookOrder] = None) -> None:
+        self.owner = owner
+        self.order = order
+        self.index = 0
+        # Calls that start before the order of the scope is known record the hooks they call
+        self.recording = order is not None and not order.complete
+        self.recorded: list[Optional[str]] = []
+        self.key: Optional[str] = None
+        self.values: Optional[list[Any]] = None
+        self.asynchronous: Optional[_AsyncHookSlots] = None
+
+    def for_hook(self, using_async: bool) -> "_HookSlots":
+        """
+        Get the backend of a hook of the scope.
+        :param using_async: Whether the hook is async
+        :return: The slots of the sync or async hooks of the scope
+        """
+        if not using_async:
+            return self
+        if self.asynchronous is None:
+            self.asynchronous = _AsyncHookSlots(self.owner)
+        return self.asynchronous
+
+    def claim(self, hook_name: Optional[str] = None) -> int:
+        """
+        Claim the next hook index of the scope.
+        :param hook_name: The name of the hook, only needed in debug mode
+        :return: The index of the hook
+        """
+        index = self.index
+        self.index += 1
+        if self.order is not None:
+            if self.recording:
+                self.recorded.append(hook_name)
+            elif index >= len(self.order.hooks) or self.order.hooks[index] != hook_name:
+                raise RuntimeError(
+                    f"Hook {hook_name} was called as hook number {index + 1} of the scope, but the hooks of the "
+                    f"scope were previously called in the order {self.order.hooks}. Hooks must not be called "
+                    f"conditionally when using the '{ORDER_IDENTITY}' identity."
+                )
+        return index
+
+    def close(self) -> None:
+        """
+        Finish the scope call, making sure that all the hooks of the scope were called in debug mode.
+        """
+        if self.order is None:
+            return
+        if self.recording:
+            if self.order.publish(self.recorded):
+                return
+            # Another call published the order while this one was running
+            if self.recorded != self.order.hooks:
+                raise RuntimeError(
+                    f"Hooks were called in the order {self.recorded}, but in the order {self.order.hooks} by "
+                    f"another call of the scope. Hooks must not be called conditionally when using the "
+                    f"'{ORDER_IDENTITY}' identity."
+                )
+        elif self.index != len(self.order.hooks):
+            raise RuntimeError(
+                f"{self.index} hooks were called in the scope, but {len(self.order.hooks)} were called previously. "
+                f"Hooks must not be called conditionally when using the '{ORDER_IDENTITY}' identity."
+            )
+
+    def _backend(self) -> Any:
+        if self.owner is not None:
+            return python_object_backend_factory(self.owner)
+        return get_hooks_backend()
+
+    @property
+    def copy_policy(self) -> str:
+        # The values are kept in a list saved to the backend, so they are copied the way the backend copies the list
+        return backend_copy_policy(self._backend())
+
+    def _key(self) -> str:
+        return self.key_prefix + str(hashxx(_current_scope.get()[0]))
+
+    def _load(self) -> list[Any]:
+        if self.values is None:
+            backend = self._backend()
+            self.key = self._key()
+            identifiers = _current_scope.get()[2]
+            if self.owner is None and identifiers is not None:
+                identifiers.add(self.key)
+            self.values = backend.load(self.key) if backend.exists(self.key) else []
+        return self.values
+
+    def _set(self, identifier: int, value: Any) -> list[Any]:
+        values = self.values
+        if identifier >= len(values):
+            values.extend([None] * (identifier + 1 - len(values)))
+        values[identifier] = value
+        return values
+
+    def load(self, identifier: int, serializer: Optional[str] = None) -> Any:
+        return self._load()[identifier]
+
+    def save(
+        self, identifier: int, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        self._load()
+        return self._backend().save(self.key, self._set(identifier, value))
+
+    def exists(self, identifier: int) -> bool:
+        return identifier < len(self._load())
+
+    def update(
+        self,
+        identifier: int,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        value = function(self.load(identifier) if self.exists(identifier) else None)
+        self.save(identifier, value)
+        return value
+
+    def load_or_init(
+        self, identifier: int, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        if self.exists(identifier):
+            return self.load(identifier)
+        self.save(identifier, default)
+        return default
+
+
+class _AsyncHookSlots(_HookSlots):
+    """
+    The asynchronous version of _HookSlots, used by the async hooks of a scope. The hooks are numbered by the
+    _HookSlots of the scope.
+    """
+
+    key_prefix = ASYNC_SLOTS_KEY
+
+    def _backend(self) -> Any:
+        if self.owner is not None:
+            return async_python_object_backend_factory(self.owner)
+        return get_hooks_backend(using_async=True)
+
+    async def _load(self) -> list[Any]:
+        if self.values is None:
+            backend = self._backend()
+            self.key = self._key()
+            identifiers = _current_scope.get()[2]
+            if self.owner is None and identifiers is not None:
+                identifiers.add(self.key)
+            self.values = (
+                await backend.load(self.key)
+                if (await backend.exists(self.key)) is True
+                else []
+            )
+        return self.values
+
+    async def load(self, identifier: int, serializer: Optional[str] = None) -> Any:
+        return (await self._load())[identifier]
+
+    async def save(
+        self, identifier: int, value: Any, serializer: Optional[str] = None
+    ) -> bool:
+        await self._load()
+        return await self._backend().save(self.key, self._set(identifier, value))
+
+    async def exists(self, identifier: int) -> bool:
+        return identifier < len(await self._load())
+
+    async def update(
+        self,
+        identifier: int,
+        function: Callable[[Any], Any],
+        serializer: Optional[str] = None,
+    ) -> Any:
+        value = function(
+            await self.load(identifier) if await self.exists(identifier) else None
+        )
+        await self.save(identifier, value)
+        return value
+
+    async def load_or_init(
+        self, identifier: int, default: Any, serializer: Optional[str] = None
+    ) -> Any:
+        if await self.exists(identifier):
+            return await self.load(identifier)
+        await self.save(identifier, default)
+        return default
+
+
+# The innermost hook scope of the current thread or asyncio task, None outside of scopes. It holds the identifiers of
+# the nested scopes joined with ";" (encoded, as they are hashed into the hook identifiers), the hook slots of the
+# innermost scope when it uses the order identity and the identifiers of the state kept in the global backend by the
+# hooks of the scope call, shared with the innermost disposable or ephemeral scope (None if there is none). The tuple
+# is never replaced while the scope runs, a nested scope sets a new one.
+_current_scope: ContextVar[
+    Optional[tuple[bytes, Optional[_HookSlots], Optional[set[str]]]]
+] = ContextVar("hooks_current_scope", default=None)
+
+
+def _scope_digest(key: Any) -> str:
+    """
+    Compute the fixed width digest of a scope key, so the scope identifier stays small whatever the key.
+    :param key: The scope key
+    :return: The digest in hex
+    """
+    return hashlib.blake2b(str(key).encode(), digest_size=SCOPE_DIGEST_SIZE).hexdigest()
+
+
+def _compile_scope_key(
+    function: Callable[[Any], Any],
+    parametrize: Union[
+        list[str], dict[str, Optional[Callable[[Any], Any]]], None
+    ] = None,
+    key: Optional[Callable[..., Any]] = None,
+) -> Callable[[tuple[Any, ...], dict[str, Any]], str]:
+    """
+    Resolve which arguments of a function identify its scope once, when the function is decorated.
+    :param function: The function that is being wrapped
+    :param parametrize: The names of the arguments to limit the scope to, all the arguments if None. A dict maps the
+    names to the functions that extract the part of the argument that identifies the scope (None for the whole value)
+    :param key: A function called with all the arguments of a call by name, that returns the key of the scope
+    :return: A function of the args and kwargs of a call that returns the identifier of the scope of the call
+    """
+    qualname = function.__qualname__
+    # The names of the arguments, as sometimes they are not passed as kwargs and we need to identify them in order to
+    # see if they are in the parametrize
+    names = function.__code__.co_varnames[: function.__code__.co_argcount]
+
+    if key is not None:
+
+        def scope_key_function(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+            return (
+                f"{qualname}#{_scope_digest(key(**dict(zip(names, args)), **kwargs))}"
+            )
+
+        return scope_key_function
+
+    keywords = None if parametrize is None else frozenset(parametrize)
+    positions = tuple(
+        (index, name)
+        for index, name in enumerate(names)
+        if keywords is None or name in keywords
+    )
+
+    if keywords is not None and not keywords:
+        return lambda args, kwargs: qualname
+
+    if isinstance(parametrize, dict):
+        extractors = {
+            name: extractor or (lambda value: value)
+            for name, extractor in parametrize.items()
+        }
+        # Keyword only arguments can only be passed by name
+        keyword_names = tuple(name for name in parametrize if name not in names)
+
+        def scope_key_extractors(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+            # In the order of the parameters, whether the arguments are passed by position or by name
+            identifier = ""
+            for index, name in positions:
+                if index < len(args):
+                    identifier += f"{name}:{extractors[name](args[index])};"
+                elif name in kwargs:
+                    identifier += f"{name}:{extractors[name](kwargs[name])};"
+            for name in keyword_names:
+                if name in kwargs:
+                    identifier += f"{name}:{extractors[name](kwargs[name])};"
+            return f"{qualname}#{_scope_digest(identifier)}"
+
+        return scope_key_extractors
+
+    def scope_key(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+        identifier = qualname
+        for name, value in kwargs.items():
+            if keywords is None or name in keywords:
+                identifier += f"{name}:{value};"
+        for index, name in positions:
+            if index < len(args):
+                identifier += f"{name}:{args[index]};"
+        return identifier
+
+    return scope_key
+
+
+def _compile_scope_namespace(
+    function: Callable[[Any], Any],
+    scope_key: Callable[[tuple[Any, ...], dict[str, Any]], str],
+) -> Callable[[tuple[Any, ...], dict[str, Any]], str]:
+    """
+    Build the function that computes the backend namespace tracking the state of a scope key. The arguments are
+    passed to the scope key by name in the order of the parameters, so the namespace is the same whether they were
+    passed by position or by name, and dispose_scope can compute it from keyword arguments only.
+    :param function: The function that is being wrapped
+    :param scope_key: The function that computes the identifier of the scope of a call
+    :return: A function of the args and kwargs of a call that returns the namespace of the scope of the call
     """
-    A context manager to manage the scope of hooks. This is used to identify the scope of hooks and to limit the scope
-    of hooks to the function and keys.
-    :param wrapped: The function that is being wrapped
-    :param parametrize: The keys to limit the scope to
-    :param args: The args of the function
-    :param kwargs: The kwargs of the function
+    code = function.__code__
+    names = code.co_varnames[: code.co_argcount + code.co_kwonlyargcount]
+
+    def scope_namespace(args: tuple[Any, ...], kwargs: dict[str, Any]) -> str:
+        arguments = dict(zip(names, args), **kwargs)
+        ordered = {name: arguments[name] for name in names if name in arguments}
+        for name in sorted(arguments):
+            ordered.setdefault(name, arguments[name])
+        return SCOPE_NAMESPACE_PREFIX + _scope_digest(scope_key((), ordered))
+
+    return scope_namespace
+
+
+def _enter_scope(
+    identifier: str, slots: Optional[_HookSlots] = None, tracking: bool = False
+) -> Any:
     """
+    Make a scope the innermost hook scope of the current context.
+    :param identifier: The identifier of the scope
+    :param slots: The hook slots of the scope when it uses the order identity, None otherwise
+    :param tracking: Whether the scope tracks the state its hooks create, otherwise the state is only tracked by the
+     enclosing scopes that do
+    :return: The token to reset the current scope with once the scope exits
+    """
+    parent = _current_scope.get()
+    encoded = identifier.encode()
+    if parent is not None:
+        encoded = parent[0] + b";" + encoded
+    if tracking:
+        identifiers: Optional[set[str]] = set()
+    else:
+        identifiers = parent[2] if parent is not None else None
+    return _current_scope.set((encoded, slots, identifiers))
 
-    # Code to acquire resource, e.g.:
-    identifier = ""
 
-    # We get the names of the arguments as sometimes they are not passed as kwargs and we need to identify
-    # them in order to see if they are in the parametrize.
-    args_names = wrapped.__code__.co_varnames[: wrapped.__code__.co_argcount]
+def _exit_scope(token: Any, ephemeral: bool) -> Optional[set[str]]:
+    """
+    Restore the scope that was current before a tracking scope was entered. The state the scope created is also part
+    of the enclosing scopes, so disposing an enclosing scope disposes it too.
+    :param token: The token returned by _enter_scope
+    :param ephemeral: Whether the state of the scope is dropped on exit, in which case it is not passed on
+    :return: The identifiers of the state the hooks of the scope kept in the global backend
+    """
+    _, _, identifiers = _current_scope.get()
+    _current_scope.reset(token)
+    parent = _current_scope.get()
+    if identifiers and parent is not None and parent[2] is not None and not ephemeral:
+        parent[2].update(identifiers)
+    return identifiers
 
-    for key, value in [*kwargs.items(), *list(zip(args_names, args))]:
-        if parametrize is None or key in parametrize:
-            identifier += f"{key}:{value};"
-    _hook_scope_manager.current_identifier.append(f"{wrapped.__qualname__}{identifier}")
+
+def _release_scope(
+    token: Any,
+    scope_namespace: Callable[[tuple[Any, ...], dict[str, Any]], str],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    ephemeral: bool,
+) -> None:
+    """
+    Exit a tracking scope, then drop the state it created if it is ephemeral or track it in the namespace of its scope
+    key. Failures are logged rather than raised, the scope call itself already completed.
+    :param token: The token returned by _enter_scope
+    :param scope_namespace: The function that computes the namespace of the scope
+    :param args: The positional arguments of the scope call
+    :param kwargs: The keyword arguments of the scope call
+    :param ephemeral: Whether the state of the scope only lives for the duration of the call
+    """
+    identifiers = _exit_scope(token, ephemeral)
+    if not identifiers:
+        return
+    backend = get_hooks_backend()
+    if ephemeral:
+        try:
+            backend.delete_many(list(identifiers))
+        except Exception:
+            logger.exception("Could not delete the state of an ephemeral hook scope")
+        return
+    if backend in _untracked_backends:
+        return
+    # Tracked on every exit, another process may have disposed the scope since this one last tracked it
     try:
-        yield
-    finally:
-        # Code to release resource, e.g.:
-        _hook_scope_manager.current_identifier.pop()
+        backend.track_many(scope_namespace(args, kwargs), list(identifiers))
+    except NotImplementedError:
+        _untracked_backends.add(backend)
+    except Exception:
+        logger.exception("Could not track the state of a hook scope")
 
 
-_hook_scope_manager.current_identifier = []
+async def _async_release_scope(
+    token: Any,
+    scope_namespace: Callable[[tuple[Any, ...], dict[str, Any]], str],
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    ephemeral: bool,
+) -> None:
+    """
+    The asynchronous version of _release_scope, used by scopes of coroutine functions.
+    """
+    identifiers = _exit_scope(token, ephemeral)
+    if not identifiers:
+        return
+    backend = get_hooks_backend(using_async=True)
+    if ephemeral:
+        try:
+            await backend.delete_many(list(identifiers))
+        except Exception:
+            logger.exception("Could not delete the state of an ephemeral hook scope")
+        return
+    if backend in _untracked_backends:
+        return
+    # Tracked on every exit, another process may have disposed the scope since this one last tracked it
+    try:
+        await backend.track_many(scope_namespace(args, kwargs), list(identifiers))
+    except NotImplementedError:
+        _untracked_backends.add(backend)
+    except Exception:
+        logger.exception("Could not track the state of a hook scope")
 
 
 def hook_scope(
-    parametrize: Optional[list[str]] = None, use_global_scope: Optional[bool] = False
+    parametrize: Union[
+        list[str], dict[str, Optional[Callable[[Any], Any]]], None
+    ] = None,
+    use_global_scope: Optional[bool] = False,
+    identity: str = FRAME_IDENTITY,
+    debug: Optional[bool] = False,
+    key: Optional[Callable[..., Any]] = None,
+    disposable: bool = False,
+    ephemeral: bool = False,
 ) -> Callable[[Any], Any]:
     """
     Create a scope for all hooks in the scope. The scope will be added to the hook identifiers to allow for state to
     be scoped either per the function and below or by the function and keys.
-    :param parametrize: The keys to limit the scope to.
+    :param parametrize: The keys to limit the scope to. A dict maps the keys to functions that extract the part of the
+     argument that identifies the scope (e.g. {"user": lambda user: user.id}), or to None to use the whole argument.
     :param use_global_scope: If True, the scope and all hooks will be persisted globally and will not be limited to the
-     instance. If this is True, you must specify the keys to limit the scope to because we cannot identify the self / cls
-        argument automatically.
+     instance. If this is True, you must specify the keys to limit the scope to because we cannot identify the self /
+        cls argument automatically.
+    :param identity: How hooks inside the scope are identified. "frame" (the default) identifies hooks by the frames
+     that lead to them. "order" numbers hooks by the order in which they are called and keeps the state of all of them
+        in a single list per scope, like React does. Hooks must then never be called conditionally.
+    :param debug: Only with the "order" identity, raise an error when hooks are not called in the same order on every
+     call of the scope.
+    :param key: A function that computes the key of the scope instead of parametrize, called with all the arguments of
+     the scope function by name (e.g. lambda user, **_: user.id). Keys computed by functions, or with the functions of
+     a parametrize dict, are hashed into a fixed width digest, so large arguments do not make large identifiers.
+    :param disposable: If True, the state the hooks of the scope (and of the scopes nested in it) keep in the global
+     backend is tracked per scope key, so dispose_scope can delete it. The backend must support namespaces.
+    :param ephemeral: If True, the state the hooks of the scope keep in the global backend only lives for the duration
+     of the call and is deleted when the call returns.
     """
 
-    if use_global_scope and parametrize is None:
+    if key is not None and parametrize is not None:
+        raise ValueError("Use either parametrize or a key function, not both.")
+    if use_global_scope and parametrize is None and key is None:
         raise ValueError(
             "You must specify the keys to limit the state to (parametrize) if you want to use global "
             "scope, if your function only has self or cls as arguments, you can use an empty list '[]'."
         )
+    if identity not in (FRAME_IDENTITY, ORDER_IDENTITY):
+        raise ValueError(
+            f"Unknown hooks identity '{identity}', use '{FRAME_IDENTITY}' or '{ORDER_IDENTITY}'."
+        )
 
     # The function argument is called "__hooked_function" on purpose to be able to identify it in the frame utils
     def scope_decorator(__hooked_function__) -> Callable[[Any], Any]:
         __hooked_function__.use_global_scope = use_global_scope
+        is_async = inspect.iscoroutinefunction(__hooked_function__)
+        order = _HookOrder() if debug else None
+        # Whether the function is a method of its first argument, resolved on the first call
+        is_method: list[bool] = []
+
+        def create_slots(args: tuple[Any, ...]) -> Optional[_HookSlots]:
+            if identity != ORDER_IDENTITY:
+                return None
+            if not is_method:
+                is_method.append(
+                    not use_global_scope and _is_method_of(__hooked_function__, args)
+                )
+            owner = args[0] if is_method[0] else None
+            return _HookSlots(owner, order)
+
+        scope_key = _compile_scope_key(__hooked_function__, parametrize, key)
+        scope_namespace = _compile_scope_namespace(__hooked_function__, scope_key)
+        tracking = disposable or ephemeral
 
-        if inspect.iscoroutinefunction(__hooked_function__):
+        if is_async:
 
             @wraps(__hooked_function__)
             async def wrapper(*args, **kwargs) -> Any:
-                with _hook_scope_manager(
-                    __hooked_function__, parametrize, *args, **kwargs
-                ):
-                    return await __hooked_function__(*args, **kwargs)
+                slots = create_slots(args)
+                token = _enter_scope(scope_key(args, kwargs), slots, tracking)
+                try:
+                    result = await __hooked_function__(*args, **kwargs)
+                    if slots is not None:
+                        slots.close()
+                    return result
+                finally:
+                    if tracking:
+                        await _async_release_scope(
+                            token, scope_namespace, args, kwargs, ephemeral
+                        )
+                    else:
+                        _current_scope.reset(token)
 
         else:
 
             @wraps(__hooked_function__)
             def wrapper(*args, **kwargs) -> Any:
-                with _hook_scope_manager(
-                    __hooked_function__, parametrize, *args, **kwargs
-                ):
-                    return __hooked_function__(*args, **kwargs)
+                slots = create_slots(args)
+                token = _enter_scope(scope_key(args, kwargs), slots, tracking)
+                try:
+                    result = __hooked_function__(*args, **kwargs)
+                    if slots is not None:
+                        slots.close()
+                    return result
+                finally:
+                    if tracking:
+                        _release_scope(token, scope_namespace, args, kwargs, ephemeral)
+                    else:
+                        _current_scope.reset(token)
 
+        if disposable:
+            setattr(wrapper, SCOPE_NAMESPACE_ATTRIBUTE, scope_namespace)
         return wrapper
 
     return scope_decorator
+
+
+def dispose_scope(function: Callable[..., Any], **params: Any) -> Any:
+    """
+    Delete all the state the hooks of a scope keep in the global backend for one scope key, e.g. the state of a user
+    session once it ends. The state of nested scopes called inside the scope is deleted too, while state kept on
+    instances is released together with its instance. The backend must support namespaces.
+    :param function: The function decorated with hook_scope(disposable=True)
+    :param params: The arguments that identify the scope key, by name
+    :return: None, or a coroutine to await if the function is a coroutine function
+    """
+    scope_namespace = getattr(function, SCOPE_NAMESPACE_ATTRIBUTE, None)
+    if scope_namespace is None:
+        raise ValueError(
+            f"{function.__qualname__} is not decorated with hook_scope(disposable=True)."
+        )
+    namespace = scope_namespace((), params)
+    if inspect.iscoroutinefunction(function):
+        return get_hooks_backend(using_async=True).clear_namespace(namespace)
+    get_hooks_backend().clear_namespace(namespace)
@@ -2,30 +2,53 @@
 
 from typing import Any, Callable, Optional, TypeVar, Union
 
+import hashlib
+import pickle
+
 from .backends.backend_state import get_hooks_backend
+from .backends.copy_policy import detach_value
 from .frame_utils import __identify_hook_and_backend
 
 T = TypeVar("T")
 
+# How use_memo compares the dependencies of a call with the dependencies of the values it cached: "identity" compares
+# every dependency with `is`, "shallow" with `==` and "hash" compares a digest of all the dependencies
+IDENTITY_EQUALITY = "identity"
+SHALLOW_EQUALITY = "shallow"
+HASH_EQUALITY = "hash"
+MEMO_EQUALITIES = (IDENTITY_EQUALITY, SHALLOW_EQUALITY, HASH_EQUALITY)
+MEMO_DIGEST_SIZE = 16
+# Encoded by their repr by the hash equality, which is the same in every process
+_CANONICAL_TYPES = (type(None), bool, int, float, complex, str, bytes)
+
 
-def use_state(default_value: T) -> tuple[T, Callable[[Any], Any]]:
+def use_state(
+    default_value: T, serializer: Optional[str] = None
+) -> tuple[T, Callable[[Any], Any]]:
     """
     Create a stateful hook.
     :param default_value: The default value of the state
-    :return: The current value of the state and a function to update the state
+    :param serializer: The name of the serializer to use instead of the backend's default one
+    :return: The current value of the state and a function to update the state, which takes the new value. Its update
+    attribute takes a function of the previous value instead, and returns the new value
     """
     identifier, _backend = __identify_hook_and_backend()
+    options = {"serializer": serializer} if serializer else {}
 
     def state_wrapper(value: T) -> None:
         state_wrapper.val = value
-        _backend.save(identifier, value)
+        _backend.save(identifier, value, **options)
+
+    def update(function: Callable[[T], T]) -> T:
+        # A functional update is applied atomically to the latest state of the backend
+        state_wrapper.val = _backend.update(identifier, function, **options)
+        return state_wrapper.val
 
-    if _backend.exists(identifier):
-        loaded_value = _backend.load(identifier)
-        state_wrapper.val = loaded_value
-        return state_wrapper.val, state_wrapper
+    # Callables are values like any other, functional updates go through set_state.update
+    state_wrapper.update = update
+    state_wrapper.backend = _backend
 
-    state_wrapper(default_value)
+    state_wrapper.val = _backend.load_or_init(identifier, default_value, **options)
     return state_wrapper.val, state_wrapper
 
 
@@ -52,21 +75,130 @@ def use_effect(
     saved_dependencies, set_dependencies = use_state(dependencies or [])
     has_ran, set_initial_ran = use_state(False)
     if saved_dependencies != dependencies or not has_ran:
-        set_dependencies(dependencies)
+        # Backends may keep the state by reference, a copy notices dependencies that are later mutated in place
+        set_dependencies(detach_value(dependencies, set_dependencies.backend))
         set_initial_ran(True)
         callback()
     return
 
 
-def use_memo(callback: Callable[[], Any], dependencies: list[Any]) -> Any:
+def _canonical(value: Any) -> bytes:
     """
-    Create a memoized hook. The callback will be called when the dependencies change. Practically it is an alias for
-    use_effect.
-    :param callback: The callback to call when the dependencies change
-    :param dependencies: The dependencies to watch for changes
-    :return: The return value of the callback
+    Encode a dependency of use_memo so that equal values have the same encoding in every process. Sets and dicts are
+    sorted by the encoding of their items, which does not depend on the hash seed of the process, and every item is
+    encoded on its own, so shared references do not change the encoding. Other objects are pickled, their encoding is
+    only as stable as their pickle.
+    :param value: The dependency
+    :return: The encoding
+    """
+    value_type = type(value)
+    if value_type in _CANONICAL_TYPES:
+        body = repr(value).encode()
+    elif value_type is list or value_type is tuple:
+        body = b"".join(_canonical(item) for item in value)
+    elif value_type is set or value_type is frozenset:
+        body = b"".join(sorted(_canonical(item) for item in value))
+    elif value_type is dict:
+        body = b"".join(
+            sorted(_canonical(key) + _canonical(item) for key, item in value.items())
+        )
+    else:
+        body = pickle.dumps(value, protocol=4)
+    return f"{value_type.__qualname__}:{len(body)}:".encode() + body
+
+
+def _memo_key(dependencies: list[Any], equality: str, max_size: Optional[int]) -> Any:
+    """
+    Get the key use_memo compares with the keys of the values it cached.
+    :param dependencies: The dependencies of the call
+    :param equality: How the dependencies are compared
+    :param max_size: The number of values to cache
+    :return: The dependencies, or their digest with the hash equality
+    """
+    if equality not in MEMO_EQUALITIES:
+        raise ValueError(
+            f"Unknown memo equality '{equality}', use one of {', '.join(MEMO_EQUALITIES)}"
+        )
+    if max_size is not None and max_size < 1:
+        raise ValueError("The max size of a memo must be at least 1")
+    if equality == HASH_EQUALITY:
+        # Encoded canonically, so the digest is the same in every process sharing the backend
+        return hashlib.blake2b(
+            _canonical(list(dependencies)), digest_size=MEMO_DIGEST_SIZE
+        ).hexdigest()
+    return list(dependencies)
+
+
+def _memo_entry(key: Any, value: Any, equality: str, backend: Any) -> list[Any]:
+    """
+    Create the entry use_memo caches for a new value.
+    :param key: The key of the dependencies of the call
+    :param value: The value
+    :param equality: How the dependencies are compared
+    :param backend: The backend the entry is saved to
+    :return: The [key, value] pair
     """
-    return use_effect(callback, dependencies)
+    if equality == SHALLOW_EQUALITY:
+        # Backends may keep the state by reference, a copy notices dependencies that are later mutated in place. Only
+        # new entries are copied, calls that find their value do not pay for it
+        key = detach_value(key, backend)
+    return [key, value]
+
+
+def _memo_find(entries: list[list[Any]], key: Any, equality: str) -> int:
+    """
+    Find the cached value of the dependencies of a call.
+    :param entries: The cached [key, value] pairs, the most recently used last
+    :param key: The key of the dependencies of the call
+    :param equality: How the dependencies are compared
+    :return: The index of the entry, or -1 if the value was not cached
+    """
+    for index in range(len(entries) - 1, -1, -1):
+        cached = entries[index][0]
+        if equality == IDENTITY_EQUALITY:
+            if len(cached) == len(key) and all(
+                dependency is other for dependency, other in zip(cached, key)
+            ):
+                return index
+        elif cached == key:
+            return index
+    return -1
+
+
+def use_memo(
+    callback: Callable[[], Any],
+    dependencies: list[Any],
+    equality: str = SHALLOW_EQUALITY,
+    max_size: Optional[int] = None,
+) -> Any:
+    """
+    Create a memoized hook. The callback computes the value, and is only called again when the dependencies change.
+    :param callback: The function that computes the value
+    :param dependencies: The dependencies of the value
+    :param equality: How the dependencies are compared: "shallow" (the default) compares every dependency with `==`,
+     "identity" with `is` (only with backends that keep state by reference) and "hash" compares a digest of the
+        canonically encoded dependencies, so large dependencies are not kept
+    :param max_size: The number of values to cache for different dependencies, the least recently used value is
+     dropped first. By default only the value of the latest dependencies is kept
+    :return: The value
+    """
+    identifier, _backend = __identify_hook_and_backend()
+    key = _memo_key(dependencies, equality, max_size)
+    entries = _backend.load_or_init(identifier, [])
+    index = _memo_find(entries, key, equality)
+    if index >= 0:
+        value = entries[index][1]
+        if index != len(entries) - 1:
+            _backend.save(
+                identifier, entries[:index] + entries[index + 1 :] + [entries[index]]
+            )
+        return value
+    value = callback()
+    _backend.save(
+        identifier,
+        (entries + [_memo_entry(key, value, equality, _backend)])[-(max_size or 1) :],
+    )
+    return value
 
 
 def create_context(default_value: Any) -> str:
@@ -78,8 +210,7 @@ def create_context(default_value: Any) -> str:
     identifier, _backend = __identify_hook_and_backend(
         always_global_backend=True, prefix="__hooks_context__"
     )
-    if not _backend.exists(identifier):
-        _backend.save(identifier, default_value)
+    _backend.load_or_init(identifier, default_value)
     return identifier
 
 
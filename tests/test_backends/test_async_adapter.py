@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+import pytest
+
+from hooks.asyncio.use import use_state
+from hooks.backends.async_adapter import async_backend
+from hooks.backends.backend_state import get_hooks_backend
+from hooks.backends.memory_backend import MemoryBackend
+from hooks.backends.sqlite_backend import SQLiteBackend
+
+
+class BlockingBackend(MemoryBackend):
+    blocking = True
+
+    _store = {}
+    _namespaces = {}
+    threads: set = set()
+    batches: list = []
+
+    @classmethod
+    def load_many(cls, identifiers, serializer=None):
+        cls.threads.add(threading.current_thread().name)
+        cls.batches.append(list(identifiers))
+        return super().load_many(identifiers, serializer)
+
+
+@pytest.fixture()
+def blocking_backend():
+    BlockingBackend.use()
+    yield BlockingBackend
+    BlockingBackend.reset_backend()
+    BlockingBackend.batches.clear()
+    MemoryBackend.use()
+
+
+async def counter() -> int:
+    count, set_count = await use_state(0)
+    await set_count.update(lambda previous: previous + 1)
+    return count
+
+
+async def test_async_hooks_with_sync_backend() -> None:
+    adapter = get_hooks_backend(using_async=True)
+    assert adapter is async_backend(MemoryBackend)
+    assert adapter.backend is MemoryBackend
+
+    assert await counter() == 0
+    assert await counter() == 1
+    assert await adapter.save_many({"john": 1})
+    assert await adapter.load("john") == 1
+    assert MemoryBackend.load("john") == 1
+    assert await adapter.delete("john")
+
+
+async def test_concurrent_reads_are_batched(blocking_backend) -> None:
+    adapter = async_backend(blocking_backend)
+    await adapter.save_many({"john": 1, "jane": 2})
+
+    assert await asyncio.gather(
+        adapter.load("john"), adapter.load("jane"), adapter.load("john")
+    ) == [1, 2, 1]
+    assert blocking_backend.batches == [["john", "jane"]]
+    assert all(thread.startswith("hooks-") for thread in blocking_backend.threads)
+
+    assert await asyncio.gather(adapter.exists("john"), adapter.exists("jack")) == [
+        True,
+        False,
+    ]
+
+
+async def test_sqlite_backend(tmp_path) -> None:
+    adapter = async_backend(SQLiteBackend)
+    await adapter.use(str(tmp_path / "hooks.sqlite3"))
+    try:
+        assert get_hooks_backend(using_async=True) is adapter
+        await asyncio.gather(*(counter() for _ in range(10)))
+        assert await counter() == 10
+    finally:
+        MemoryBackend.use()
+
+
+async def test_context_is_carried_to_the_pool(blocking_backend) -> None:
+    import contextvars
+
+    request = contextvars.ContextVar("request", default=None)
+    seen = []
+
+    class ContextBackend(BlockingBackend):
+        @classmethod
+        def save(cls, identifier, value, serializer=None):
+            seen.append(request.get())
+            return super().save(identifier, value, serializer)
+
+    request.set("request 1")
+    await async_backend(ContextBackend).save("john", 1)
+    assert seen == ["request 1"]
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from hooks.asyncio.use import use_state
+from hooks.backends.async_memory_backend import AsyncMemoryBackend, ContextVarsBackend
+from hooks.backends.memory_backend import MemoryBackend
+
+
+@pytest.fixture(params=[AsyncMemoryBackend, ContextVarsBackend])
+async def backend(request):
+    await request.param.use()
+    yield request.param
+    await request.param.reset_backend()
+    MemoryBackend.use()
+
+
+async def counter() -> int:
+    count, set_count = await use_state(0)
+    await set_count.update(lambda previous: previous + 1)
+    return count
+
+
+async def test_state_in_a_task(backend) -> None:
+    assert await counter() == 0
+    assert await counter() == 1
+
+    assert await backend.save_many({"john": 1, "jane": [2]})
+    assert await backend.load_many(["jane", "john", "jack"]) == [[2], 1, None]
+    assert await backend.exists_many(["john", "jack"]) == [True, False]
+    assert await backend.delete("john")
+    assert not await backend.exists("john")
+
+
+async def test_shared_between_tasks() -> None:
+    await AsyncMemoryBackend.use()
+    try:
+        await asyncio.gather(*(counter() for _ in range(10)))
+        assert await counter() == 10
+    finally:
+        await AsyncMemoryBackend.reset_backend()
+        MemoryBackend.use()
+
+
+async def test_tasks_are_isolated() -> None:
+    await ContextVarsBackend.use()
+    try:
+        assert await counter() == 0
+
+        # Every task starts from a snapshot of the state when it was spawned
+        assert await asyncio.gather(*(counter() for _ in range(3))) == [1, 1, 1]
+        assert await counter() == 1
+
+        child = asyncio.ensure_future(counter())
+        assert await counter() == 2
+        assert await child == 2
+    finally:
+        await ContextVarsBackend.reset_backend()
+        MemoryBackend.use()
@@ -0,0 +1,107 @@
+from typing import Any
+
+import time
+from collections import OrderedDict
+
+import pytest
+
+from hooks.backends.bounded_memory_backend import BoundedMemoryBackend
+from hooks.backends.memory_backend import MemoryBackend
+
+
+@pytest.fixture()
+def bounded_backend():
+    class IsolatedBoundedMemoryBackend(BoundedMemoryBackend):
+        _store = OrderedDict()
+        _namespaces = {}
+        _identifier_namespaces = {}
+        _sizes = {}
+        _expires_at = {}
+
+    def use(**kwargs: Any) -> type[BoundedMemoryBackend]:
+        IsolatedBoundedMemoryBackend.use(**kwargs)
+        return IsolatedBoundedMemoryBackend
+
+    yield use
+    # Using the isolated backend replaced the global backend
+    MemoryBackend.use()
+
+
+def test_evicts_least_recently_used_entries(bounded_backend) -> None:
+    backend = bounded_backend(max_entries=2)
+    backend.save("john", 1)
+    backend.save("jane", 2)
+    backend.load("john")
+    backend.save("jack", 3)
+
+    assert sorted(backend.keys()) == ["jack", "john"]
+    assert not backend.exists("jane")
+    assert backend.stats()["evictions"] == 1
+
+
+def test_evicts_by_serialized_size(bounded_backend) -> None:
+    backend = bounded_backend(max_bytes=100)
+    backend.save("john", "a" * 40)
+    backend.save("jane", "b" * 40)
+    backend.save("jack", "c" * 40)
+
+    assert sorted(backend.keys()) == ["jack", "jane"]
+    assert backend.stats()["bytes"] <= 100
+
+    # An entry bigger than the limit replaces everything else but is kept
+    backend.save("huge", "d" * 200)
+    assert backend.keys() == ["huge"]
+    assert backend.load("huge") == "d" * 200
+
+
+def test_use_keeps_the_limits_not_passed(bounded_backend) -> None:
+    backend = bounded_backend(max_entries=2, ttl=60)
+    bounded_backend(copy_policy="pickle")
+
+    assert backend.max_entries == 2
+    assert backend.ttl == 60
+    bounded_backend(max_entries=None)
+    assert backend.max_entries is None
+
+
+def test_byte_limit_counts_existing_entries(bounded_backend) -> None:
+    backend = bounded_backend(copy_policy="copy")
+    backend.save("john", "a" * 40)
+    backend.save("jane", "b" * 40)
+    bounded_backend(max_bytes=100)
+    backend.save("jack", "c" * 40)
+
+    assert sorted(backend.keys()) == ["jack", "jane"]
+    assert backend.stats()["bytes"] <= 100
+
+
+def test_entries_expire(bounded_backend) -> None:
+    backend = bounded_backend(ttl=0.05)
+    backend.save("john", 1)
+    backend.save("jane", 2, ttl=60)
+    backend.save("jack", 3)
+    backend.expire("jack", None)
+    time.sleep(0.1)
+
+    assert backend.load("john") is None
+    assert sorted(backend.keys()) == ["jack", "jane"]
+    assert backend.stats()["expirations"] == 1
+    assert not backend.expire("john", 60)
+
+
+def test_evicted_entries_leave_their_namespaces(bounded_backend) -> None:
+    backend = bounded_backend(max_entries=1)
+    backend.save("john_points", 1)
+    backend.track("john", "john_points")
+    backend.save("jane_points", 2)
+
+    assert backend.keys("john") == []
+    assert "john" not in backend._namespaces
+
+
+def test_bulk_operations(bounded_backend) -> None:
+    backend = bounded_backend(max_entries=2)
+    backend.save_many({"john": 1, "jane": 2, "jack": 3})
+
+    assert backend.load_many(["john", "jane", "jack"]) == [None, 2, 3]
+    assert backend.exists_many(["john", "jack"]) == [False, True]
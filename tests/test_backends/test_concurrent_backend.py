@@ -0,0 +1,143 @@
+from threading import Barrier, Thread
+from time import perf_counter
+
+import pytest
+
+from hooks.backends.concurrent_backend import ConcurrentBackend, _Shard
+from hooks.backends.memory_backend import MemoryBackend
+
+
+class IsolatedConcurrentBackend(ConcurrentBackend):
+    _layout = ([_Shard() for _ in range(8)], 7)
+    _namespaces = {}
+
+
+class IsolatedMemoryBackend(MemoryBackend):
+    _store = {}
+    _namespaces = {}
+
+
+@pytest.fixture(autouse=True)
+def reset_backends():
+    yield
+    IsolatedConcurrentBackend.reset_backend()
+    IsolatedMemoryBackend.reset_backend()
+
+
+def test_state_is_shared_between_threads() -> None:
+    thread = Thread(target=IsolatedConcurrentBackend.save, args=("points", 1))
+    thread.start()
+    thread.join()
+
+    assert IsolatedConcurrentBackend.load("points") == 1
+    assert IsolatedConcurrentBackend.load_or_init("points", 0) == 1
+    assert IsolatedConcurrentBackend.load_or_init("level", 0) == 0
+    assert sorted(IsolatedConcurrentBackend.keys()) == ["level", "points"]
+
+
+def test_bulk_operations_and_namespaces() -> None:
+    IsolatedConcurrentBackend.save_many({f"user_{index}": index for index in range(20)})
+    IsolatedConcurrentBackend.track("first", "user_0")
+    IsolatedConcurrentBackend.track("first", "user_1")
+
+    assert IsolatedConcurrentBackend.load_many(["user_3", "user_0", "nobody"]) == [
+        3,
+        0,
+        None,
+    ]
+    assert IsolatedConcurrentBackend.exists_many(["user_19", "nobody"]) == [
+        True,
+        False,
+    ]
+    assert sorted(IsolatedConcurrentBackend.keys("first")) == ["user_0", "user_1"]
+
+    IsolatedConcurrentBackend.clear_namespace("first")
+    assert not IsolatedConcurrentBackend.exists("user_0")
+    assert IsolatedConcurrentBackend.delete("user_2")
+    assert not IsolatedConcurrentBackend.delete("user_2")
+    assert len(IsolatedConcurrentBackend.keys()) == 17
+
+
+def test_reshard() -> None:
+    IsolatedConcurrentBackend.save_many({f"user_{index}": index for index in range(20)})
+    IsolatedConcurrentBackend._reshard(32)
+    try:
+        assert IsolatedConcurrentBackend.load_many(["user_0", "user_19"]) == [0, 19]
+        with pytest.raises(ValueError):
+            IsolatedConcurrentBackend._reshard(12)
+    finally:
+        IsolatedConcurrentBackend._reshard(8)
+
+
+def _throughput(backend, threads: int, operations: int = 2000) -> float:
+    barrier = Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        identifiers = [f"thread_{index}_hook_{hook}" for hook in range(8)]
+        barrier.wait()
+        for operation in range(operations):
+            identifier = identifiers[operation % 8]
+            backend.save(identifier, backend.load_or_init(identifier, 0) + 1)
+
+    workers = [Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = perf_counter() - start
+
+    assert sum(backend.load_many(backend.keys())) == threads * operations
+    return threads * operations / elapsed
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("threads", [1, 4, 16])
+def test_throughput(threads: int) -> None:
+    memory = _throughput(IsolatedMemoryBackend, threads)
+    concurrent = _throughput(IsolatedConcurrentBackend, threads)
+
+    # Locking costs something while the GIL serializes the threads anyway, but it must stay in the same ballpark
+    assert concurrent > memory / 5, (
+        f"{threads} threads: MemoryBackend {memory:,.0f} ops/s, "
+        f"ConcurrentBackend {concurrent:,.0f} ops/s"
+    )
+
+
+@pytest.mark.parametrize("backend", [IsolatedMemoryBackend, IsolatedConcurrentBackend])
+def test_concurrent_updates_are_not_lost(backend) -> None:
+    def worker() -> None:
+        for _ in range(500):
+            backend.update("points", lambda points: (points or 0) + 1)
+
+    threads = [Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.load("points") == 8 * 500
+
+
+def test_fields_are_kept_in_the_shards() -> None:
+    def worker(index: int) -> None:
+        IsolatedConcurrentBackend.save_fields("user", {f"field_{index}": index})
+
+    threads = [Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert IsolatedConcurrentBackend.load_fields("user") == {
+        f"field_{index}": index for index in range(8)
+    }
+    assert IsolatedConcurrentBackend.keys() == ["user"]
+
+    # Fields are merged under the locks of the shard, not the lock of MemoryBackend
+    with MemoryBackend._lock:
+        thread = Thread(target=worker, args=(8,))
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
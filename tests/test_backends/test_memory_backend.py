@@ -0,0 +1,117 @@
+from statistics import median
+from timeit import Timer
+
+import pytest
+
+from hooks.backends.memory_backend import MemoryBackend
+
+
+@pytest.fixture()
+def backend():
+    class IsolatedMemoryBackend(MemoryBackend):
+        _store = {}
+        _namespaces = {}
+
+    yield IsolatedMemoryBackend
+    IsolatedMemoryBackend.reset_backend()
+
+
+@pytest.fixture()
+def copy_policy(backend):
+    def use(policy: str) -> None:
+        backend.use(copy_policy=policy)
+
+    return use
+
+
+def test_copy_policy_isolates_saved_containers(backend, copy_policy) -> None:
+    copy_policy("copy")
+    tasks = ["Do the dishes"]
+    backend.save("tasks", tasks)
+    tasks.append("Do the laundry")
+
+    assert backend.load("tasks") == ["Do the dishes"]
+
+
+def test_trust_policy_stores_references(backend, copy_policy) -> None:
+    copy_policy("trust")
+    tasks = ["Do the dishes"]
+    backend.save("tasks", tasks)
+
+    assert backend.load("tasks") is tasks
+
+
+def test_freeze_policy_rejects_mutable_values(backend, copy_policy) -> None:
+    copy_policy("freeze")
+    backend.save("point", (1, ("x", 2.0)))
+
+    assert backend.load("point") == (1, ("x", 2.0))
+    with pytest.raises(TypeError):
+        backend.save("tasks", ["Do the dishes"])
+    with pytest.raises(TypeError):
+        backend.save("point", (1, []))
+
+
+def test_pickle_policy_copies_deeply(backend, copy_policy) -> None:
+    copy_policy("pickle")
+    state = {"tasks": ["Do the dishes"]}
+    backend.save("state", state)
+    backend.load("state")["tasks"].append("Do the laundry")
+
+    assert backend.load("state") == {"tasks": ["Do the dishes"]}
+
+
+def test_keys_and_namespaces(backend) -> None:
+    backend.save("john_points", 1)
+    backend.save("john_level", 2)
+    backend.save("jane_points", 3)
+    backend.track("john", "john_points")
+    backend.track("john", "john_level")
+
+    assert sorted(backend.keys()) == [
+        "jane_points",
+        "john_level",
+        "john_points",
+    ]
+    assert sorted(backend.keys("john")) == ["john_level", "john_points"]
+
+    assert backend.delete("john_level")
+    assert not backend.delete("john_level")
+    assert backend.keys("john") == ["john_points"]
+
+    backend.clear_namespace("john")
+    assert backend.keys() == ["jane_points"]
+    assert backend.keys("john") == []
+
+    backend.reset_backend()
+    assert backend.keys() == []
+    assert not backend.exists("jane_points")
+
+
+def test_unknown_copy_policy() -> None:
+    with pytest.raises(ValueError):
+        MemoryBackend.use(copy_policy="unknown")
+
+
+@pytest.mark.benchmark
+def test_reference_policies_are_faster_than_pickling(backend, copy_policy) -> None:
+    # Roughly 50 KB of state
+    state = {f"key_{index}": f"value_{index}" * 3 for index in range(2000)}
+
+    def round_trip() -> None:
+        backend.save("state", state)
+        backend.load("state")
+
+    timings = {}
+    for policy in ("pickle", "copy", "trust"):
+        copy_policy(policy)
+        timings[policy] = median(Timer(round_trip).repeat(repeat=5, number=5))
+
+    assert timings["copy"] < timings["pickle"]
+    assert timings["trust"] < timings["pickle"]
+
+
+def test_bulk_operations(backend) -> None:
+    assert backend.save_many({"john": 1, "jane": 2})
+    assert backend.load_many(["jane", "john", "jack"]) == [2, 1, None]
+    assert backend.exists_many(["jane", "jack"]) == [True, False]
@@ -0,0 +1,126 @@
+import gc
+import inspect
+
+import pytest
+
+from hooks.backends import python_objects_backend
+from hooks.use import use_state
+
+
+class Counter:
+    def count(self) -> int:
+        count, set_count = use_state(0)
+        set_count(count + 1)
+        return count
+
+
+class SlotsCounter:
+    __slots__ = ("__weakref__",)
+
+    def count(self) -> int:
+        count, set_count = use_state(0)
+        set_count(count + 1)
+        return count
+
+
+class IntCounter(int):
+    def count(self) -> int:
+        count, set_count = use_state(0)
+        set_count(count + 1)
+        return count
+
+
+class ClosedSlotsCounter:
+    __slots__ = ()
+
+    def count(self) -> int:
+        count, set_count = use_state(0)
+        set_count(count + 1)
+        return count
+
+
+@pytest.mark.parametrize("owner_class", [Counter, SlotsCounter, IntCounter])
+def test_instance_state(owner_class) -> None:
+    first, second = owner_class(), owner_class()
+    assert [first.count(), first.count(), second.count()] == [0, 1, 0]
+
+
+def test_state_is_released_with_the_object() -> None:
+    owner = Counter()
+    owner.count()
+    assert id(owner) in python_objects_backend._backends
+    assert not hasattr(owner, python_objects_backend.STATE_ATTRIBUTE)
+
+    owner_id = id(owner)
+    del owner
+    gc.collect()
+    assert owner_id not in python_objects_backend._backends
+
+
+def test_objects_without_state_storage() -> None:
+    owner, other = ClosedSlotsCounter(), ClosedSlotsCounter()
+    assert [owner.count(), owner.count(), other.count()] == [0, 1, 0]
+    # The object is kept alive with its state until it is released
+    assert python_objects_backend._pinned[id(owner)][0] is owner
+
+    python_objects_backend.release_object_state(owner)
+    assert id(owner) not in python_objects_backend._pinned
+    assert id(owner) not in python_objects_backend._backends
+    assert owner.count() == 0
+    python_objects_backend.release_object_state(owner)
+    python_objects_backend.release_object_state(other)
+
+
+def test_backends_implement_the_interface() -> None:
+    from hooks.backends.async_interface import AsyncHooksBackend
+    from hooks.backends.interface import HooksBackend
+
+    owner = Counter()
+    backend = python_objects_backend.python_object_backend_factory(owner)
+    async_backend = python_objects_backend.async_python_object_backend_factory(owner)
+    for interface, instance in [
+        (HooksBackend, backend),
+        (AsyncHooksBackend, async_backend),
+    ]:
+        for name in vars(interface):
+            if not name.startswith("_") and name not in ("use", "blocking"):
+                method = getattr(instance, name)
+                assert method.__qualname__.startswith(type(instance).__name__)
+                assert inspect.iscoroutinefunction(method) == (
+                    interface is AsyncHooksBackend
+                )
+
+
+def test_bulk_and_field_operations(tmp_path) -> None:
+    owner = Counter()
+    backend = python_objects_backend.python_object_backend_factory(owner)
+    default = {"name": "", "age": 0}
+
+    assert backend.save_many({"a": 1, "b": None})
+    assert backend.exists_many(["a", "b", "c"]) == [True, True, False]
+    assert backend.load_many(["a", "c"]) == [1, None]
+    assert backend.load_or_init_fields("profile", default) is default
+    assert backend.save_fields("profile", {"name": "John"})
+    assert backend.load_fields("profile") == {"name": "John", "age": 0}
+    assert default == {"name": "", "age": 0}
+
+    path = str(tmp_path / "state.snapshot")
+    assert backend.snapshot(path) == 3
+    assert backend.delete_many(["a", "b", "c"]) == 2
+    assert backend.keys() == ["profile"]
+    assert backend.restore(path) == 3
+    assert backend.load_many(["a", "b"]) == [1, None]
+
+
+async def test_async_backend_shares_the_object_state() -> None:
+    owner = Counter()
+    backend = python_objects_backend.python_object_backend_factory(owner)
+    async_backend = python_objects_backend.async_python_object_backend_factory(owner)
+
+    backend.save("count", 1)
+    assert await async_backend.update("count", lambda count: count + 1) == 2
+    assert await async_backend.load_many(["count"]) == [2]
+    assert await async_backend.save_fields("profile", {"name": "John"})
+    assert backend.load_fields("profile") == {"name": "John"}
+    assert await async_backend.delete_many(["count", "profile"]) == 2
+    assert backend.keys() == []
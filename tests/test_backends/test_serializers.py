@@ -0,0 +1,102 @@
+from array import array
+from dataclasses import dataclass
+
+import dill
+import pytest
+
+from hooks.backends.memory_backend import MemoryBackend
+from hooks.backends.serializers import (
+    PICKLE_PROTO,
+    Serializer,
+    get_serializer,
+    register_serializer,
+)
+from hooks.backends.threadsafe_backend import ThreadsafeBackend
+from hooks.use import use_state
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+@pytest.mark.parametrize("name", ["auto", "dill", "pickle", "primitive", "json"])
+def test_plain_data_round_trip(name: str) -> None:
+    serializer = get_serializer(name)
+    value = {"tasks": ["Do the dishes"], "count": 2, "ratio": 0.5, "done": None}
+
+    assert serializer.loads(serializer.dumps(value)) == value
+
+
+def test_msgpack_round_trip() -> None:
+    pytest.importorskip("msgpack")
+    serializer = get_serializer("msgpack")
+
+    assert serializer.loads(serializer.dumps({1: ["a", 2]})) == {1: ["a", 2]}
+
+
+def test_auto_serializer_picks_the_fastest_format() -> None:
+    serializer = get_serializer("auto")
+
+    assert serializer.dumps({"count": (1, 2)})[0] != PICKLE_PROTO
+    assert serializer.dumps(Point(1, 2))[0] == PICKLE_PROTO
+    assert serializer.loads(serializer.dumps(Point(1, 2))) == Point(1, 2)
+    assert serializer.loads(serializer.dumps(lambda: 42))() == 42
+
+
+def test_auto_serializer_reads_dill_payloads() -> None:
+    assert get_serializer("auto").loads(dill.dumps({"count": 1})) == {"count": 1}
+    assert get_serializer("auto").loads(dill.dumps(lambda: 42))() == 42
+
+
+def test_auto_serializer_keeps_buffer_types() -> None:
+    serializer = get_serializer("auto")
+    value = {"buffer": bytearray(b"ab"), "samples": [array("d", [0.5, 1.5])]}
+
+    restored = serializer.loads(serializer.dumps(value))
+    assert restored == value
+    assert type(restored["buffer"]) is bytearray
+    assert type(restored["samples"][0]) is array
+    assert type(serializer.loads(serializer.dumps(bytearray(b"ab")))) is bytearray
+
+
+def test_primitive_serializer_rejects_objects() -> None:
+    with pytest.raises(ValueError):
+        get_serializer("primitive").dumps(Point(1, 2))
+    with pytest.raises(ValueError):
+        get_serializer("primitive").dumps([bytearray(b"ab")])
+
+
+def test_register_serializer() -> None:
+    class ReversedSerializer(Serializer):
+        @classmethod
+        def dumps(cls, value: str) -> bytes:
+            return value[::-1].encode()
+
+        @classmethod
+        def loads(cls, data: bytes) -> str:
+            return data.decode()[::-1]
+
+    register_serializer("reversed", ReversedSerializer)
+    ThreadsafeBackend.save("name", "John", serializer="reversed")
+
+    assert ThreadsafeBackend.load("name", serializer="reversed") == "John"
+    with pytest.raises(ValueError):
+        get_serializer("unknown")
+
+
+def test_per_hook_serializer() -> None:
+    previous_policy = MemoryBackend.copy_policy
+    MemoryBackend.use(copy_policy="pickle")
+    try:
+
+        def json_counter() -> int:
+            counter, set_counter = use_state(0, serializer="json")
+            set_counter(counter + 1)
+            return counter
+
+        assert json_counter() == 0
+        assert json_counter() == 1
+    finally:
+        MemoryBackend.use(copy_policy=previous_policy)
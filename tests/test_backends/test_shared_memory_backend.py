@@ -0,0 +1,128 @@
+import multiprocessing
+import uuid
+
+import pytest
+
+from hooks.backends import shared_memory_backend as shared_memory_module
+from hooks.backends.memory_backend import MemoryBackend
+from hooks.backends.shared_memory_backend import SharedMemoryBackend
+from hooks.use import use_state
+
+
+@pytest.fixture()
+def shared_memory_backend():
+    SharedMemoryBackend.use(f"hooks_test_{uuid.uuid4().hex[:8]}", slots=64)
+    yield SharedMemoryBackend
+    SharedMemoryBackend.unlink()
+    MemoryBackend.use()
+
+
+def counter() -> int:
+    count, set_count = use_state(0)
+    set_count.update(lambda previous: previous + 1)
+    return count
+
+
+def _count_in_process(times: int) -> None:
+    for _ in range(times):
+        SharedMemoryBackend.update("points", lambda points: (points or 0) + 1)
+
+
+def _count_in_attached_process(name: str, times: int) -> None:
+    SharedMemoryBackend.use(name, slots=64)
+    _count_in_process(times)
+    SharedMemoryBackend.close()
+
+
+def test_use_state(shared_memory_backend) -> None:
+    assert counter() == 0
+    assert counter() == 1
+    assert counter() == 2
+
+
+def test_operations(shared_memory_backend) -> None:
+    assert shared_memory_backend.load_or_init("john", {"age": 1}) == {"age": 1}
+    assert shared_memory_backend.load_or_init("john", {"age": 2}) == {"age": 1}
+    assert shared_memory_backend.save_many({"jane": [2], "jack": 3})
+    shared_memory_backend.track("people", "jane")
+    shared_memory_backend.track("people", "jill")
+
+    assert shared_memory_backend.load_many(["jane", "jill"]) == [[2], None]
+    assert shared_memory_backend.exists_many(["jack", "jill"]) == [True, False]
+    assert shared_memory_backend.keys("people") == ["jane"]
+
+    shared_memory_backend.clear_namespace("people")
+    assert sorted(shared_memory_backend.keys()) == ["jack", "john"]
+    assert shared_memory_backend.delete("jack")
+    assert not shared_memory_backend.delete("jack")
+    # The slot of a deleted hook is reused
+    assert shared_memory_backend.save("jack", 4)
+    assert shared_memory_backend.load("jack") == 4
+
+    shared_memory_backend.reset_backend()
+    assert shared_memory_backend.keys() == []
+
+
+def test_large_namespace(shared_memory_backend) -> None:
+    # Together, the identifiers take more than a slot
+    identifiers = [f"{index:03}" + "x" * 200 for index in range(25)]
+    shared_memory_backend.save_many(dict.fromkeys(identifiers, 0))
+    shared_memory_backend.track_many("session", identifiers)
+    shared_memory_backend.track("session", identifiers[0])
+
+    assert sorted(shared_memory_backend.keys("session")) == identifiers
+    # The identifiers are packed in two pages, and a slot holds the number of pages
+    assert len(shared_memory_backend._identifiers()) == len(identifiers) + 3
+    shared_memory_backend.clear_namespace("session")
+    assert shared_memory_backend.keys("session") == []
+    assert shared_memory_backend._identifiers() == []
+
+
+def test_requires_file_locks(monkeypatch) -> None:
+    # As on Windows, where fcntl does not exist
+    monkeypatch.setattr(shared_memory_module, "fcntl", None)
+
+    with pytest.raises(NotImplementedError):
+        SharedMemoryBackend.use(f"hooks_test_{uuid.uuid4().hex[:8]}", slots=64)
+
+
+def test_limits(shared_memory_backend) -> None:
+    with pytest.raises(ValueError):
+        shared_memory_backend.save("big", "x" * shared_memory_backend.slot_size)
+
+    for index in range(shared_memory_backend.slots):
+        shared_memory_backend.save(str(index), index)
+    with pytest.raises(MemoryError):
+        shared_memory_backend.save("one too many", 0)
+
+    # Attaching with another layout would corrupt the segment
+    name = shared_memory_backend.name
+    with pytest.raises(ValueError):
+        SharedMemoryBackend.use(name, slots=32)
+    SharedMemoryBackend.use(name, slots=64)
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_processes_share_state(shared_memory_backend, start_method) -> None:
+    context = multiprocessing.get_context(start_method)
+    if start_method == "fork":
+        # Workers forked after the segment was created, as in a pre-fork server
+        processes = [
+            context.Process(target=_count_in_process, args=(50,)) for _ in range(4)
+        ]
+    else:
+        processes = [
+            context.Process(
+                target=_count_in_attached_process,
+                args=(shared_memory_backend.name, 50),
+            )
+            for _ in range(4)
+        ]
+    for process in processes:
+        process.start()
+    _count_in_process(50)
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert shared_memory_backend.load("points") == 250
@@ -0,0 +1,135 @@
+import pytest
+
+from hooks.backends.memory_backend import MemoryBackend
+from hooks.backends import snapshot
+from hooks.backends.async_memory_backend import AsyncMemoryBackend
+from hooks.backends.snapshot import Snapshot
+from hooks.backends.sqlite_backend import SQLiteBackend
+
+
+class SnapshotBackend(MemoryBackend):
+    _store = {}
+    _namespaces = {}
+    _snapshot = None
+
+
+@pytest.fixture()
+def snapshot_path(tmp_path):
+    SnapshotBackend.save_many({"john": {"age": 30}, "jane": [1, 2], "jack": None})
+    path = str(tmp_path / "hooks.snapshot")
+    assert SnapshotBackend.snapshot(path) == 3
+    SnapshotBackend.reset_backend()
+    yield path
+    SnapshotBackend.reset_backend()
+
+
+def test_snapshot_file(snapshot_path) -> None:
+    with Snapshot(snapshot_path) as snapshot:
+        assert sorted(snapshot.keys()) == ["jack", "jane", "john"]
+        assert snapshot.load("john") == {"age": 30}
+        assert "jill" not in snapshot
+
+    with open(snapshot_path, "wb") as file:
+        file.write(b"not a snapshot")
+    with pytest.raises(ValueError):
+        Snapshot(snapshot_path)
+
+
+def test_snapshot_loads_in_chunks(snapshot_path, monkeypatch) -> None:
+    monkeypatch.setattr(snapshot, "SNAPSHOT_CHUNK_SIZE", 2)
+    SnapshotBackend.save_many({"john": 1, "jane": 2, "jack": 3})
+    loaded = []
+    load_many = SnapshotBackend.load_many
+
+    def record_load_many(identifiers):
+        loaded.append(len(identifiers))
+        return load_many(identifiers)
+
+    monkeypatch.setattr(SnapshotBackend, "load_many", record_load_many)
+
+    assert SnapshotBackend.snapshot(snapshot_path) == 3
+    assert loaded == [2, 1]
+    with Snapshot(snapshot_path) as file:
+        assert dict(file.items()) == {"john": 1, "jane": 2, "jack": 3}
+
+
+async def test_async_snapshot_loads_in_chunks(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(snapshot, "SNAPSHOT_CHUNK_SIZE", 2)
+    path = str(tmp_path / "hooks.snapshot")
+    await AsyncMemoryBackend.save_many({"john": 1, "jane": 2, "jack": 3})
+    loaded = []
+    load_many = AsyncMemoryBackend.load_many
+
+    async def record_load_many(identifiers):
+        loaded.append(len(identifiers))
+        return await load_many(identifiers)
+
+    monkeypatch.setattr(AsyncMemoryBackend, "load_many", record_load_many)
+    try:
+        assert await AsyncMemoryBackend.snapshot(path) == 3
+    finally:
+        await AsyncMemoryBackend.reset_backend()
+
+    assert loaded == [2, 1]
+
+    with Snapshot(path) as file:
+        assert dict(file.items()) == {"john": 1, "jane": 2, "jack": 3}
+
+
+def test_restore(snapshot_path) -> None:
+    SnapshotBackend.save("john", "stale")
+    SnapshotBackend.save("jill", 4)
+
+    assert SnapshotBackend.restore(snapshot_path) == 3
+    assert SnapshotBackend.load_many(["john", "jane", "jill"]) == [
+        {"age": 30},
+        [1, 2],
+        4,
+    ]
+
+
+def test_lazy_restore(snapshot_path) -> None:
+    SnapshotBackend.save("john", "stale")
+    SnapshotBackend.save("jill", 4)
+
+    assert SnapshotBackend.restore(snapshot_path, lazy=True) == 3
+    assert sorted(SnapshotBackend.keys()) == ["jack", "jane", "jill", "john"]
+    # Nothing is read from the file until a hook is used
+    assert SnapshotBackend._store == {"jill": 4}
+
+    assert SnapshotBackend.load("john") == {"age": 30}
+    assert SnapshotBackend.exists("jack")
+    assert SnapshotBackend.delete("jane")
+    assert not SnapshotBackend.exists("jane")
+    assert SnapshotBackend.load_or_init("jane", 0) == 0
+    # Every hook was used, so the snapshot was closed
+    assert SnapshotBackend._snapshot is None
+
+
+def test_lazy_restore_overwritten(snapshot_path) -> None:
+    SnapshotBackend.restore(snapshot_path, lazy=True)
+    SnapshotBackend.save("john", "new")
+    SnapshotBackend.save_many({"jane": "new"})
+
+    # The saved state replaces the state in the snapshot
+    assert sorted(SnapshotBackend.keys()) == ["jack", "jane", "john"]
+    assert SnapshotBackend.delete("john")
+    assert not SnapshotBackend.exists("john")
+    assert SnapshotBackend.load("jane") == "new"
+    assert SnapshotBackend.delete("jack")
+    assert not SnapshotBackend.delete("jack")
+    assert SnapshotBackend._snapshot is None
+
+
+def test_transfer_between_backends(snapshot_path, tmp_path) -> None:
+    SQLiteBackend.use(str(tmp_path / "hooks.sqlite3"))
+    try:
+        assert SQLiteBackend.restore(snapshot_path) == 3
+        assert SQLiteBackend.load("jane") == [1, 2]
+        SQLiteBackend.save("jane", [3])
+        assert SQLiteBackend.snapshot(snapshot_path, serializer="pickle") == 3
+    finally:
+        MemoryBackend.use()
+
+    SnapshotBackend.restore(snapshot_path, lazy=True)
+    assert SnapshotBackend.load("jane") == [3]
@@ -0,0 +1,129 @@
+import multiprocessing
+
+import pytest
+
+from hooks.backends.memory_backend import MemoryBackend
+from hooks.backends.sqlite_backend import AsyncSQLiteBackend, SQLiteBackend
+from hooks.use import use_state
+
+
+@pytest.fixture()
+def sqlite_backend(tmp_path):
+    SQLiteBackend.use(str(tmp_path / "hooks.sqlite3"))
+    yield SQLiteBackend
+    MemoryBackend.use()
+
+
+def counter() -> int:
+    count, set_count = use_state(0)
+    set_count.update(lambda previous: previous + 1)
+    return count
+
+
+def _count_in_process(path: str, times: int) -> None:
+    SQLiteBackend.use(path)
+    for _ in range(times):
+        SQLiteBackend.update("points", lambda points: (points or 0) + 1)
+
+
+def test_state_is_persisted(sqlite_backend) -> None:
+    assert counter() == 0
+    assert counter() == 1
+
+    # A new connection, as after a restart
+    SQLiteBackend.use(SQLiteBackend.path)
+    assert counter() == 2
+
+
+def test_bulk_operations_and_namespaces(sqlite_backend) -> None:
+    assert sqlite_backend.save_many({"john": 1, "jane": [2]})
+    sqlite_backend.track("people", "john")
+    sqlite_backend.track("people", "jack")
+
+    assert sqlite_backend.load_many(["jane", "john", "jack"]) == [[2], 1, None]
+    assert sqlite_backend.exists_many(["john", "jack"]) == [True, False]
+    assert sqlite_backend.keys("people") == ["john"]
+
+    sqlite_backend.clear_namespace("people")
+    assert sqlite_backend.keys() == ["jane"]
+    assert sqlite_backend.delete("jane")
+    assert not sqlite_backend.delete("jane")
+
+
+def test_bulk_operations_over_the_variable_limit(sqlite_backend) -> None:
+    import sqlite3
+
+    connection = sqlite_backend._connection()
+    if hasattr(connection, "setlimit"):
+        # Builds of SQLite differ, use the limit of the older versions
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    identifiers = [f"hook{index}" for index in range(40000)]
+    sqlite_backend.save_many(dict.fromkeys(identifiers, 1))
+
+    assert sqlite_backend.load_many(identifiers + ["missing"]) == [1] * 40000 + [None]
+    assert all(sqlite_backend.exists_many(identifiers))
+
+
+def test_reconfiguration_closes_connections(sqlite_backend, tmp_path) -> None:
+    import sqlite3
+    import threading
+
+    errors = []
+    opened, reconfigured = threading.Event(), threading.Event()
+
+    def worker() -> None:
+        connection = sqlite_backend._connection()
+        opened.set()
+        reconfigured.wait()
+        try:
+            connection.execute("SELECT 1")
+        except sqlite3.ProgrammingError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    opened.wait()
+    sqlite_backend.use(str(tmp_path / "other.sqlite3"))
+    reconfigured.set()
+    thread.join()
+
+    assert len(errors) == 1
+
+
+def test_batch(sqlite_backend) -> None:
+    with sqlite_backend.batch():
+        for points in range(3):
+            sqlite_backend.save("points", points)
+        assert sqlite_backend.load("points") == 2
+    assert sqlite_backend.load("points") == 2
+
+    with pytest.raises(ZeroDivisionError):
+        with sqlite_backend.batch():
+            sqlite_backend.save("points", 10)
+            1 / 0
+    assert sqlite_backend.load("points") == 2
+
+
+def test_shared_between_processes(sqlite_backend) -> None:
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_count_in_process, args=(sqlite_backend.path, 50))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert sqlite_backend.load("points") == 4 * 50
+
+
+async def test_async_sqlite_backend(tmp_path) -> None:
+    await AsyncSQLiteBackend.use(str(tmp_path / "hooks.sqlite3"))
+    try:
+        assert await AsyncSQLiteBackend.load_or_init("points", 1) == 1
+        assert await AsyncSQLiteBackend.update("points", lambda points: points + 1) == 2
+        assert await AsyncSQLiteBackend.load_many(["points", "level"]) == [2, None]
+        assert await AsyncSQLiteBackend.keys() == ["points"]
+    finally:
+        MemoryBackend.use()
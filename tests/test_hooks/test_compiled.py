@@ -0,0 +1,112 @@
+from hooks import compiled, hook_scope, use_state
+from hooks.asyncio.use import use_state as use_async_state
+from hooks.frame_utils import _compiled_code
+
+
+def test_compiled_local_state() -> None:
+    class Foo:
+        @compiled
+        def local_state(self) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    foo = Foo()
+
+    assert foo.local_state() == 0
+    assert foo.local_state() == 1
+    assert Foo().local_state() == 0
+    assert Foo().local_state() == 0
+
+
+def test_compiled_hooks_on_the_same_line_get_their_own_slot() -> None:
+    @compiled
+    def two_counters() -> tuple[int, int]:
+        (a, set_a), (b, set_b) = use_state(0), use_state(10)
+        set_a(a + 1)
+        set_b(b + 2)
+        return a, b
+
+    assert two_counters() == (0, 10)
+    assert two_counters() == (1, 12)
+
+
+def test_compiled_global_and_class_state() -> None:
+    class Bar:
+        @classmethod
+        @compiled
+        def class_state(cls) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+        @compiled
+        @staticmethod
+        def global_state() -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    assert Bar.class_state() == 0
+    assert Bar().class_state() == 1
+    assert Bar.global_state() == 0
+    assert Bar().global_state() == 1
+
+
+def test_compiled_with_hook_scope() -> None:
+    class Foo:
+        @compiled
+        @hook_scope(parametrize=["counter_name"])
+        def local_state(self, counter_name: str) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    foo = Foo()
+
+    assert foo.local_state("A") == 0
+    assert foo.local_state("A") == 1
+    assert foo.local_state("B") == 0
+    assert Foo().local_state("A") == 0
+
+
+def test_compiled_with_custom_hooks() -> None:
+    def use_counter() -> int:
+        counter, set_counter = use_state(0)
+        set_counter(counter + 1)
+        return counter
+
+    class Foo:
+        @compiled
+        def local_state(self) -> int:
+            return use_counter()
+
+        @compiled
+        def other_local_state(self) -> int:
+            return use_counter()
+
+    foo = Foo()
+
+    assert foo.local_state() == 0
+    assert foo.local_state() == 1
+    assert foo.other_local_state() == 0
+    assert Foo().local_state() == 0
+
+
+async def test_compiled_local_state_async(async_backend) -> None:
+    class Foo:
+        @compiled
+        async def local_state(self) -> int:
+            counter, set_counter = await use_async_state(0)
+            await set_counter(counter + 1)
+            return counter
+
+    foo = Foo()
+
+    assert await foo.local_state() == 0
+    assert await foo.local_state() == 1
+    assert await Foo().local_state() == 0
+    # The hook was identified by its slot rather than by its filename and line number
+    compiled_code = _compiled_code[Foo.local_state.__code__]
+    assert [name for _, name, _ in compiled_code.hook_calls] == ["use_async_state"]
+    assert [slot for slot in compiled_code.slots.values() if slot is not None]
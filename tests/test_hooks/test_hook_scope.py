@@ -1,6 +1,8 @@
+import pytest
+
 from hooks.asyncio.use import use_state as async_use_state
-from hooks.scope import hook_scope
-from hooks.use import use_state
+from hooks.scope import dispose_scope, hook_scope
+from hooks.use import use_effect, use_state
 
 
 def test_local_state() -> None:
@@ -129,6 +131,99 @@ def test_local_state_that_is_scoped_globally() -> None:
     assert Foo().local_state() == 3
 
 
+def test_order_identity_local_state() -> None:
+    class Foo:
+        @hook_scope(parametrize=["counter_name"], identity="order")
+        def local_state(self, counter_name: str) -> tuple[int, int]:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            other_counter, set_other_counter = use_state(10)
+            set_other_counter(other_counter - 1)
+            return counter, other_counter
+
+    foo = Foo()
+
+    assert foo.local_state("A") == (0, 10)
+    assert foo.local_state("A") == (1, 9)
+    assert foo.local_state("B") == (0, 10)
+    assert Foo().local_state("A") == (0, 10)
+
+
+def test_order_identity_global_state() -> None:
+    @hook_scope(identity="order")
+    def global_state(counter_name: str) -> int:
+        counter, set_counter = use_state(0)
+        set_counter(counter + 1)
+        return counter
+
+    assert global_state("A") == 0
+    assert global_state("A") == 1
+    assert global_state("B") == 0
+
+
+def test_order_identity_debug_detects_conditional_hooks() -> None:
+    @hook_scope(identity="order", debug=True)
+    def conditional_hooks(with_effect: bool) -> int:
+        if with_effect:
+            use_effect(lambda: None, [])
+        counter, set_counter = use_state(0)
+        set_counter(counter + 1)
+        return counter
+
+    assert conditional_hooks(True) == 0
+    with pytest.raises(RuntimeError):
+        conditional_hooks(False)
+
+
+def test_order_identity_debug_after_a_failed_first_call() -> None:
+    @hook_scope(identity="order", debug=True)
+    def two_hooks(fail: bool) -> int:
+        counter, set_counter = use_state(0)
+        if fail:
+            raise KeyError("failed after one hook")
+        total, set_total = use_state(0)
+        set_counter(counter + 1)
+        return counter
+
+    with pytest.raises(KeyError):
+        two_hooks(True)
+    # The partial order of the failed call is not kept
+    assert two_hooks(False) == 0
+    assert two_hooks(False) == 1
+
+
+def test_order_identity_debug_with_concurrent_first_calls() -> None:
+    import threading
+
+    barrier = threading.Barrier(2)
+    errors = []
+
+    @hook_scope(parametrize=["user"], identity="order", debug=True)
+    def visits(user: str) -> None:
+        counter, set_counter = use_state(0)
+        # Both calls record the order before any of them publishes it
+        barrier.wait()
+        total, set_total = use_state(0)
+
+    def run(user: str) -> None:
+        try:
+            visits(user)
+        except RuntimeError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(user,)) for user in ["ann", "bob"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_unknown_identity() -> None:
+    with pytest.raises(ValueError):
+        hook_scope(identity="unknown")
+
+
 ########################################################################################################################
 # Asynchronous
 ########################################################################################################################
@@ -258,3 +353,274 @@ async def test_local_state_that_is_scoped_globally_async(async_backend) -> None:
     assert await foo.local_state() == 1
     assert await Foo().local_state() == 2
     assert await Foo().local_state() == 3
+
+
+async def test_order_identity_local_state_async(async_backend) -> None:
+    class Foo:
+        @hook_scope(parametrize=["counter_name"], identity="order")
+        async def local_state(self, counter_name: str) -> int:
+            counter, set_counter = await async_use_state(0)
+            await set_counter(counter + 1)
+            return counter
+
+    foo = Foo()
+
+    assert await foo.local_state("A") == 0
+    assert await foo.local_state("A") == 1
+    assert await foo.local_state("B") == 0
+    assert await Foo().local_state("A") == 0
+
+
+async def test_order_identity_mixed_hooks_async() -> None:
+    @hook_scope(parametrize=["user"], identity="order", debug=True)
+    async def handler(user: str) -> tuple[int, int]:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        points, set_points = await async_use_state(10)
+        await set_points(points + 10)
+        return visits, points
+
+    assert await handler("bob") == (0, 10)
+    assert await handler("bob") == (1, 20)
+    assert await handler("ann") == (0, 10)
+
+
+async def test_scopes_of_concurrent_tasks(async_backend) -> None:
+    import asyncio
+
+    @hook_scope(parametrize=["user"])
+    async def visits(user: str) -> int:
+        count, set_count = await async_use_state(0)
+        # Let the other tasks enter their scopes before the state is set
+        await asyncio.sleep(0)
+        await set_count.update(lambda previous: previous + 1)
+        return count
+
+    await asyncio.gather(*(visits(user) for user in ["john", "jane"] * 5))
+    assert await visits("john") == 5
+    assert await visits(user="jane") == 5
+
+
+def test_scopes_of_concurrent_threads() -> None:
+    import threading
+
+    barrier = threading.Barrier(2)
+
+    @hook_scope(parametrize=["user"])
+    def visits(user: str, wait: bool = True) -> int:
+        count, set_count = use_state(0)
+        if wait:
+            # Both threads are inside their scopes at the same time
+            barrier.wait()
+        set_count(count + 1)
+        return count
+
+    threads = [threading.Thread(target=visits, args=(user,)) for user in ["ann", "bob"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert visits("ann", wait=False) == 1
+    assert visits("bob", wait=False) == 1
+
+
+def test_scope_key_functions() -> None:
+    from types import SimpleNamespace
+
+    from hooks.scope import SCOPE_DIGEST_SIZE, _current_scope
+
+    identifiers = []
+
+    class Foo:
+        @hook_scope(parametrize={"user": lambda user: user.id, "page": None})
+        def visits(self, user: SimpleNamespace, page: str) -> int:
+            identifiers.append(_current_scope.get()[0])
+            count, set_count = use_state(0)
+            set_count(count + 1)
+            return count
+
+        @hook_scope(key=lambda user, **_: user.id)
+        def logins(self, user: SimpleNamespace, request: dict) -> int:
+            count, set_count = use_state(0)
+            set_count(count + 1)
+            return count
+
+    foo = Foo()
+    john = SimpleNamespace(id=1, history=list(range(10000)))
+    assert foo.visits(john, "home") == 0
+    assert foo.visits(SimpleNamespace(id=1), page="home") == 1
+    assert foo.visits(john, "about") == 0
+    assert foo.visits(SimpleNamespace(id=2), "home") == 0
+    # The identifier does not depend on the size of the arguments
+    assert (
+        len(identifiers[0])
+        == len(b"test_scope_key_functions.<locals>.Foo.visits#") + 2 * SCOPE_DIGEST_SIZE
+    )
+
+    assert foo.logins(john, {"body": "x" * 10000}) == 0
+    assert foo.logins(user=john, request={}) == 1
+    assert foo.logins(SimpleNamespace(id=2), {}) == 0
+
+    with pytest.raises(ValueError):
+        hook_scope(parametrize=["user"], key=lambda user, **_: user.id)
+
+
+def test_dispose_scope() -> None:
+    from hooks.backends.memory_backend import MemoryBackend
+
+    @hook_scope(parametrize=["counter_name"])
+    def inner_state(counter_name: str) -> int:
+        counter, set_counter = use_state(0)
+        set_counter(counter + 1)
+        return counter
+
+    @hook_scope(parametrize=["user"], disposable=True)
+    def session(user: str, page: str = "home") -> tuple[int, int]:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        return visits, inner_state(page)
+
+    @hook_scope(parametrize=["user"], identity="order", disposable=True)
+    def ordered_session(user: str) -> int:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        return visits
+
+    assert session("bob") == (0, 0)
+    assert session(user="bob", page="about") == (1, 0)
+    assert session("ann") == (0, 0)
+    assert ordered_session("bob") == 0
+    assert ordered_session("bob") == 1
+    stored = len(MemoryBackend.keys())
+
+    # The state of nested scopes is disposed with the scope that called them
+    dispose_scope(session, user="bob")
+    dispose_scope(ordered_session, user="bob")
+    assert len(MemoryBackend.keys()) == stored - 4
+    assert session("bob", "about") == (0, 0)
+    assert session("ann") == (1, 1)
+    assert ordered_session("bob") == 0
+
+    # The state created again after a disposal is tracked again
+    dispose_scope(session, user="bob")
+    assert session("bob") == (0, 0)
+
+    with pytest.raises(ValueError):
+        dispose_scope(lambda user: user, user="bob")
+    with pytest.raises(ValueError):
+        dispose_scope(inner_state, counter_name="home")
+
+
+def test_dispose_scope_from_another_process() -> None:
+    from hooks.backends.memory_backend import MemoryBackend
+
+    @hook_scope(parametrize=["user"], disposable=True)
+    def session(user: str) -> int:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        return visits
+
+    namespace = getattr(session, "__hooks_scope_namespace__")((), {"user": "bob"})
+    assert session("bob") == 0
+    # Another process disposes the scope, this process does not know about it
+    MemoryBackend.clear_namespace(namespace)
+    assert session("bob") == 0
+    assert MemoryBackend.keys(namespace)
+
+    dispose_scope(session, user="bob")
+    assert session("bob") == 0
+
+
+def test_scopes_are_only_tracked_when_disposable() -> None:
+    from hooks.backends.memory_backend import MemoryBackend
+
+    class TrackedBackend(MemoryBackend):
+        _store = {}
+        _namespaces = {}
+
+    @hook_scope(parametrize=["user"])
+    def session(user: str) -> int:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        return visits
+
+    TrackedBackend.use()
+    try:
+        assert session("bob") == 0
+        assert session("bob") == 1
+        assert TrackedBackend._namespaces == {}
+    finally:
+        MemoryBackend.use()
+
+
+def test_failing_tracking_does_not_fail_the_scope() -> None:
+    from hooks.backends.memory_backend import MemoryBackend
+
+    class FailingBackend(MemoryBackend):
+        _store = {}
+        _namespaces = {}
+        calls = 0
+
+        @classmethod
+        def track(cls, namespace, identifier):
+            cls.calls += 1
+            raise ValueError("Unsupported identifier")
+
+    @hook_scope(parametrize=["user"], disposable=True)
+    def session(user: str) -> int:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        return visits
+
+    FailingBackend.use()
+    try:
+        assert session("bob") == 0
+        # The state that could not be tracked is tracked again on the next call
+        assert session("bob") == 1
+        assert FailingBackend.calls == 2
+    finally:
+        MemoryBackend.use()
+
+
+def test_ephemeral_scope() -> None:
+    from hooks.backends.memory_backend import MemoryBackend
+
+    @hook_scope(parametrize=["job"], ephemeral=True)
+    def run_job(job: str, fail: bool = False) -> int:
+        steps, set_steps = use_state(0)
+        set_steps(steps + 1)
+        assert not fail
+        return steps
+
+    stored = len(MemoryBackend.keys())
+    assert run_job("backup") == 0
+    assert run_job("backup") == 0
+    with pytest.raises(AssertionError):
+        run_job("backup", fail=True)
+    assert len(MemoryBackend.keys()) == stored
+
+
+async def test_dispose_scope_async(async_backend) -> None:
+    from hooks.backends.async_memory_backend import AsyncMemoryBackend
+
+    @hook_scope(parametrize=["user"], disposable=True)
+    async def session(user: str) -> int:
+        visits, set_visits = await async_use_state(0)
+        await set_visits(visits + 1)
+        return visits
+
+    @hook_scope(parametrize=["user"], ephemeral=True)
+    async def request(user: str) -> int:
+        visits, set_visits = await async_use_state(0)
+        await set_visits(visits + 1)
+        return visits
+
+    assert await session("bob") == 0
+    assert await session("bob") == 1
+    assert await request("bob") == 0
+    assert await request("bob") == 0
+    assert len(await AsyncMemoryBackend.keys()) == 1
+
+    await dispose_scope(session, user="bob")
+    assert await AsyncMemoryBackend.keys() == []
+    assert await session("bob") == 0
@@ -1,3 +1,4 @@
+import threading
 from unittest.mock import Mock
 
 from hooks import use_effect
@@ -32,6 +33,41 @@ def test_use_with_dependencies() -> None:
     assert mock.call_count == 2
 
 
+def test_use_with_dependencies_mutated_in_place() -> None:
+    mock = Mock()
+    config = {"debug": False}
+
+    def my_stateful_function(config: dict) -> None:
+        use_effect(lambda: mock(), [config])
+        return
+
+    my_stateful_function(config)
+    my_stateful_function(config)
+    config["debug"] = True
+    my_stateful_function(config)
+
+    assert mock.call_count == 2
+
+
+def test_use_with_dependencies_that_cannot_be_copied() -> None:
+    mock = Mock()
+
+    class Worker:
+        def __init__(self) -> None:
+            self.lock = threading.Lock()
+
+        def run(self) -> None:
+            use_effect(lambda: mock(), [self.lock])
+
+    worker = Worker()
+    worker.run()
+    worker.run()
+    worker.lock = threading.Lock()
+    worker.run()
+
+    assert mock.call_count == 2
+
+
 def test_use_as_decorator() -> None:
     mock = Mock()
 
@@ -92,3 +128,19 @@ async def test_use_with_dependencies_async(async_backend) -> None:
     await my_stateful_function("Jane")
 
     assert mock.call_count == 2
+
+
+async def test_use_with_dependencies_mutated_in_place_async(async_backend) -> None:
+    mock = Mock()
+    config = {"debug": False}
+
+    async def my_stateful_function(config: dict) -> None:
+        await async_use_effect(lambda: mock(), [config])
+        return
+
+    await my_stateful_function(config)
+    await my_stateful_function(config)
+    config["debug"] = True
+    await my_stateful_function(config)
+
+    assert mock.call_count == 2
@@ -0,0 +1,128 @@
+import re
+from unittest.mock import Mock
+
+import pytest
+
+from hooks import use_memo
+from hooks.asyncio.use import use_memo as async_use_memo
+
+
+def test_basic_use() -> None:
+    mock = Mock(side_effect=re.compile)
+
+    def match(pattern: str, text: str) -> bool:
+        return bool(use_memo(lambda: mock(pattern), [pattern]).match(text))
+
+    assert match("a+", "aaa")
+    assert not match("a+", "bbb")
+    assert match("b+", "bbb")
+    assert mock.call_count == 2
+
+
+def test_equalities() -> None:
+    mock = Mock(side_effect=lambda value: value)
+    config = {"debug": True}
+
+    def by_identity(config: dict) -> dict:
+        return use_memo(lambda: mock(dict(config)), [config], "identity")
+
+    def shallow(config: dict) -> dict:
+        return use_memo(lambda: mock(dict(config)), [config], "shallow")
+
+    def hashed(config: dict) -> dict:
+        return use_memo(lambda: mock(dict(config)), [config], "hash")
+
+    assert by_identity(config) == config
+    assert by_identity(config) == config
+    # An equal but different object is a new dependency
+    assert by_identity(dict(config)) == config
+    assert mock.call_count == 2
+
+    assert shallow(config) == config
+    assert shallow(dict(config)) == config
+    assert mock.call_count == 3
+
+    assert hashed(config) == config
+    assert hashed(dict(config)) == config
+    assert hashed({"debug": False}) == {"debug": False}
+    assert mock.call_count == 5
+
+    # A dependency mutated in place is a new dependency
+    config["debug"] = False
+    assert shallow(config) == {"debug": False}
+    assert mock.call_count == 6
+
+    with pytest.raises(ValueError):
+        use_memo(lambda: 0, [], "deep")
+
+
+def test_hash_is_stable_across_processes() -> None:
+    import os
+    import subprocess
+    import sys
+
+    from hooks.use import _memo_key
+
+    shared = [1]
+    assert _memo_key([[shared, shared]], "hash", None) == _memo_key(
+        [[[1], [1]]], "hash", None
+    )
+
+    script = (
+        "from hooks.use import _memo_key; "
+        "print(_memo_key([{'a', 'b', 'c'}, {'x': frozenset('yz')}], 'hash', None))"
+    )
+    digests = {
+        subprocess.run(
+            [sys.executable, "-c", script],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        for seed in ("1", "2", "3")
+    }
+    assert len(digests) == 1
+
+
+def test_max_size() -> None:
+    mock = Mock(side_effect=lambda value: value * 2)
+
+    def double(value: int) -> int:
+        return use_memo(lambda: mock(value), [value])
+
+    def cached_double(value: int) -> int:
+        return use_memo(lambda: mock(value), [value], max_size=2)
+
+    for value in [1, 2, 1, 2]:
+        assert double(value) == value * 2
+    assert mock.call_count == 4
+
+    mock.reset_mock()
+    for value in [1, 2, 1, 3, 1, 2, 1]:
+        assert cached_double(value) == value * 2
+    # 2 was the least recently used value when 3 was cached
+    assert mock.call_count == 4
+
+    with pytest.raises(ValueError):
+        use_memo(lambda: 0, [], max_size=0)
+
+
+async def test_async_use(async_backend) -> None:
+    mock = Mock(side_effect=lambda value: value * 2)
+
+    async def compute(value: int) -> int:
+        return mock(value)
+
+    async def double(value: int) -> int:
+        return await async_use_memo(lambda: compute(value), [value])
+
+    async def triple(value: int) -> int:
+        return await async_use_memo(lambda: value * 3, [value], "hash")
+
+    assert await double(1) == 2
+    assert await double(1) == 2
+    assert await double(2) == 4
+    assert mock.call_count == 2
+    assert await triple(2) == 6
+    assert await triple(2) == 6
@@ -154,3 +154,35 @@ async def test_simple_state_mutation_multiple_calls_async(async_backend) -> None
     state, dispatch = await async_use_reducer(tasks_reducer)
 
     assert state == {"tasks": ["Do the dishes"]}, "The new state should be mutated"
+
+
+def test_only_returned_fields_are_saved() -> None:
+    from hooks.backends.memory_backend import MemoryBackend
+
+    saved = []
+
+    class FieldsBackend(MemoryBackend):
+        _store = {}
+        _namespaces = {}
+
+        @classmethod
+        def save_fields(cls, identifier, fields, serializer=None):
+            saved.append(fields)
+            return super().save_fields(identifier, fields, serializer)
+
+    def profile_reducer(
+        current_state: dict[str, Any], action: dict[str, Any]
+    ) -> dict[str, Any]:
+        return {"name": action["name"]}
+
+    FieldsBackend.use()
+    try:
+        state, dispatch = use_reducer(profile_reducer, {"name": "", "history": [1]})
+        dispatch({"name": "John"})
+        dispatch({"name": "John"})
+
+        # The initial state is saved with load_or_init_fields, the dispatches only save the returned fields
+        assert saved == [{"name": "John"}, {"name": "John"}]
+        assert use_reducer(profile_reducer)[0] == {"name": "John", "history": [1]}
+    finally:
+        MemoryBackend.use()
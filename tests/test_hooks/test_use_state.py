@@ -1,3 +1,5 @@
+from threading import Thread
+
 from hooks.asyncio.use import use_state as async_use_state
 from hooks.use import use_state
 
@@ -69,6 +71,127 @@ def test_class_state() -> None:
     assert bar.class_state() == 2
 
 
+def test_local_state_in_private_method() -> None:
+    class Foo:
+        def __local_state(self) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+        def local_state(self) -> int:
+            return self.__local_state()
+
+    foo = Foo()
+
+    assert foo.local_state() == 0
+    assert foo.local_state() == 1
+    assert Foo().local_state() == 0
+
+
+def test_local_state_inherited_method() -> None:
+    class Base:
+        def local_state(self) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    class Foo(Base):
+        pass
+
+    foo = Foo()
+
+    assert foo.local_state() == 0
+    assert foo.local_state() == 1
+    assert Foo().local_state() == 0
+    assert Base().local_state() == 0
+
+
+def test_local_state_of_base_method_called_through_super() -> None:
+    class Base:
+        def local_state(self) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    class Foo(Base):
+        def local_state(self) -> int:
+            return super().local_state()
+
+    foo = Foo()
+
+    assert foo.local_state() == 0
+    assert foo.local_state() == 1
+    assert Foo().local_state() == 0
+
+
+def test_local_state_of_method_wrapped_without_wraps() -> None:
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    class Foo:
+        @decorator
+        def local_state(self) -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    foo = Foo()
+
+    assert foo.local_state() == 0
+    assert foo.local_state() == 1
+    assert Foo().local_state() == 0
+
+
+def test_static_method_receiving_an_instance_is_global() -> None:
+    class Foo:
+        @staticmethod
+        def global_state(other: "Foo") -> int:
+            counter, set_counter = use_state(0)
+            set_counter(counter + 1)
+            return counter
+
+    assert Foo.global_state(Foo()) == 0
+    assert Foo.global_state(Foo()) == 1
+
+
+def test_functional_update_is_not_lost() -> None:
+    def increment() -> int:
+        counter, set_counter = use_state(0)
+        set_counter.update(lambda previous: previous + 1)
+        return set_counter.val
+
+    def worker() -> None:
+        for _ in range(200):
+            increment()
+
+    threads = [Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert increment() == 8 * 200 + 1
+
+
+def test_callables_are_stored_as_values() -> None:
+    class Config:
+        pass
+
+    def handler(value=None):
+        handler_state, set_handler = use_state(None)
+        if value is not None:
+            set_handler(value)
+        return handler_state
+
+    handler(Config)
+    assert handler() is Config
+    handler(print)
+    assert handler() is print
+
+
 async def test_local_state_async(async_backend) -> None:
     class Foo:
         async def local_state(self) -> int:
@@ -150,3 +273,78 @@ async def test_class_state_async(async_backend) -> None:
     assert await Bar.class_state() == 0
     assert await Bar.class_state() == 1
     assert await bar.class_state() == 2
+
+
+async def test_functional_update_async(async_backend) -> None:
+    async def increment() -> int:
+        counter, set_counter = await async_use_state(0)
+        await set_counter.update(lambda previous: previous + 1)
+        return counter
+
+    assert await increment() == 0
+    assert await increment() == 1
+
+
+def test_call_site_identifiers() -> None:
+    from pyhashxx import hashxx
+
+    from hooks.backends.memory_backend import MemoryBackend
+    from hooks.backends.python_objects_backend import python_object_backend_factory
+    from hooks.scope import hook_scope
+
+    class IsolatedBackend(MemoryBackend):
+        _store = {}
+        _namespaces = {}
+
+    class Session:
+        def visits(self) -> int:
+            visits, set_visits = use_state(0)
+            set_visits(visits + 1)
+            return visits
+
+    def page_views() -> int:
+        views, set_views = use_state(0)
+        set_views(views + 1)
+        return views
+
+    @hook_scope(parametrize=["user"])
+    def visit(session: Session, user: str) -> tuple[int, int]:
+        return session.visits(), page_views()
+
+    def identifier(function, scope: str = "", method: bool = False) -> str:
+        # The identifiers of hooks called outside of hooks, as they were computed before call-sites were cached
+        code = function.__code__
+        frame = f"{code.co_filename}{code.co_firstlineno + 1}{code.co_name}"
+        return str(hashxx(f"{frame}{scope}{code.co_name if method else ''}".encode()))
+
+    scope = visit.__qualname__
+    first, second = Session(), Session()
+    IsolatedBackend.use()
+    try:
+        # The same call-sites, reached with different owners and different scopes
+        assert visit(first, "bob") == (0, 0)
+        assert visit(first, "bob") == (1, 1)
+        assert visit(first, "ann") == (0, 0)
+        assert visit(second, "bob") == (0, 2)
+        assert first.visits() == 0
+        assert page_views() == 0
+
+        assert sorted(python_object_backend_factory(first).keys()) == sorted(
+            [
+                identifier(Session.visits, f"{scope}user:bob;", method=True),
+                identifier(Session.visits, f"{scope}user:ann;", method=True),
+                identifier(Session.visits, method=True),
+            ]
+        )
+        assert python_object_backend_factory(second).keys() == [
+            identifier(Session.visits, f"{scope}user:bob;", method=True)
+        ]
+        assert sorted(IsolatedBackend.keys()) == sorted(
+            [
+                identifier(page_views, f"{scope}user:bob;"),
+                identifier(page_views, f"{scope}user:ann;"),
+                identifier(page_views),
+            ]
+        )
+    finally:
+        MemoryBackend.use()
@@ -0,0 +1,450 @@
+import asyncio
+import time
+
+import pytest
+
+from hooks import use_state
+from hooks.backends.backend_state import set_hooks_backend
+from hooks.backends.memory_backend import MemoryBackend
+from hooks.backends.serializers import get_serializer
+
+fakeredis = pytest.importorskip("fakeredis")
+from fakeredis import aioredis  # noqa: E402
+
+from hooks.plugins.redis_backend import AsyncRedisBackend, RedisBackend  # noqa: E402
+from hooks.plugins.unit_of_work import UnitOfWorkMiddleware  # noqa: E402
+
+
+@pytest.fixture()
+def redis_backend():
+    RedisBackend.redis_client = fakeredis.FakeRedis()
+    set_hooks_backend(RedisBackend)
+    yield RedisBackend
+    RedisBackend.redis_client = None
+    MemoryBackend.use()
+
+
+def test_load_or_init(redis_backend) -> None:
+    assert redis_backend.load_or_init("counter", 0) == 0
+    assert redis_backend.load("counter") == 0
+
+    redis_backend.save("counter", 5)
+    assert redis_backend.load_or_init("counter", 0) == 5
+
+
+def test_use_state_round_trips(redis_backend) -> None:
+    commands = []
+    execute_command = redis_backend.redis_client.execute_command
+
+    def counting_execute_command(*args, **kwargs):
+        commands.append(args[0])
+        return execute_command(*args, **kwargs)
+
+    redis_backend.redis_client.execute_command = counting_execute_command
+
+    def counter():
+        count, set_count = use_state(0)
+        set_count(count + 1)
+        return count
+
+    assert counter() == 0
+    assert counter() == 1
+    # Only the SET of the setter goes through the client, loading is a single pipelined round trip
+    assert commands == ["SET", "SET"]
+
+
+async def test_async_load_or_init() -> None:
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis()
+    try:
+        assert await AsyncRedisBackend.load_or_init("counter", [1]) == [1]
+        await AsyncRedisBackend.save("counter", [1, 2])
+        assert await AsyncRedisBackend.load_or_init("counter", [1]) == [1, 2]
+    finally:
+        AsyncRedisBackend.redis_client = None
+
+
+def test_unit_of_work_coalesces_writes(redis_backend) -> None:
+    client = redis_backend.redis_client
+    with redis_backend.unit_of_work():
+        for points in range(3):
+            redis_backend.save("points", points)
+        assert redis_backend.exists("points")
+        assert redis_backend.load("points") == 2
+        assert client.get("points") is None
+    assert redis_backend.load("points") == 2
+
+
+def test_unit_of_work_identity_map(redis_backend) -> None:
+    def counter():
+        count, set_count = use_state(0)
+        set_count(count + 1)
+        return count
+
+    with redis_backend.unit_of_work():
+        assert [counter() for _ in range(3)] == [0, 1, 2]
+        # Only the initial value was written
+        (identifier,) = redis_backend.redis_client.keys()
+        assert redis_backend.redis_client.get(identifier) == get_serializer().dumps(0)
+    assert counter() == 3
+
+
+def test_unit_of_work_discards_failed_writes(redis_backend) -> None:
+    with pytest.raises(ZeroDivisionError):
+        with redis_backend.unit_of_work():
+            redis_backend.save("points", 1)
+            1 / 0
+    assert not redis_backend.exists("points")
+
+
+def test_unit_of_work_flush_on_read(redis_backend) -> None:
+    with redis_backend.unit_of_work("read"):
+        redis_backend.save("points", 1)
+        assert redis_backend.redis_client.get("points") is None
+        assert redis_backend.load("points") == 1
+        assert redis_backend.redis_client.get("points") is not None
+
+    with pytest.raises(ValueError):
+        with redis_backend.unit_of_work("never"):
+            pass
+
+
+async def test_unit_of_work_middleware() -> None:
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis()
+    messages = []
+
+    async def app(scope, receive, send):
+        for points in range(3):
+            await AsyncRedisBackend.save("points", points)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        messages.append(
+            (message["type"], await AsyncRedisBackend.redis_client.get("points"))
+        )
+
+    try:
+        middleware = UnitOfWorkMiddleware(app, AsyncRedisBackend)
+        await middleware({"type": "http"}, None, send)
+        # The writes are flushed before the response starts
+        assert messages[0][1] is not None
+        assert await AsyncRedisBackend.load("points") == 2
+    finally:
+        AsyncRedisBackend.redis_client = None
+
+
+def test_local_cache(redis_backend) -> None:
+    server = fakeredis.FakeServer()
+    redis_backend.redis_client = fakeredis.FakeRedis(server=server)
+    redis_backend.redis_client.config_set("notify-keyspace-events", "KA")
+    other_client = fakeredis.FakeRedis(server=server)
+    redis_backend.enable_cache(max_entries=2, max_staleness=60)
+    try:
+        redis_backend.save("theme", "dark")
+        assert redis_backend.load("theme") == "dark"
+        assert redis_backend.load("theme") == "dark"
+        assert redis_backend.cache_stats()["hits"] == 1
+
+        # Another process changes the value
+        other_client.set("theme", get_serializer().dumps("light"))
+        for _ in range(50):
+            if redis_backend.cache_stats()["invalidations"]:
+                break
+            time.sleep(0.01)
+        assert redis_backend.load("theme") == "light"
+
+        assert redis_backend.load_or_init("language", "en") == "en"
+        assert redis_backend.load_or_init("language", "en") == "en"
+        redis_backend.load_or_init("currency", "USD")
+        assert redis_backend.cache_stats()["entries"] == 2
+    finally:
+        redis_backend.disable_cache()
+
+
+def test_local_cache_staleness(redis_backend) -> None:
+    redis_backend.enable_cache(max_staleness=0.05, invalidate=False)
+    try:
+        redis_backend.save("theme", "dark")
+        assert redis_backend.load("theme") == "dark"
+        redis_backend.redis_client.set("theme", get_serializer().dumps("light"))
+        assert redis_backend.load("theme") == "dark"
+        time.sleep(0.1)
+        assert redis_backend.load("theme") == "light"
+        assert redis_backend.cache_stats() == {
+            "entries": 1,
+            "hits": 1,
+            "misses": 2,
+            "invalidations": 0,
+        }
+    finally:
+        redis_backend.disable_cache()
+
+
+async def test_async_local_cache() -> None:
+    server = fakeredis.FakeServer()
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis(server=server)
+    await AsyncRedisBackend.redis_client.config_set("notify-keyspace-events", "KA")
+    other_client = aioredis.FakeRedis(server=server)
+    await AsyncRedisBackend.enable_cache(max_staleness=60)
+    try:
+        await AsyncRedisBackend.save("theme", "dark")
+        assert await AsyncRedisBackend.load("theme") == "dark"
+        assert await AsyncRedisBackend.load("theme") == "dark"
+        assert AsyncRedisBackend.cache_stats()["hits"] == 1
+
+        await other_client.set("theme", get_serializer().dumps("light"))
+        for _ in range(50):
+            if AsyncRedisBackend.cache_stats()["invalidations"]:
+                break
+            await asyncio.sleep(0.01)
+        assert await AsyncRedisBackend.load("theme") == "light"
+    finally:
+        await AsyncRedisBackend.disable_cache()
+        AsyncRedisBackend.redis_client = None
+
+
+def test_bulk_operations(redis_backend) -> None:
+    assert redis_backend.save_many({"john": 1, "jane": [2]})
+    assert redis_backend.load_many(["jane", "john", "jack"]) == [[2], 1, None]
+    assert redis_backend.exists_many(["jane", "jack"]) == [True, False]
+
+    with redis_backend.unit_of_work():
+        redis_backend.save_many({"john": 3, "jack": 4})
+        assert redis_backend.load_many(["john", "jack", "jane"]) == [3, 4, [2]]
+        assert redis_backend.exists_many(["jack", "jill"]) == [True, False]
+        assert redis_backend.redis_client.get("jack") is None
+    assert redis_backend.load_many(["john", "jack"]) == [3, 4]
+
+
+async def test_async_bulk_operations() -> None:
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis()
+    try:
+        assert await AsyncRedisBackend.save_many({"john": 1, "jane": [2]})
+        assert await AsyncRedisBackend.load_many(["jane", "john", "jack"]) == [
+            [2],
+            1,
+            None,
+        ]
+        assert await AsyncRedisBackend.exists_many(["jane", "jack"]) == [True, False]
+    finally:
+        AsyncRedisBackend.redis_client = None
+
+
+def test_update_retries_on_conflict(redis_backend) -> None:
+    server = fakeredis.FakeServer()
+    redis_backend.redis_client = fakeredis.FakeRedis(server=server)
+    other_client = fakeredis.FakeRedis(server=server)
+    redis_backend.save("points", 1)
+    retries = redis_backend.update_stats()["retries"]
+    calls = []
+
+    def increment(points: int) -> int:
+        calls.append(points)
+        if len(calls) == 1:
+            # Another process updates the points in the meantime
+            other_client.set("points", get_serializer().dumps(10))
+        return points + 1
+
+    assert redis_backend.update("points", increment) == 11
+    assert calls == [1, 10]
+    assert redis_backend.update_stats()["retries"] == retries + 1
+    assert redis_backend.load("points") == 11
+
+
+async def test_async_update() -> None:
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis()
+    try:
+        assert await AsyncRedisBackend.update("points", lambda points: [points]) == [
+            None
+        ]
+        assert await AsyncRedisBackend.update("points", lambda points: points * 2) == [
+            None,
+            None,
+        ]
+    finally:
+        AsyncRedisBackend.redis_client = None
+
+
+def test_snapshot_transfer(redis_backend, tmp_path) -> None:
+    class IsolatedMemoryBackend(MemoryBackend):
+        _store = {}
+        _namespaces = {}
+
+    path = str(tmp_path / "hooks.snapshot")
+    redis_backend.save_many({"john": {"age": 30}, "jane": [1, 2]})
+    assert redis_backend.snapshot(path) == 2
+
+    assert IsolatedMemoryBackend.restore(path, lazy=True) == 2
+    assert IsolatedMemoryBackend.load("john") == {"age": 30}
+    IsolatedMemoryBackend.save("jack", 3)
+
+    redis_backend.reset_backend()
+    assert IsolatedMemoryBackend.snapshot(path) == 3
+    assert redis_backend.restore(path) == 3
+    assert sorted(redis_backend.keys()) == ["jack", "jane", "john"]
+    assert redis_backend.load("jane") == [1, 2]
+
+
+def test_reducer_fields(redis_backend) -> None:
+    from hooks import use_reducer
+
+    def profile_reducer(state, action):
+        return {"name": action["name"]}
+
+    identifier = profile_reducer.__module__ + profile_reducer.__qualname__
+    # State saved as a whole by a previous version is converted on the first write
+    redis_backend.save(identifier, {"name": "", "history": [1]})
+
+    state, dispatch = use_reducer(profile_reducer, {"name": "", "history": []})
+    assert state == {"name": "", "history": [1]}
+    dispatch({"name": "John"})
+    assert redis_backend.redis_client.type(identifier) == b"hash"
+
+    commands = []
+    execute_command = redis_backend.redis_client.execute_command
+
+    def counting_execute_command(*args, **kwargs):
+        commands.append(args)
+        return execute_command(*args, **kwargs)
+
+    redis_backend.redis_client.execute_command = counting_execute_command
+    use_reducer(profile_reducer)[1]({"name": "Jane"})
+    # Only the field returned by the reducer is written
+    assert [command[:3] for command in commands] == [
+        ("HSET", identifier, get_serializer().dumps("name"))
+    ]
+    assert redis_backend.load_fields(identifier) == {"name": "Jane", "history": [1]}
+
+
+def test_reducer_fields_with_other_operations(redis_backend, tmp_path) -> None:
+    from hooks import use_reducer
+
+    def scores_reducer(state, action):
+        return {**state, action["player"]: action["score"]}
+
+    identifier = scores_reducer.__module__ + scores_reducer.__qualname__
+    commands = []
+    execute_command = redis_backend.redis_client.execute_command
+
+    def counting_execute_command(*args, **kwargs):
+        commands.append(args[0])
+        return execute_command(*args, **kwargs)
+
+    redis_backend.redis_client.execute_command = counting_execute_command
+    # The state is loaded or initialized in a single round trip
+    state, dispatch = use_reducer(scores_reducer, {0: "z", "total": 0})
+    assert commands == []
+    redis_backend.redis_client.execute_command = execute_command
+
+    assert state == {0: "z", "total": 0}
+    dispatch({"player": 1, "score": 5})
+    assert redis_backend.redis_client.type(identifier) == b"hash"
+    # Field names keep their type
+    assert redis_backend.load(identifier) == {0: "z", "total": 0, 1: 5}
+    assert redis_backend.load_or_init(identifier, {}) == {0: "z", "total": 0, 1: 5}
+    assert redis_backend.load_many([identifier, "missing"]) == [
+        {0: "z", "total": 0, 1: 5},
+        None,
+    ]
+
+    assert redis_backend.update(identifier, lambda state: {**state, "total": 5}) == {
+        0: "z",
+        "total": 5,
+        1: 5,
+    }
+    assert redis_backend.load_fields(identifier)["total"] == 5
+
+    redis_backend.snapshot(str(tmp_path / "hooks.snapshot"))
+    MemoryBackend.restore(str(tmp_path / "hooks.snapshot"))
+    try:
+        assert MemoryBackend.load(identifier) == {0: "z", "total": 5, 1: 5}
+    finally:
+        MemoryBackend.delete(identifier)
+
+
+def test_reducer_fields_mutated_in_place(redis_backend) -> None:
+    from hooks import use_reducer
+
+    def items_reducer(state, action):
+        state["items"].append(action["item"])
+        return {"items": state["items"]}
+
+    identifier = items_reducer.__module__ + items_reducer.__qualname__
+    state, dispatch = use_reducer(items_reducer, {"items": []})
+    dispatch({"item": 1})
+    dispatch({"item": 2})
+
+    assert redis_backend.load(identifier) == {"items": [1, 2]}
+
+
+async def test_async_reducer_fields() -> None:
+    from hooks.asyncio.reducers import use_reducer
+
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis()
+    set_hooks_backend(AsyncRedisBackend)
+    try:
+
+        def points_reducer(state, action):
+            return {**state, "points": state["points"] + action["points"]}
+
+        state, dispatch = await use_reducer(points_reducer, {"points": 0, "log": []})
+        await dispatch({"points": 2})
+        assert (await use_reducer(points_reducer))[0] == {"points": 2, "log": []}
+    finally:
+        AsyncRedisBackend.redis_client = None
+        MemoryBackend.use()
+
+
+def test_scope_disposal(redis_backend) -> None:
+    from hooks import dispose_scope, hook_scope
+
+    @hook_scope(parametrize=["user"], disposable=True)
+    def session(user: str) -> int:
+        visits, set_visits = use_state(0)
+        set_visits(visits + 1)
+        return visits
+
+    @hook_scope(parametrize=["job"], ephemeral=True)
+    def run_job(job: str) -> int:
+        steps, set_steps = use_state(0)
+        set_steps(steps + 1)
+        return steps
+
+    assert session("bob") == 0
+    assert session("bob") == 1
+    assert session("ann") == 0
+    assert run_job("backup") == 0
+    assert run_job("backup") == 0
+    # The namespaces of the scopes are not hook state
+    assert len(redis_backend.keys()) == 2
+
+    commands = []
+    execute_command = redis_backend.redis_client.execute_command
+
+    def counting_execute_command(*args, **kwargs):
+        commands.append(args[0])
+        return execute_command(*args, **kwargs)
+
+    redis_backend.redis_client.execute_command = counting_execute_command
+    dispose_scope(session, user="bob")
+    assert commands == ["SMEMBERS", "UNLINK"]
+    assert len(redis_backend.keys()) == 1
+    assert session("bob") == 0
+    assert session("ann") == 1
+
+
+async def test_async_namespaces() -> None:
+    AsyncRedisBackend.redis_client = aioredis.FakeRedis()
+    try:
+        await AsyncRedisBackend.save_many({"john": 1, "jane": 2, "jack": 3})
+        await AsyncRedisBackend.track("people", "john")
+        await AsyncRedisBackend.track("people", "jill")
+        assert await AsyncRedisBackend.keys("people") == ["john"]
+
+        await AsyncRedisBackend.clear_namespace("people")
+        assert sorted(await AsyncRedisBackend.keys()) == ["jack", "jane"]
+        assert await AsyncRedisBackend.delete("jack")
+        assert not await AsyncRedisBackend.delete("jack")
+        assert await AsyncRedisBackend.delete_many(["jane", "jack"]) == 1
+    finally:
+        AsyncRedisBackend.redis_client = None